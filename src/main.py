@@ -12,12 +12,21 @@ from os.path import isdir as is_dir
 
 from sys import exit as exit_program
 
-from reddit_to_video.reddit import Reddit
+# Only light modules are imported here so info arguments start instantly.
+# The reddit client, handlers and TTS engines pull in praw, moviepy, selenium
+# etc. and are imported where their pipeline stage runs.
 from reddit_to_video.video.config import VideoConfig
-from reddit_to_video.handlers.posts import handle_video_post
-from reddit_to_video.handlers.comment import handle_comment_post
 from reddit_to_video.prompts import prompt_list
-from reddit_to_video.video.tts import get_tts_engine
+from reddit_to_video.handlers.render import render_config, post_policies
+from reddit_to_video.batch import create_batch_jobs, load_batch_jobs, run_batch
+from reddit_to_video.batch import overwrite_policies, DEFAULT_OUTPUT_TEMPLATE
+from reddit_to_video.cache import DiskCache
+from reddit_to_video.store import MediaStore, configure_media_store
+from reddit_to_video.video.tts import TTSCache, configure_tts_cache
+from reddit_to_video.scraping.browser import configure_browser_pools
+from reddit_to_video.scraping.transport import configure_transport
+from reddit_to_video.scraping.scheduler import configure_downloads
+from reddit_to_video.scraping.validator import ClipService
 from reddit_to_video.exceptions import DirectoryNotFoundError
 
 
@@ -25,6 +34,12 @@ CONFIG_PATH = path_join(getcwd(), "user_configs/")
 OUTPUT_PATH = "output/"
 COMMENTS_PATH = path_join(getcwd(), "output/comments/")
 POSTS_PATH = path_join(getcwd(), "output/posts/")
+REDDIT_CACHE_PATH = path_join(getcwd(), "output/cache/reddit/")
+STORE_PATH = path_join(getcwd(), "output/store/")
+TTS_CACHE_PATH = path_join(getcwd(), "output/cache/tts/")
+
+# seconds a cached listing or comment tree is reused for, set with [cache] reddit_ttl
+DEFAULT_REDDIT_CACHE_TTL = 3600
 
 
 def load_config():
@@ -39,6 +54,32 @@ def load_config():
     return config
 
 
+def get_network_timeout(config):
+    """Returns the (connect, read) timeout from the config file, or None if it isn't set"""
+    connect_timeout = config.getfloat("network", "connect_timeout", fallback=None)
+    read_timeout = config.getfloat("network", "read_timeout", fallback=None)
+
+    if connect_timeout is None and read_timeout is None:
+        return None
+
+    from reddit_to_video.scraping.transport import CONNECT_TIMEOUT, READ_TIMEOUT
+
+    return (connect_timeout or CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT)
+
+
+def get_service_limits(config) -> dict:
+    """Returns the per service download limits set in the config file, eg. twitch = 4"""
+    service_limits = {}
+
+    for service in ClipService:
+        limit = config.getint("downloads", service.name.lower(), fallback=None)
+
+        if limit is not None:
+            service_limits[service] = limit
+
+    return service_limits
+
+
 def load_user_configs(dir_path):
     """Loads all user configs from a directory"""
     if not is_dir(dir_path):
@@ -63,7 +104,7 @@ def create_user_agent(username, version):
 
 def clear_cache():
     """Clears the cache of downloaded / generated videos, 
-    screenshots, and audio from video creation"""
+    screenshots, and audio from video creation, cached reddit listings, the media store and the tts cache"""
     for file_ in list_dir(COMMENTS_PATH):
         if file_.endswith(".png") or file_.endswith(".mp3"):
             remove_file(path_join(COMMENTS_PATH, file_))
@@ -72,6 +113,10 @@ def clear_cache():
         if file_.endswith(".png") or file_.endswith(".mp3") or file_.endswith(".mp4"):
             remove_file(path_join(POSTS_PATH, file_))
 
+    DiskCache(REDDIT_CACHE_PATH).clear()
+    MediaStore(STORE_PATH).clear()
+    TTSCache(TTS_CACHE_PATH).clear()
+
 
 def load_args():
     """Loads the arguments from the command line"""
@@ -120,6 +165,66 @@ def load_args():
         action="store_true",
         required=False,
         default=False)
+    system_args.add_argument(
+        "-nc",
+        "--no_cache",
+        help="Fetches listings and comments from Reddit instead of using the cache",
+        action="store_true",
+        required=False,
+        default=False)
+
+    batch_args = parser.add_argument_group("Batch Arguments")
+    batch_args.add_argument(
+        "-b",
+        "--batch",
+        help=("Renders every video config without any input, "
+              "or the jobs in JOB_FILE if given"),
+        metavar="JOB_FILE",
+        nargs="?",
+        const="",
+        required=False,
+        default=None)
+    batch_args.add_argument(
+        "--configs",
+        help="Names of the video configs to render in batch mode (default: all)",
+        nargs="+",
+        required=False,
+        default=None)
+    batch_args.add_argument(
+        "--post_policy",
+        help="How comment videos choose a post in batch mode",
+        choices=post_policies,
+        required=False,
+        default="first")
+    batch_args.add_argument(
+        "--output",
+        help=("Output path template for batch mode, "
+              "{config}, {date}, {time} and {index} are filled in"),
+        required=False,
+        default=DEFAULT_OUTPUT_TEMPLATE)
+    batch_args.add_argument(
+        "--overwrite",
+        help="What to do when a batch output already exists",
+        choices=overwrite_policies,
+        required=False,
+        default="rename")
+
+    service_args = parser.add_argument_group("Service Arguments")
+    service_args.add_argument(
+        "--serve",
+        help=("Runs a render service that keeps resources warm between jobs "
+              "and takes jobs over a local HTTP API on PORT"),
+        metavar="PORT",
+        type=int,
+        nargs="?",
+        const=8620,
+        required=False,
+        default=None)
+    service_args.add_argument(
+        "--host",
+        help="Host the render service listens on",
+        required=False,
+        default="127.0.0.1")
 
     return parser.parse_args(), parser
 
@@ -141,6 +246,8 @@ def handle_system_args(parser, args, config, user_agent):
             [user_agent:{user_agent}]""")
         exit_program(0)
     if args.system_voices:
+        from reddit_to_video.video.tts import get_tts_engine
+
         print("System voices:")
         tts = get_tts_engine("s")
         voices = tts.get_voices()
@@ -186,6 +293,29 @@ def main():
 
     # debug = args.debug
 
+    configure_browser_pools(
+        max_size=config.getint("browser", "pool_size", fallback=None),
+        max_uses=config.getint("browser", "max_uses", fallback=None))
+
+    # megabytes of downloaded media kept between runs, set with [store] budget_mb
+    configure_media_store(
+        store_dir=STORE_PATH,
+        budget_mb=config.getfloat("store", "budget_mb", fallback=None))
+
+    # megabytes of synthesized speech kept between runs, set with [tts_cache] budget_mb
+    configure_tts_cache(
+        cache_dir=TTS_CACHE_PATH,
+        budget_mb=config.getfloat("tts_cache", "budget_mb", fallback=None))
+
+    configure_downloads(
+        max_concurrent=config.getint("downloads", "max_concurrent", fallback=None),
+        service_limits=get_service_limits(config))
+
+    configure_transport(
+        max_per_host=config.getint("network", "max_per_host", fallback=None),
+        pool_size=config.getint("network", "pool_size", fallback=None),
+        timeout=get_network_timeout(config))
+
     handle_system_args(parser, args, config, user_agent)
 
     check_ouput_dir()
@@ -205,45 +335,57 @@ def main():
         print(f"No video configs found in {CONFIG_PATH}")
         exit_program(1)
 
-    chosen_config: VideoConfig = prompt_list(
-        list(
-            map(lambda config: (config.name, config), video_configs)),
-        "Select a video config: ")
+    from reddit_to_video.reddit import Reddit
 
-    reddit = Reddit(config["reddit"]["client_id"], config["reddit"]
-                    ["client_secret"], user_agent, debug=False)
+    reddit_cache_ttl = 0
 
-    if chosen_config.settings["type"].lower() == "comment":
-        posts = reddit.get_top_posts(
-            chosen_config.settings.subreddit, limit=10)
+    if not args.no_cache:
+        reddit_cache_ttl = config.getint(
+            "cache", "reddit_ttl", fallback=DEFAULT_REDDIT_CACHE_TTL)
 
-        chosen_post = prompt_list(
-            list(map(lambda post: (post.title, post), posts)), "Select a post: ")
+    reddit = Reddit(config["reddit"]["client_id"], config["reddit"]
+                    ["client_secret"], user_agent, debug=False,
+                    cache=DiskCache(REDDIT_CACHE_PATH, reddit_cache_ttl))
+
+    if args.batch is not None:
+        job_settings = {
+            "post_policy": args.post_policy,
+            "output": args.output,
+            "overwrite": args.overwrite
+        }
+
+        if args.batch == "":
+            jobs = create_batch_jobs(
+                video_configs, args.configs, **job_settings)
+        else:
+            jobs = load_batch_jobs(args.batch, video_configs)
+
+        run_batch(reddit, jobs)
+        exit_program(0)
 
-        handle_comment_post(chosen_post, chosen_config)
+    if args.serve is not None:
+        from reddit_to_video.service import RenderService, create_server
 
-    elif chosen_config.settings["type"].lower() == "video":
-        print("Loading top posts from Reddit...")
-        posts = reddit.get_top_posts(
-            chosen_config.settings.subreddit,
-            limit=chosen_config.settings.limit,
-            time_filter=chosen_config.settings.time)
+        service = RenderService(reddit, video_configs)
+        server = create_server(service, args.host, args.serve)
 
-        end_card_footage = None
+        service.start()
+        print(f"Render service listening on http://{args.host}:{args.serve}")
 
-        if chosen_config.has_setting("end_card_footage"):
-            end_card_footage = chosen_config.settings["end_card_footage"]
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            service.stop()
 
-        video_break_footage = None
+        exit_program(0)
 
-        if chosen_config.has_setting("video_break_footage"):
-            video_break_footage = chosen_config.settings["video_break_footage"]
+    chosen_config: VideoConfig = prompt_list(
+        list(
+            map(lambda config: (config.name, config), video_configs)),
+        "Select a video config: ")
 
-        handle_video_post(
-            posts,
-            chosen_config,
-            end_card_footage=end_card_footage,
-            video_break_footage=video_break_footage,)
+    render_config(reddit, chosen_config)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
-"""Contains functions for normalising audio clips"""
+"""Contains functions for normalising and resampling audio clips"""
 
 from os.path import isfile as is_file
+import numpy as np
 import pyloudnorm as pyln
 import soundfile as sf
 
@@ -32,3 +33,17 @@ def normalise_audio_bytes(audio_bytes: bytes, target_loudness: float):
     data = pyln.normalize.loudness(data, loudness, target_loudness)
 
     return data
+
+
+def resample_audio(samples, rate: int, target_rate: int):
+    """Resamples (frames, channels) samples to a target rate with linear interpolation.
+    moviepy picks the nearest sample instead, which sounds rough when upsampling speech"""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+
+    frames = int(round(len(samples) * target_rate / rate))
+    source_times = np.arange(len(samples)) / rate
+    target_times = np.arange(frames) / target_rate
+
+    return np.stack([np.interp(target_times, source_times, samples[:, channel])
+                     for channel in range(samples.shape[1])], axis=1).astype(np.float32)
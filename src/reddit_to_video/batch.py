@@ -0,0 +1,183 @@
+"""Batch mode for rendering video configs back to back without any user input
+
+Classes:
+    BatchJob: A single unattended render of a video config
+
+Functions:
+    create_batch_jobs(video_configs: list, names: list = None, **job_settings) -> list[BatchJob]:
+        Creates a job for every video config, or only the configs with the given names
+
+    load_batch_jobs(file_path: str, video_configs: list) -> list[BatchJob]:
+        Loads a list of jobs from a json job file
+
+    get_output_path(template: str, config_name: str, index: int, overwrite: str) -> str:
+        Fills in an output template and applies the overwrite policy
+
+    run_batch_job(reddit, job: BatchJob, index: int = 1) -> str:
+        Renders a single job and returns its output path
+
+    run_batch(reddit, jobs: list[BatchJob]) -> list[tuple[BatchJob, str]]:
+        Renders every job, continuing with the next job when one fails
+
+Example job file
+{
+    "defaults": {
+        "post_policy": "most_comments",
+        "output": "output/videos/{config} - {date}.mp4",
+        "overwrite": "rename"
+    },
+    "jobs": [
+        {"config": "Askreddit comments top all time"},
+        {"config": "YouTube haiku", "overwrite": "skip"}
+    ]
+}
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from json import load as json_load
+from os import makedirs as make_dir
+from os.path import dirname
+from os.path import exists as path_exists
+from os.path import isfile as is_file
+from os.path import splitext as split_ext
+
+from reddit_to_video.video.config import VideoConfig, validate_json_val
+from reddit_to_video.handlers.render import post_policies, render_config
+from reddit_to_video.utility import remove_non_words
+from reddit_to_video.exceptions import ConfigKeyError
+
+overwrite_policies = ["rename", "overwrite", "skip"]
+
+DEFAULT_OUTPUT_TEMPLATE = "output/videos/{config} - {date} {time}.mp4"
+
+
+@dataclass
+class BatchJob:
+    """A single unattended render of a video config"""
+    config: VideoConfig
+    post_policy: str = "first"
+    output: str = DEFAULT_OUTPUT_TEMPLATE
+    overwrite: str = "rename"
+
+    def __post_init__(self):
+        if self.post_policy not in post_policies:
+            raise TypeError(
+                f"BatchJob() invalid post policy {self.post_policy}")
+        if self.overwrite not in overwrite_policies:
+            raise TypeError(
+                f"BatchJob() invalid overwrite policy {self.overwrite}")
+
+
+def create_batch_jobs(video_configs: list, names: list = None, **job_settings) -> list[BatchJob]:
+    """Creates a job for every video config, or only the configs with the given names"""
+    if names is None:
+        return [BatchJob(config, **job_settings) for config in video_configs]
+
+    configs_by_name = {config.name: config for config in video_configs}
+
+    for name in names:
+        if name not in configs_by_name:
+            raise ConfigKeyError(f"Batch: No video config named {name}")
+
+    return [BatchJob(configs_by_name[name], **job_settings) for name in names]
+
+
+def validate_job_settings(json):
+    """Validates the optional settings shared by a job and the job file defaults"""
+    validate_json_val(json, "post_policy", str,
+                      optional=True, in_list=post_policies)
+    validate_json_val(json, "output", str, optional=True)
+    validate_json_val(json, "overwrite", str, optional=True,
+                      in_list=overwrite_policies)
+
+
+def load_batch_jobs(file_path: str, video_configs: list) -> list[BatchJob]:
+    """Loads a list of jobs from a json job file"""
+    if not is_file(file_path):
+        raise FileNotFoundError(f"Batch: File {file_path} does not exist")
+
+    with open(file_path, "r") as f:
+        json = json_load(f)
+
+    validate_json_val(json, "jobs", list)
+    validate_json_val(json, "defaults", dict, optional=True)
+
+    defaults = json.get("defaults", {})
+    validate_job_settings(defaults)
+
+    jobs = []
+
+    for job_json in json["jobs"]:
+        validate_json_val(job_json, "config", str)
+        validate_job_settings(job_json)
+
+        job_settings = {**defaults, **job_json}
+        del job_settings["config"]
+
+        jobs += create_batch_jobs(video_configs,
+                                  [job_json["config"]], **job_settings)
+
+    return jobs
+
+
+def get_output_path(template: str, config_name: str, index: int, overwrite: str) -> str:
+    """Fills in an output template and applies the overwrite policy.
+    Returns None if the job should be skipped"""
+    now = datetime.now()
+
+    output_path = template.format(
+        config=remove_non_words(config_name).strip(),
+        date=now.strftime("%Y-%m-%d"),
+        time=now.strftime("%H-%M-%S"),
+        index=index)
+
+    if not path_exists(output_path) or overwrite == "overwrite":
+        return output_path
+
+    if overwrite == "skip":
+        return None
+
+    base, ext = split_ext(output_path)
+    copy_num = 1
+
+    while path_exists(f"{base} ({copy_num}){ext}"):
+        copy_num += 1
+
+    return f"{base} ({copy_num}){ext}"
+
+
+def run_batch_job(reddit, job: BatchJob, index: int = 1) -> str:
+    """Renders a single job and returns its output path,
+    or None if the output already exists and the job is skipped"""
+    output_path = get_output_path(
+        job.output, job.config.name, index, job.overwrite)
+
+    if output_path is None:
+        print("Output already exists, skipping...")
+        return None
+
+    if dirname(output_path) != "":
+        make_dir(dirname(output_path), exist_ok=True)
+
+    return render_config(reddit, job.config, output_location=output_path, post_policy=job.post_policy)
+
+
+def run_batch(reddit, jobs: list[BatchJob]) -> list[tuple[BatchJob, str]]:
+    """Renders every job, continuing with the next job when one fails.
+    Returns each job with its output path, or None if it was skipped or failed"""
+    results = []
+
+    for i, job in enumerate(jobs):
+        print(f"[{i + 1}/{len(jobs)}] Rendering {job.config.name}")
+
+        try:
+            results.append((job, run_batch_job(reddit, job, i + 1)))
+        except Exception as e:
+            print(f"Failed to render {job.config.name} ({e})")
+            results.append((job, None))
+
+    rendered = len([result for result in results if result[1] is not None])
+    print(f"Finished batch, rendered {rendered}/{len(jobs)} jobs")
+
+    return results
@@ -0,0 +1,91 @@
+"""Persistent on-disk cache with a time to live
+
+Values are stored as gzipped json, one file per key, so they are compact and can be
+shared between runs. Writes go to a temporary file first and are renamed into place,
+so a crashed run never leaves a half written entry.
+
+Classes:
+    DiskCache: Stores json values on disk, expiring them after a time to live
+
+Example:
+    >>> from reddit_to_video.cache import DiskCache
+    >>> cache = DiskCache("output/cache/reddit", ttl=3600)
+    >>> cache.set(("listing", "askreddit", "top", "all", 10), [{"id": "abc"}])
+    >>> cache.get(("listing", "askreddit", "top", "all", 10))
+    [{'id': 'abc'}]
+"""
+
+import gzip
+from hashlib import sha1
+from json import dumps, loads
+from os import listdir as list_dir
+from os import makedirs as make_dir
+from os import remove as remove_file
+from os import replace as replace_file
+from os.path import getmtime as get_modified_time
+from os.path import isdir as is_dir
+from os.path import isfile as is_file
+from os.path import join as path_join
+from time import time
+from uuid import uuid4
+
+
+class DiskCache:
+    """Stores json values on disk, expiring them after a time to live"""
+
+    def __init__(self, cache_dir: str, ttl: float = 3600):
+        """Initialises the cache. The ttl is how many seconds an entry stays valid,
+        0 or less disables the cache"""
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True if entries are stored and read, False otherwise"""
+        return self.ttl > 0
+
+    def _get_path(self, key) -> str:
+        """Returns the file path of the entry for a key"""
+        key_hash = sha1(dumps(key).encode("utf-8")).hexdigest()
+        return path_join(self.cache_dir, f"{key_hash}.json.gz")
+
+    def get(self, key, default=None):
+        """Returns the value of a key, or the default if it's missing or expired"""
+        path = self._get_path(key)
+
+        if not self.enabled or not is_file(path):
+            return default
+
+        if time() - get_modified_time(path) > self.ttl:
+            return default
+
+        try:
+            with gzip.open(path, "rb") as file:
+                return loads(file.read())
+        except (OSError, ValueError):
+            # a corrupt entry is treated as a miss and overwritten by the next set
+            return default
+
+    def set(self, key, value) -> None:
+        """Stores a json serialisable value for a key"""
+        if not self.enabled:
+            return
+
+        make_dir(self.cache_dir, exist_ok=True)
+
+        path = self._get_path(key)
+        temp_path = f"{path}.{uuid4().hex}.tmp"
+
+        with gzip.open(temp_path, "wb") as file:
+            file.write(dumps(value, separators=(",", ":")).encode("utf-8"))
+
+        replace_file(temp_path, path)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache"""
+        if not is_dir(self.cache_dir):
+            return
+
+        for file_ in list_dir(self.cache_dir):
+            if file_.endswith(".json.gz") or file_.endswith(".tmp"):
+                remove_file(path_join(self.cache_dir, file_))
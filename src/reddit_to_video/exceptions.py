@@ -26,6 +26,18 @@
         DirectoryNotFoundError: 
         Raised when a directory is not found
 
+        IncompleteDownloadError: 
+        Raised when a download ends before the whole file has arrived
+
+        DownloadCancelledError: 
+        Raised when a download is cancelled before it finishes
+
+        ExpiredUrlError: 
+        Raised when a signed url is refused because it has expired
+
+        FileTooLargeError: 
+        Raised when a file is bigger than a size limit
+
 """
 
 
@@ -72,3 +84,19 @@ class ScrapingError(Exception):
 
 class DurationTooLongError(Exception):
     """Raised when a duration is too long"""
+
+
+class IncompleteDownloadError(Exception):
+    """Raised when a download ends before the whole file has arrived"""
+
+
+class DownloadCancelledError(Exception):
+    """Raised when a download is cancelled before it finishes"""
+
+
+class ExpiredUrlError(Exception):
+    """Raised when a signed url is refused because it has expired"""
+
+
+class FileTooLargeError(Exception):
+    """Raised when a file is bigger than a size limit"""
@@ -1,83 +1,123 @@
 import time
 
+from multiprocessing.pool import Pool
 from os.path import isfile as is_file
 from sys import exit as exit_program
 
 from proglog import default_bar_logger
 
-from reddit_to_video.video.tts import get_tts_engine
+from reddit_to_video.video.tts import get_loaded_tts_engine
 from reddit_to_video.video.config import VideoConfig
 from reddit_to_video.video.script import VideoScript
 from reddit_to_video.video.scriptelement import ScriptElement
 from reddit_to_video.video.compose import composeCommentVideo
+from reddit_to_video.video.cards import CardTemplate, render_title_card, render_cards
+from reddit_to_video.handlers.media import CommentMedia, produce_comment_media
 from reddit_to_video.post import Post
-from reddit_to_video.exceptions import ScriptElementTooLongError
+from reddit_to_video.records import PostRecord
+from reddit_to_video.store import get_footage
+from reddit_to_video.exceptions import ScriptElementTooLongError, ScrapingError
 from reddit_to_video.prompts import prompt_bool, prompt_write_file, prompt_preview_vid
 
 
-def handle_comment_post(selected_post, config: VideoConfig):
-    """Handles a comment post"""
-    tts = get_tts_engine(config.tts.engine, **config.tts.kwargs)
+def handle_comment_post(selected_post: PostRecord, config: VideoConfig, reddit, output_location: str = None) -> str:
+    """Handles a comment post. If an output location is given the video is
+    rendered without prompting the user, otherwise the user is asked for choices"""
+    interactive = output_location is None
 
-    print(f"Loaded {repr(tts)} TTS engine")
+    tts = get_loaded_tts_engine(config.tts.engine, **config.tts.kwargs)
 
-    comments = []
+    print(f"Loaded {repr(tts)} TTS engine")
 
     print(f"Loaded post: '{selected_post.title}' media")
 
-    post = Post(selected_post.url, selected_post.id, not selected_post.is_self)
+    use_cards = config.settings.visuals == "card"
 
-    post_screenshot_out = f"output/posts/post - {selected_post.id}.png"
-    post_audio_out = f"output/posts/post - {selected_post.id}.mp3"
+    if use_cards:
+        card_template = CardTemplate.from_json(
+            config.settings.card_template or {})
 
-    max_failures = 3
+        post_screenshot_out = f"output/posts/post card - {selected_post.id}.png"
+        render_title_card(selected_post, post_screenshot_out, card_template)
+    else:
+        post = Post(selected_post.url, selected_post.id,
+                    not selected_post.is_self, record=selected_post)
 
-    try:
-        post.screenshot_title(post_screenshot_out)
-    except Exception:
-        print("Failed to screenshot post title, is it new reddit layout?")
-        print("Tryting again...")
+        post_screenshot_out = f"output/posts/post - {selected_post.id}.png"
+
+        max_failures = 3
+
+        try:
+            post.screenshot_title(post_screenshot_out)
+        except Exception:
+            print("Failed to screenshot post title, is it new reddit layout?")
+            print("Tryting again...")
+
+            max_failures -= 1
+
+            if max_failures == 0:
+                print("Failed to screenshot post title")
 
-        max_failures -= 1
+                if not interactive:
+                    raise ScrapingError(
+                        "handle_comment_post() failed to screenshot post title")
 
-        if max_failures == 0:
-            print("Failed to screenshot post title")
-            exit_program(1)
+                exit_program(1)
 
-        post.reload()
+            post.reload()
+
+    # audio is kept in the tts cache, so text that was already read by this voice isn't synthesized again
+    post_audio_out = tts.get_audio_path(selected_post.title)
 
     if not is_file(post_audio_out):
         tts.save_audio(selected_post.title, post_audio_out)
 
-    selected_post.comments.replace_more(limit=0)
+    comment_media = []
 
-    for i, comment in enumerate(selected_post.comments):
+    for i, comment in enumerate(reddit.get_comments(selected_post.id)):
         if i > config.settings.limit:
             break
 
-        audio_out = f"output/comments/comment - {comment.id}.mp3"
+        audio_out = tts.get_audio_path(comment.body)
         screenshot_out = f"output/comments/comment - {comment.id}.png"
 
-        comments.append((comment.body, screenshot_out, audio_out))
+        if use_cards:
+            screenshot_out = f"output/comments/comment card - {comment.id}.png"
+
+        comment_media.append(CommentMedia(comment, audio_out, screenshot_out))
+
+    # tts runs in batches on worker threads while the visuals are drawn or screenshotted
+    if use_cards:
+        with Pool() as card_pool:
+            failed = produce_comment_media(
+                comment_media,
+                tts.save_audio,
+                lambda batch: render_cards(
+                    [(media.comment, media.visual_path) for media in batch], card_template, pool=card_pool),
+                tts_workers=tts.max_workers, save_audio_batch=tts.save_audio_batch)
+    else:
+        # the browser goes back to the pool even if a comment's media fails
+        try:
+            # screenshotted in batches so the page is only captured once per batch
+            failed = produce_comment_media(
+                comment_media,
+                tts.save_audio,
+                lambda batch: post.screenshot_comments(
+                    [media.comment.id for media in batch], "output/comments/"),
+                tts_workers=tts.max_workers, save_audio_batch=tts.save_audio_batch)
+        finally:
+            post.close()
 
-        # sometimes we might have these in cache already
-        if not is_file(audio_out):
-            tts.save_audio(
-                comment.body, audio_out)
-        if not is_file(screenshot_out):
-            post.screenshot_comment(
-                comment.id, "output/comments/")
+    # r.create_comment_video(posts[post_num], args.output, args.background)
 
-    post.close()
+    if len(failed) > 0:
+        print(f"Skipping {len(failed)} comments whose audio or visual failed")
 
-    print("Finished loading comments media")
+    # comments that weren't on the page or failed tts are skipped
+    comments = [(media.comment.body, media.visual_path, media.audio_path) for media in comment_media
+                if media not in failed and is_file(media.visual_path) and is_file(media.audio_path)]
 
-    # r.create_comment_video(posts[post_num], args.output, args.background)
-
-    if repr(tts) == "SystemTTS":
-        print("Running system TTS engine")
-        tts.run()
-        print("Finished running system TTS engine")
+    print("Finished loading comments media")
 
     print("Creating video script...")
     # create video script
@@ -111,9 +151,8 @@ def handle_comment_post(selected_post, config: VideoConfig):
     if (not script.finished):
         print(
             f"Script not finished, with duration of {script.duration} seconds.")
-        proceed = prompt_bool("Do you still want to continue? (y/n): ")
 
-        if not proceed:
+        if interactive and not prompt_bool("Do you still want to continue? (y/n): "):
             print("Exiting...")
             exit_program(0)
 
@@ -121,17 +160,22 @@ def handle_comment_post(selected_post, config: VideoConfig):
 
     print("Finished loading video script")
 
-    output_location = prompt_write_file("Output location: ", overwrite=True)
+    if interactive:
+        output_location = prompt_write_file(
+            "Output location: ", overwrite=True)
 
     print("Exporting video...")
     start_time = time.time()
     # export video
     composeCommentVideo(output_location,
-                        config.settings.background_footage,
+                        get_footage(config.settings.background_footage),
                         script,
                         config.export_settings,
                         logger=default_bar_logger('bar'))
 
     print(f"Finished exporting video in {time.time() - start_time} seconds")
 
-    prompt_preview_vid(output_location)
+    if interactive:
+        prompt_preview_vid(output_location)
+
+    return output_location
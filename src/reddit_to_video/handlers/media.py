@@ -0,0 +1,141 @@
+"""Produces the audio and visuals of comments concurrently
+
+Text to speech is mostly waiting on the network (or the TTS engine) and screenshots are
+mostly waiting on the browser, so they run at the same time instead of one after another.
+Comments stream in on the calling thread, TTS jobs go to a pool of worker threads and visual
+jobs go to a single thread that owns the browser, which captures them in batches. Both
+stages are bounded so a long comment listing doesn't queue up unbounded work. Engines with a
+batch API get the TTS jobs in batches, which they synthesize concurrently themselves.
+
+Classes:
+    CommentMedia(dataclass): The audio and visual output paths of a comment
+
+Functions:
+    produce_comment_media(comment_media, save_audio, capture_visuals, tts_workers: int = 1,
+                          queue_size: int = 16, batch_size: int = 10, save_audio_batch=None,
+                          tts_batch_size: int = 16) -> list[CommentMedia]:
+        Creates the missing audio and visuals of comments concurrently
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from os.path import isfile as is_file
+from queue import Empty, Queue
+from threading import BoundedSemaphore, Thread
+
+from reddit_to_video.records import CommentRecord
+
+
+@dataclass
+class CommentMedia:
+    """The audio and visual output paths of a comment"""
+    comment: CommentRecord
+    audio_path: str
+    visual_path: str
+
+
+def capture_visuals_worker(visual_queue: Queue, capture_visuals, batch_size: int, failed: list):
+    """Captures the visuals in the queue in batches until it receives None"""
+    finished = False
+
+    while not finished:
+        batch = [visual_queue.get()]
+
+        if batch[0] is None:
+            return
+
+        while len(batch) < batch_size:
+            try:
+                media = visual_queue.get_nowait()
+            except Empty:
+                break
+
+            if media is None:
+                finished = True
+                break
+
+            batch.append(media)
+
+        try:
+            capture_visuals(batch)
+        except Exception as e:
+            print(f"Failed to capture {len(batch)} comment visuals ({e})")
+            failed += batch
+
+
+def produce_comment_media(comment_media, save_audio, capture_visuals, tts_workers: int = 1,
+                          queue_size: int = 16, batch_size: int = 10, save_audio_batch=None,
+                          tts_batch_size: int = 16) -> list[CommentMedia]:
+    """Creates the missing audio and visuals of comments concurrently.
+    save_audio(text, path) is called on up to tts_workers threads, or if save_audio_batch
+    is given it is called with lists of up to tts_batch_size (text, path) items and returns
+    a result with an error (or None) per item.
+    capture_visuals(batch) is called on one thread with up to batch_size CommentMedia.
+    Returns the comments whose audio or visual failed"""
+    failed = []
+
+    visual_queue = Queue(maxsize=queue_size)
+    visual_thread = Thread(target=capture_visuals_worker, args=(
+        visual_queue, capture_visuals, batch_size, failed), daemon=True)
+    visual_thread.start()
+
+    tts_slots = BoundedSemaphore(queue_size)
+    tts_jobs = []
+    tts_batch = []
+    # a batch can't wait on more slots than there are
+    tts_batch_size = max(1, min(tts_batch_size, queue_size))
+
+    def release_slots(batch):
+        for _ in batch:
+            tts_slots.release()
+
+    def submit_tts_batch():
+        batch = tts_batch[:]
+        tts_batch.clear()
+
+        future = executor.submit(
+            save_audio_batch, [(media.comment.body, media.audio_path) for media in batch])
+        future.add_done_callback(lambda _: release_slots(batch))
+        tts_jobs.append((batch, future))
+
+    with ThreadPoolExecutor(max_workers=tts_workers) as executor:
+        try:
+            for media in comment_media:
+                # sometimes we might have these in cache already
+                if not is_file(media.audio_path):
+                    tts_slots.acquire()
+
+                    if save_audio_batch is not None:
+                        tts_batch.append(media)
+
+                        if len(tts_batch) >= tts_batch_size:
+                            submit_tts_batch()
+                    else:
+                        future = executor.submit(
+                            save_audio, media.comment.body, media.audio_path)
+                        future.add_done_callback(lambda _: tts_slots.release())
+                        tts_jobs.append(([media], future))
+
+                if not is_file(media.visual_path):
+                    visual_queue.put(media)
+
+            if len(tts_batch) > 0:
+                submit_tts_batch()
+        finally:
+            visual_queue.put(None)
+            visual_thread.join()
+
+    for batch, future in tts_jobs:
+        if future.exception() is not None:
+            errors = [future.exception()] * len(batch)
+        elif save_audio_batch is not None:
+            errors = [result.error for result in future.result()]
+        else:
+            errors = [None]
+
+        for media, error in zip(batch, errors):
+            if error is not None:
+                print(f"Failed to create audio for comment {media.comment.id} ({error})")
+                failed.append(media)
+
+    return failed
@@ -1,57 +1,140 @@
 import logging
 import time
 
-from os.path import isfile as is_file
-from os.path import join as path_join
-from multiprocessing.pool import Pool
 from sys import exit as exit_program
 
-from praw.models.reddit.submission import Submission
 from tqdm import tqdm
 from proglog import default_bar_logger
 
 from reddit_to_video.scraping.validator import get_clip_service_from_url, get_urls_from_string, ClipService
 from reddit_to_video.scraping.scraper import download_reddit_video, download_by_service
+from reddit_to_video.scraping.scheduler import DownloadScheduler, DownloadJob
+from reddit_to_video.scraping.probe import ProbeResult, probe_post, check_probe
+from reddit_to_video.scraping.reddit_media import get_reddit_media_plan, download_reddit_video_plan
 from reddit_to_video.video.compose import composeVideoVideo
 from reddit_to_video.video.scriptelement import ScriptElement
 from reddit_to_video.video.script import VideoScript
+from reddit_to_video.video.packer import ScriptPacker
+from reddit_to_video.video.ingest import Ingestor, IngestProfile
 from reddit_to_video.video.config import VideoConfig
 from reddit_to_video.prompts import prompt_bool, prompt_write_file, prompt_preview_vid
-from reddit_to_video.exceptions import ScriptElementTooLongError
+from reddit_to_video.exceptions import ScriptElementTooLongError, EmptyCollectionError, DownloadCancelledError
+from reddit_to_video.exceptions import DurationTooLongError, FileTooLargeError
 from reddit_to_video.logging.handle import setup_logging, remove_logger
+from reddit_to_video.records import PostRecord
+from reddit_to_video.store import get_media_store, get_footage
 
 
-POST_VIDEO_OUTPUT = "output/posts/"
+def get_post_clip_url(post: PostRecord) -> str:
+    """Returns the url of a post's clip, the first url in its text for text posts.
+    Returns None if a text post has no urls"""
+    if post.selftext == "":
+        return post.url
 
+    urls = get_urls_from_string(post.selftext)
 
-def get_video_from_post(post: Submission) -> ScriptElement:
-    """Gets a video from a post"""
-    output_path = path_join(POST_VIDEO_OUTPUT, f"{post.id}.mp4")
+    if urls == []:
+        return None
+
+    return urls[0]
+
+
+def get_post_clip_service(post: PostRecord) -> ClipService:
+    """Returns the service a post's clip is downloaded from"""
+    if post.reddit_video or post.is_self:
+        return ClipService.REDDIT
+
+    url = get_post_clip_url(post)
+
+    if url is None:
+        return ClipService.NONE
+
+    return get_clip_service_from_url(url)
+
+
+def get_post_clip_duration(post: PostRecord) -> float:
+    """Returns the duration of a post's clip if reddit's metadata has it, otherwise None"""
+    plan = get_reddit_media_plan(post)
+
+    if plan is None or not plan.is_video:
+        return None
+
+    return plan.duration
+
+
+def is_clip_rejected(post: PostRecord, url: str, clip_service: ClipService,
+                     max_duration: float = None, max_size_mb: float = None) -> bool:
+    """Probes a post's clip before it is downloaded, returning True if it is too long or too big.
+    Clips already in the media store or that can't be probed aren't rejected"""
+    if max_duration is None and max_size_mb is None:
+        return False
+
+    if get_media_store().get(url) is not None:
+        return False
+
+    try:
+        # the size needs an extra request for reddit videos, only ask for it when it's used
+        if max_size_mb is None and post.reddit_video and post.reddit_video.get("duration"):
+            result = ProbeResult(duration=post.reddit_video["duration"])
+        else:
+            result = probe_post(post, url, clip_service)
+    except Exception as e:
+        logging.info(
+            f"Post ({post.id}, {post.title}) couldn't be probed, downloading anyway ({e})")
+        return False
+
+    try:
+        check_probe(result, max_duration, max_size_mb)
+    except (DurationTooLongError, FileTooLargeError) as e:
+        logging.info(
+            f"Post ({post.id}, {post.title}) skipped before downloading ({e})")
+        return True
+
+    return False
 
-    if is_file(output_path):
-        return ScriptElement(post.title, output_path, None)
+
+def get_video_from_post(post: PostRecord, max_duration: float = None, max_size_mb: float = None) -> ScriptElement:
+    """Gets a video from a post, downloading it into the media store if it isn't there.
+    Clips longer than max_duration or bigger than max_size_mb are skipped before downloading
+    when their duration or size can be found without downloading them"""
+    store = get_media_store()
+
+    plan = get_reddit_media_plan(post)
+
+    if plan is not None and plan.is_video:
+        if is_clip_rejected(post, post.url, ClipService.REDDIT, max_duration, max_size_mb):
+            return None
+
+        try:
+            output_path = store.fetch(
+                post.url, lambda path: download_reddit_video_plan(plan, path))
+
+            return ScriptElement(post.title, output_path, None)
+        except DownloadCancelledError:
+            raise
+        except Exception as e:
+            logging.warning(
+                f"Post ({post.id}, {post.title}) failed to download from its metadata, trying redvid ({e})")
 
     if post.is_self:
         try:
-            download_reddit_video(post.url, output_path)
+            output_path = store.fetch(
+                post.url, lambda path: download_reddit_video(post.url, path))
 
             return ScriptElement(post.title, output_path, output_path, None)
+        except DownloadCancelledError:
+            raise
         except Exception:
             logging.info(
                 f"Post ({post.id}, {post.title}) is not a reddit video")
             return None
 
-    url = post.url
+    url = get_post_clip_url(post)
 
-    if post.selftext != "":
-        urls = get_urls_from_string(post.selftext)
-
-        if urls != []:
-            url = urls[0]
-        else:
-            logging.warning(
-                f"Post ({post.id}, {post.title}) has no urls in its text")
-            return None
+    if url is None:
+        logging.warning(
+            f"Post ({post.id}, {post.title}) has no urls in its text")
+        return None
 
     clip_service = get_clip_service_from_url(url)
 
@@ -60,8 +143,15 @@ def get_video_from_post(post: Submission) -> ScriptElement:
             f"Post ({post.id}, {post.title}, {url}) has no supported clip service")
         return None
 
+    if is_clip_rejected(post, url, clip_service, max_duration, max_size_mb):
+        return None
+
+    # keyed by the clip url so cross posts of the same clip share one download
     try:
-        download_by_service(url, clip_service, output_path)
+        output_path = store.fetch(
+            url, lambda path: download_by_service(url, clip_service, path))
+    except DownloadCancelledError:
+        raise
     except Exception as e:
         logging.error(
             f"Post ({post.id}, {post.title}) failed to download from {clip_service.value}. ({e})")
@@ -70,47 +160,148 @@ def get_video_from_post(post: Submission) -> ScriptElement:
     return ScriptElement(post.title, output_path, None)
 
 
-def handle_video_post(posts, config_settings: VideoConfig, end_card_footage: str = None, video_break_footage: str = None):
+def create_ingestor(config_settings: VideoConfig) -> Ingestor:
+    """Returns an Ingestor for a config's output profile,
+    or None if the config doesn't ingest clips or has no target resolution"""
+    if not config_settings.settings.ingest or not config_settings.has_setting("target_resolution"):
+        return None
+
+    target_resolution = config_settings.settings.target_resolution
+
+    return Ingestor(IngestProfile.from_export_settings(
+        target_resolution.width, target_resolution.height, config_settings.export_settings))
+
+
+def use_ingested_clips(ingestor: Ingestor, elements: list[ScriptElement]) -> bool:
+    """Points script elements at their ingested clips, waiting for them to finish.
+    Returns True if every clip was ingested, so the script can be joined without re-encoding"""
+    ingested_all = True
+
+    # a video break is shared by every pair, it is only ingested once
+    for element in {id(element): element for element in elements}.values():
+        ingested_path = ingestor.get(element.visual_path)
+
+        if ingested_path is None:
+            ingested_all = False
+        else:
+            element.visual_path = ingested_path
+
+    return ingested_all
+
+
+def handle_video_post(posts, config_settings: VideoConfig, end_card_footage: str = None, video_break_footage: str = None, output_location: str = None) -> str:
+    """Handles a video post. Posts can be a list of PostRecords or a generator over a listing.
+    If an output location is given the video is rendered without prompting the user,
+    otherwise the user is asked for choices"""
+    interactive = output_location is None
+
     script_elements = []
 
     video_break_element = None
     end_card_element = None
 
     if video_break_footage is not None:
-        video_break_element = ScriptElement("", video_break_footage, None)
+        video_break_element = ScriptElement(
+            "", get_footage(video_break_footage), None)
     if end_card_footage is not None:
-        end_card_element = ScriptElement("", end_card_footage, None)
+        end_card_element = ScriptElement(
+            "", get_footage(end_card_footage), None)
 
-    posts = list(posts)
+    max_video_length = config_settings.settings.max_video_length
+    max_video_size_mb = config_settings.settings.max_video_size_mb
+    max_length = config_settings.settings.max_length
 
-    print(f"Getting videos from {len(posts)} posts on 10 threads...")
+    # clips are transcoded to the output's profile while the others download
+    ingestor = create_ingestor(config_settings)
 
-    setup_logging()
+    if ingestor is not None:
+        for element in [end_card_element, video_break_element]:
+            if element is not None:
+                ingestor.submit(element.visual_path)
 
-    with tqdm(total=len(posts)) as pbar:
-        with Pool(processes=10) as pool:
-            for post in pool.imap_unordered(get_video_from_post, posts):
-                pbar.update(1)
+    reserved = 0
 
-                if post is None:
-                    continue
+    if end_card_element is not None and end_card_element.duration <= max_length:
+        reserved = end_card_element.duration
 
-                if post.duration > config_settings.settings.max_video_length:
+    packer = ScriptPacker(max_length, reserved=reserved,
+                          clip_overhead=video_break_element.duration if video_break_element is not None else 0,
+                          default_estimate=max_video_length / 2)
+
+    def admit(job: DownloadJob) -> bool:
+        return packer.wants_more([running.duration for running in scheduler.running])
+
+    scheduler = DownloadScheduler(admit=admit)
+
+    print(
+        f"Getting videos from posts, {scheduler.max_concurrent} at a time...")
+
+    setup_logging()
+
+    # posts can be a generator over the listing, jobs are made as its pages arrive
+    # and better ranked posts start downloading first
+    jobs = (DownloadJob(rank, get_video_from_post, (post, max_video_length, max_video_size_mb),
+                        get_post_clip_service(post), get_post_clip_duration(post))
+            for rank, post in enumerate(posts))
+
+    with tqdm(total=len(posts) if hasattr(posts, "__len__") else config_settings.settings.limit) as pbar:
+        def pack_video(job: DownloadJob, pbar: tqdm):
+            if job.result.duration > max_video_length:
+                pbar.write(
+                    (f"Post ({job.result.text}) is too long, "
+                     f"skipping ({job.result.duration} seconds)"))
+                return
+
+            if not packer.add(job.rank, job.result):
+                pbar.write(
+                    f"Post ({job.result.text}) doesn't fit in the script, skipping")
+            elif ingestor is not None:
+                ingestor.submit(job.result.visual_path)
+
+        def on_finished(job: DownloadJob):
+            pbar.update(1)
+
+            if job.error is not None:
+                pbar.write(f"Failed to get video ({job.error})")
+            if job.succeeded and job.result is not None:
+                pack_video(job, pbar)
+
+            outstanding = [other for other in scheduler.pending + scheduler.running
+                           if not other.cancelled]
+
+            if packer.full:
+                if len(outstanding) > 0:
                     pbar.write(
-                        (f"Post ({post.text}) is too long, "
-                         f"skipping ({post.duration} seconds)"))
-                    continue
+                        f"Script is full, cancelling {len(outstanding)} downloads")
+                    scheduler.cancel_all()
+                return
+
+            # the space left only shrinks, clips known to be too long for it never fit
+            for other in outstanding:
+                if other.duration is not None and not packer.fits(other.duration):
+                    scheduler.cancel(other)
+
+        scheduler.run(jobs, on_finished)
 
-                if video_break_element is not None:
-                    script_elements.append((post, video_break_element))
-                else:
-                    script_elements.append(post)
+    if scheduler.feed_error is not None:
+        print(f"Stopped loading posts ({scheduler.feed_error})")
+
+    # keep the listing's order instead of the order downloads finished in
+    for element in packer.elements:
+        if video_break_element is not None:
+            script_elements.append((element, video_break_element))
+        else:
+            script_elements.append(element)
 
     remove_logger()
 
     print("Finished getting videos from posts")
 
     if len(script_elements) == 0:
+        if not interactive:
+            raise EmptyCollectionError(
+                "handle_video_post() no videos found in posts")
+
         print("No videos found, exiting...")
         exit_program(0)
 
@@ -119,10 +310,7 @@ def handle_video_post(posts, config_settings: VideoConfig, end_card_footage: str
     try:
         script.add_script_element(end_card_element, True)
     except ScriptElementTooLongError:
-        prompt_continue = prompt_bool(
-            "End card too big, do you want to continue? (y/n): ")
-
-        if not prompt_continue:
+        if interactive and not prompt_bool("End card too big, do you want to continue? (y/n): "):
             exit_program(0)
 
         print("Skipping end card...")
@@ -134,13 +322,22 @@ def handle_video_post(posts, config_settings: VideoConfig, end_card_footage: str
     if not script.finished:
         print(
             f"Script not finished, with duration of {script.cur_length} seconds.")
-        proceed = prompt_bool("Do you still want to continue? (y/n): ")
 
-        if not proceed:
+        if interactive and not prompt_bool("Do you still want to continue? (y/n): "):
             print("Exiting...")
             exit_program(0)
 
-    output_location = prompt_write_file("Output location: ", overwrite=True)
+    if interactive:
+        output_location = prompt_write_file(
+            "Output location: ", overwrite=True)
+
+    stream_copy = False
+
+    if ingestor is not None:
+        print("Waiting for clips to be ingested...")
+
+        with ingestor:
+            stream_copy = use_ingested_clips(ingestor, script.all)
 
     target_resolution = None
 
@@ -153,8 +350,12 @@ def handle_video_post(posts, config_settings: VideoConfig, end_card_footage: str
                       target_resolution=(
                           target_resolution.width, target_resolution.height),
                       export_settings=config_settings.export_settings,
-                      logger=default_bar_logger('bar'))
+                      logger=default_bar_logger('bar'),
+                      stream_copy=stream_copy)
 
     print(f"Finished exporting video in {time.time() - start_time} seconds")
 
-    prompt_preview_vid(output_location)
+    if interactive:
+        prompt_preview_vid(output_location)
+
+    return output_location
@@ -0,0 +1,86 @@
+"""Renders a video config from fetching posts to exporting the video
+
+Functions:
+    select_post(posts: list[PostRecord], policy: str) -> PostRecord:
+        Selects a post from a listing using a post selection policy
+
+    render_config(reddit, config: VideoConfig, output_location: str = None, post_policy: str = None) -> str:
+        Fetches the posts for a config and renders its video
+"""
+
+from random import choice as random_choice
+
+from reddit_to_video.video.config import VideoConfig
+from reddit_to_video.prompts import prompt_list
+from reddit_to_video.records import PostRecord
+from reddit_to_video.exceptions import EmptyCollectionError
+
+post_policies = ["first", "top_score", "most_comments", "random"]
+
+
+def select_post(posts: list[PostRecord], policy: str) -> PostRecord:
+    """Selects a post from a listing using a post selection policy"""
+    posts = list(posts)
+
+    if len(posts) == 0:
+        raise EmptyCollectionError("select_post() no posts to select from")
+
+    if policy == "first":
+        return posts[0]
+    if policy == "top_score":
+        return max(posts, key=lambda post: post.score)
+    if policy == "most_comments":
+        return max(posts, key=lambda post: post.num_comments)
+    if policy == "random":
+        return random_choice(posts)
+
+    raise ValueError(f"select_post() unknown post policy {policy}")
+
+
+def render_config(reddit, config: VideoConfig, output_location: str = None, post_policy: str = None) -> str:
+    """Fetches the posts for a config and renders its video.
+    If an output location is given nothing is prompted and the post is
+    chosen with the post policy, otherwise the user is asked for choices"""
+    interactive = output_location is None
+
+    if config.settings["type"].lower() == "comment":
+        from reddit_to_video.handlers.comment import handle_comment_post
+
+        posts = reddit.get_top_posts(config.settings.subreddit, limit=10)
+
+        if interactive:
+            chosen_post = prompt_list(
+                list(map(lambda post: (post.title, post), posts)), "Select a post: ")
+        else:
+            chosen_post = select_post(posts, post_policy)
+
+        return handle_comment_post(chosen_post, config, reddit, output_location=output_location)
+
+    if config.settings["type"].lower() == "video":
+        from reddit_to_video.handlers.posts import handle_video_post
+
+        # the listing is read lazily so downloads start after its first page
+        posts = reddit.iter_top_posts(
+            config.settings.subreddit,
+            limit=config.settings.limit,
+            time_filter=config.settings.time)
+
+        end_card_footage = None
+
+        if config.has_setting("end_card_footage"):
+            end_card_footage = config.settings["end_card_footage"]
+
+        video_break_footage = None
+
+        if config.has_setting("video_break_footage"):
+            video_break_footage = config.settings["video_break_footage"]
+
+        return handle_video_post(
+            posts,
+            config,
+            end_card_footage=end_card_footage,
+            video_break_footage=video_break_footage,
+            output_location=output_location)
+
+    raise ValueError(
+        f"render_config() unknown video type {config.settings['type']}")
@@ -5,6 +5,8 @@ Classes:
 
 Functions:
     concat_comment_id: Concatenates a comment id with the prefix "t1_"
+    plan_captures: Groups element rects into as few viewport captures as possible
+    crop_rect: Crops an element rect out of a page capture
 
 Example:
     >>> from reddit_to_video.post import Post
@@ -16,18 +18,24 @@ Example:
     >>> post.download_image("output")
     'output/post - 1.png'
     >>> post.screenshot_comment("g4q7xu", "output")
-    'output/comment - 1.png'
+    'output/comment - g4q7xu.png'
+    >>> post.screenshot_comments(["g4q7xu", "g4q8ab"], "output")
+    ['output/comment - g4q7xu.png', 'output/comment - g4q8ab.png']
 
 Todo:
     * Refactor this class to be more readable, detect images automatically
 """
 
+from io import BytesIO
 from os.path import join as path_join
 
-from selenium import webdriver
+from PIL import Image
 from selenium.webdriver.common.by import By
 
 from reddit_to_video.utility import download_img
+from reddit_to_video.records import PostRecord
+from reddit_to_video.scraping.browser import BrowserPool, get_browser_pool
+from reddit_to_video.scraping.reddit_media import get_reddit_media_plan, download_reddit_image_plan
 from reddit_to_video.exceptions import NoImageError, ScrapingError
 
 
@@ -35,22 +43,85 @@ def concat_comment_id(comment_id: str) -> str:
     """Concatenates a comment id with the prefix "t1_"""
     return f"t1_{comment_id}"
 
+
+# returns the page position of every requested element in one round trip
+GET_RECTS_SCRIPT = """
+const rects = {};
+for (const id of arguments[0]) {
+    const element = document.getElementById(id);
+    if (element === null) continue;
+    const rect = element.getBoundingClientRect();
+    rects[id] = {x: rect.left + window.scrollX, y: rect.top + window.scrollY,
+                 width: rect.width, height: rect.height};
+}
+return {rects: rects, scale: window.devicePixelRatio, viewport_height: window.innerHeight};
+"""
+
+SCROLL_SCRIPT = "window.scrollTo(0, arguments[0]); return window.scrollY;"
+
+
+def plan_captures(rects: dict, viewport_height: float) -> list[tuple[float, list[str]]]:
+    """Groups element rects into as few viewport captures as possible.
+    Returns a list of (scroll position, element ids) for each capture.
+    Elements taller than the viewport are left out"""
+    captures = []
+
+    for rect_id, rect in sorted(rects.items(), key=lambda item: item[1]["y"]):
+        if rect["height"] > viewport_height:
+            continue
+
+        if len(captures) > 0 and rect["y"] + rect["height"] <= captures[-1][0] + viewport_height:
+            captures[-1][1].append(rect_id)
+            continue
+
+        captures.append((rect["y"], [rect_id]))
+
+    return captures
+
+
+def crop_rect(capture: Image.Image, rect: dict, scroll_y: float, scale: float) -> Image.Image:
+    """Crops an element rect out of a page capture taken at a scroll position"""
+    return capture.crop((
+        round(rect["x"] * scale),
+        round((rect["y"] - scroll_y) * scale),
+        round((rect["x"] + rect["width"]) * scale),
+        round((rect["y"] - scroll_y + rect["height"]) * scale)))
+
 # TODO: Refactor this class to be more readable, detect images automatically
 
 
 class Post:
-    """Represents a reddit post and opens it in selenium"""
+    """Represents a reddit post and opens it in selenium.
+    The browser is only acquired and the page opened once something needs it"""
 
-    def __init__(self, url: str, post_id: int, has_image: bool = False):
+    def __init__(self, url: str, post_id: int, has_image: bool = False, pool: BrowserPool = None,
+                 record: PostRecord = None):
+        """Initialises the post. If the post's record is given its image is
+        downloaded from the API metadata instead of scraped from the page"""
         self.post_id = post_id
         self._has_image = has_image
-        self.driver = webdriver.Firefox()
-        self.url = url
+        self.pool = pool
+        self.record = record
+
+        if self.pool is None:
+            self.pool = get_browser_pool("firefox")
+
+        self._driver = None
+        self._url = url
+
+    @property
+    def driver(self):
+        """Returns the selenium driver, acquiring one and opening the post the first time"""
+        if self._driver is None:
+            self._driver = self.pool.acquire()
+            self._driver.get(self.url)
+
+        return self._driver
 
     @property
     def has_image(self) -> bool:
         """Returns True if the post has an image, False otherwise"""
-        return self._has_image
+        return self._has_image or self.get_image_plan() is not None
 
     @property
     def url(self) -> str:
@@ -59,19 +130,41 @@ class Post:
 
     @url.setter
     def url(self, url: str):
-        """Sets the url of the post and opens it in selenium"""
+        """Sets the url of the post and opens it in selenium if the browser is open"""
         self._url = url
-        self.driver.get(url)
+
+        if self._driver is not None:
+            self._driver.get(url)
+
+    def get_image_plan(self):
+        """Returns the media plan of the post's image from its record, or None if it has none"""
+        if self.record is None:
+            return None
+
+        plan = get_reddit_media_plan(self.record)
+
+        if plan is None or plan.image_url is None:
+            return None
+
+        return plan
 
     def reload(self):
         """Reloads the post in selenium"""
         self.driver.get(self.url)
 
     def download_image(self, output_dir: str) -> str:
-        """Downloads the image of the post to the output directory"""
+        """Downloads the image of the post to the output directory.
+        The image's url comes from the post's metadata, the page is only
+        scraped if the metadata has no image"""
         if not self.has_image:
             raise NoImageError("download_image() Post has no image")
 
+        plan = self.get_image_plan()
+
+        if plan is not None:
+            return download_reddit_image_plan(
+                plan, path_join(output_dir, f"post - {self.post_id}.png"))
+
         post_content = self.driver.find_element(By.XPATH,
                                                 "//div[@data-test-id='post-content']")
 
@@ -118,9 +211,52 @@ class Post:
         return destination
 
     def screenshot_comments(self, comment_ids: list[str], output_dir: str) -> list:
-        """Screenshots a list of comments to the output directory"""
-        return [self.screenshot_comment(comment_id, path_join(
-            output_dir, f"comment - {comment_id}.png")) for comment_id in comment_ids]
+        """Screenshots a list of comments to the output directory.
+        Every comment is cropped from one full page capture, or a few scrolled captures
+        if the browser can't capture the full page. Comments not on the page are skipped"""
+        if len(comment_ids) == 0:
+            return []
+
+        element_ids = {concat_comment_id(
+            comment_id): comment_id for comment_id in comment_ids}
+
+        page = self.driver.execute_script(
+            GET_RECTS_SCRIPT, list(element_ids.keys()))
+        rects = page["rects"]
+
+        destinations = {}
+
+        def save_crop(capture, element_id, scroll_y):
+            destination = path_join(
+                output_dir, f"comment - {element_ids[element_id]}.png")
+            crop_rect(capture, rects[element_id], scroll_y,
+                      page["scale"]).save(destination)
+            destinations[element_id] = destination
+
+        if hasattr(self.driver, "get_full_page_screenshot_as_png"):
+            # firefox can capture the whole page at once
+            capture = Image.open(BytesIO(
+                self.driver.get_full_page_screenshot_as_png()))
+
+            for element_id in rects:
+                save_crop(capture, element_id, 0)
+        else:
+            for scroll_y, capture_ids in plan_captures(rects, page["viewport_height"]):
+                # the page can't scroll past the bottom, so use the position it ended at
+                scroll_y = self.driver.execute_script(SCROLL_SCRIPT, scroll_y)
+                capture = Image.open(BytesIO(
+                    self.driver.get_screenshot_as_png()))
+
+                for element_id in capture_ids:
+                    save_crop(capture, element_id, scroll_y)
+
+            # elements taller than the viewport
+            for element_id in rects:
+                if element_id not in destinations:
+                    destinations[element_id] = self.screenshot_comment(
+                        element_ids[element_id], output_dir)
+
+        return [destinations[element_id] for element_id in element_ids if element_id in destinations]
 
     def screenshot_title(self, output_path: str):
         """Screenshots the title of the post"""
@@ -130,5 +266,7 @@ class Post:
         title.screenshot(output_path)
 
     def close(self):
-        """Closes the selenium driver"""
-        self.driver.close()
+        """Gives the selenium driver back to the pool for the next post"""
+        if self._driver is not None:
+            self.pool.release(self._driver)
+            self._driver = None
@@ -0,0 +1,153 @@
+"""Compact records of reddit posts and comments used throughout the pipeline
+
+praw objects are lazy, every attribute access can trigger another API request and pickling
+them for worker processes is expensive. Records copy the fields the pipeline uses once,
+are cheap to pickle and cache, and can be created without praw for testing.
+
+Classes:
+    PostRecord: The fields used from a reddit submission
+    CommentRecord: The fields used from a reddit comment
+
+Example:
+    >>> from reddit_to_video.records import PostRecord
+    >>> record = PostRecord.from_submission(submission)
+    >>> PostRecord.from_dict(record.to_dict()) == record
+    True
+"""
+
+from dataclasses import dataclass, fields
+
+
+def get_name(reddit_object) -> str:
+    """Returns the name of a praw redditor or subreddit, or None if it was deleted"""
+    if reddit_object is None:
+        return None
+
+    return str(reddit_object)
+
+
+def get_media_source(submission):
+    """Returns the submission a post's media comes from, the original post for crossposts"""
+    crossposts = getattr(submission, "crosspost_parent_list", None)
+
+    if getattr(submission, "media", None) is None and crossposts:
+        return crossposts[0]
+
+    return submission
+
+
+def get_reddit_video(submission) -> dict:
+    """Returns the reddit_video metadata of a submission, or None if it isn't a reddit video"""
+    source = get_media_source(submission)
+
+    if isinstance(source, dict):
+        media = source.get("secure_media") or source.get("media")
+    else:
+        media = getattr(source, "secure_media", None) or getattr(
+            source, "media", None)
+
+    if not media:
+        return None
+
+    return media.get("reddit_video")
+
+
+def get_preview_url(submission) -> str:
+    """Returns the url of a submission's full size preview image, or None if it has none"""
+    source = get_media_source(submission)
+
+    if isinstance(source, dict):
+        preview = source.get("preview")
+    else:
+        preview = getattr(source, "preview", None)
+
+    try:
+        return preview["images"][0]["source"]["url"]
+    except (TypeError, KeyError, IndexError):
+        return None
+
+
+class Record:
+    """Base class for records, converting them to and from json compatible dicts"""
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        """Returns the record as a json compatible dict"""
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Creates a record from a dict, fields missing from the dict are None"""
+        return cls(**{field.name: data.get(field.name) for field in fields(cls)})
+
+
+@dataclass
+class PostRecord(Record):
+    """The fields used from a reddit submission"""
+    __slots__ = ("id", "title", "url", "permalink", "selftext", "is_self", "score",
+                 "num_comments", "author", "subreddit", "created_utc", "over_18",
+                 "total_awards", "is_video", "reddit_video", "preview_url")
+
+    id: str
+    title: str
+    url: str
+    permalink: str
+    selftext: str
+    is_self: bool
+    score: int
+    num_comments: int
+    author: str
+    subreddit: str
+    created_utc: float
+    over_18: bool
+    total_awards: int
+    # media metadata so reddit hosted media can be downloaded without scraping the post
+    is_video: bool
+    reddit_video: dict
+    preview_url: str
+
+    @classmethod
+    def from_submission(cls, submission):
+        """Creates a record from a praw submission"""
+        return cls(
+            id=submission.id,
+            title=submission.title,
+            url=submission.url,
+            permalink=submission.permalink,
+            selftext=submission.selftext,
+            is_self=submission.is_self,
+            score=submission.score,
+            num_comments=submission.num_comments,
+            author=get_name(submission.author),
+            subreddit=get_name(submission.subreddit),
+            created_utc=submission.created_utc,
+            over_18=submission.over_18,
+            total_awards=submission.total_awards_received,
+            is_video=getattr(submission, "is_video", False),
+            reddit_video=get_reddit_video(submission),
+            preview_url=get_preview_url(submission))
+
+
+@dataclass
+class CommentRecord(Record):
+    """The fields used from a reddit comment"""
+    __slots__ = ("id", "body", "author", "score",
+                 "created_utc", "total_awards")
+
+    id: str
+    body: str
+    author: str
+    score: int
+    created_utc: float
+    total_awards: int
+
+    @classmethod
+    def from_comment(cls, comment):
+        """Creates a record from a praw comment"""
+        return cls(
+            id=comment.id,
+            body=comment.body,
+            author=get_name(comment.author),
+            score=comment.score,
+            created_utc=comment.created_utc,
+            total_awards=comment.total_awards_received)
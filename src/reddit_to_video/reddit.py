@@ -4,22 +4,47 @@ This module contains the Reddit class,
 which is a wrapper for the praw wrapper of the Reddit API. 
 This class is used to get posts from Reddit.
 
+Listings and comments are returned as PostRecord and CommentRecord objects,
+so they can be stored in a DiskCache and reruns don't cost any API requests.
+Listings can also be iterated lazily, one page of requests at a time, so posts can be
+used as they arrive instead of after the whole listing has loaded. The posts read from a
+listing that is stopped early are cached too, and the next read continues after them.
+
 Classes:
     Reddit: A wrapper for the praw wrapper of the Reddit API
+
+Functions:
+    get_listing_params(posts: list) -> dict:
+        Returns the listing params that continue a listing after the posts already read
 """
 import logging
+from time import time
+
 import praw
 
+from reddit_to_video.cache import DiskCache
+from reddit_to_video.records import PostRecord, CommentRecord
+
+
+def get_listing_params(posts: list) -> dict:
+    """Returns the listing params that continue a listing after the posts already read"""
+    if len(posts) == 0:
+        return {}
+
+    return {"after": f"t3_{posts[-1]['id']}"}
+
 
 class Reddit:
     """A wrapper for the praw wrapper of the Reddit API"""
 
-    def __init__(self, client_id, client_secret, user_agent, debug=False):
-        """Initializes the Reddit wrapper"""
+    def __init__(self, client_id, client_secret, user_agent, debug=False, cache: DiskCache = None):
+        """Initializes the Reddit wrapper. Listings and comments are
+        stored in the cache if one is given"""
         self.client_id = client_id
         self.client_secret = client_secret
         self.user_agent = user_agent
         self.debug = debug
+        self.cache = cache
 
         if self.debug:
             self._load_logger()
@@ -41,13 +66,104 @@ class Reddit:
             logger.setLevel(logging.DEBUG)
             logger.addHandler(handler)
 
-    def get_top_posts(self, subreddit, time_filter="all", limit=10):
+    def _cached(self, key, fetch) -> list:
+        """Returns the cached value of a key, fetching and storing it if missing"""
+        if self.cache is None:
+            return fetch()
+
+        value = self.cache.get(key)
+
+        if value is None:
+            value = fetch()
+            self.cache.set(key, value)
+
+        return value
+
+    def _iter_cached(self, key, fetch):
+        """Yields the cached values of a key, or the values of fetch() as they arrive.
+        The values read are stored even if the listing is stopped early, and a later
+        read yields them and then carries on with fetch(values read so far).
+        Continuing a listing keeps the time it was first cached, so it still expires"""
+        cached = None
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+
+        # listings cached by older versions are lists, and were always complete
+        if isinstance(cached, list):
+            cached = {"values": cached, "complete": True}
+
+        # every write refreshes the cache file, so the ttl is checked from when it was created
+        if cached is not None and time() - cached.get("created", time()) > self.cache.ttl:
+            cached = None
+
+        values = []
+        complete = False
+        created = time()
+
+        if cached is not None:
+            yield from cached["values"]
+
+            if cached["complete"]:
+                return
+
+            values = list(cached["values"])
+            created = cached.get("created", created)
+
+        cached_count = len(values)
+
+        try:
+            for value in fetch(list(values)):
+                values.append(value)
+                yield value
+
+            complete = True
+        finally:
+            # also runs when the listing is closed early, so the pages read are kept
+            if self.cache is not None and (complete or len(values) > cached_count):
+                self.cache.set(key, {"values": values, "complete": complete, "created": created})
+
+    def iter_top_posts(self, subreddit, time_filter="all", limit=10):
+        """Yields the top posts from a subreddit as the listing's pages arrive"""
+        posts = self._iter_cached(
+            ("listing", subreddit.lower(), "top", time_filter, limit),
+            lambda read: (PostRecord.from_submission(submission).to_dict() for submission in
+                          self._reddit.subreddit(subreddit).top(
+                              time_filter=time_filter, limit=limit - len(read),
+                              params=get_listing_params(read))))
+
+        for post in posts:
+            yield PostRecord.from_dict(post)
+
+    def iter_hot_posts(self, subreddit, limit=10):
+        """Yields the hot posts from a subreddit as the listing's pages arrive"""
+        posts = self._iter_cached(
+            ("listing", subreddit.lower(), "hot", None, limit),
+            lambda read: (PostRecord.from_submission(submission).to_dict() for submission in
+                          self._reddit.subreddit(subreddit).hot(
+                              limit=limit - len(read), params=get_listing_params(read))))
+
+        for post in posts:
+            yield PostRecord.from_dict(post)
+
+    def get_top_posts(self, subreddit, time_filter="all", limit=10) -> list:
         """Gets the top posts from a subreddit"""
-        return self._reddit.subreddit(subreddit).top(time_filter=time_filter, limit=limit)
+        return list(self.iter_top_posts(subreddit, time_filter, limit))
 
-    def get_hot_posts(self, subreddit, limit=10):
+    def get_hot_posts(self, subreddit, limit=10) -> list:
         """Gets the hot posts from a subreddit"""
-        return self._reddit.subreddit(subreddit).hot(limit=limit)
+        return list(self.iter_hot_posts(subreddit, limit))
+
+    def get_comments(self, post_id: str) -> list:
+        """Gets the top level comments of a post, without loading "more comments" links"""
+        def fetch():
+            submission = self._reddit.submission(id=post_id)
+            submission.comments.replace_more(limit=0)
+            return [CommentRecord.from_comment(comment).to_dict() for comment in submission.comments]
+
+        comments = self._cached(("comments", post_id), fetch)
+
+        return [CommentRecord.from_dict(comment) for comment in comments]
 
     @property
     def user(self):
@@ -0,0 +1,244 @@
+"""Pools of reusable headless selenium web drivers
+
+Starting a browser takes seconds, so drivers are handed out from a bounded pool and given
+back when finished instead of being quit. Sessions are recycled after a number of uses to
+stop memory from building up, and the browsers are set up to skip ads, web fonts and media
+that screenshots and clip scraping don't need.
+
+Classes:
+    BrowserPool: A bounded pool of warm web drivers for one browser
+
+Functions:
+    create_driver(browser: str): Creates a new headless web driver with unneeded content blocked
+    get_browser_pool(browser: str) -> BrowserPool: Gets the shared pool for a browser
+    configure_browser_pools(max_size: int = None, max_uses: int = None): Sets the size and session reuse of new pools
+    close_browser_pools(): Quits every driver in the shared pools
+
+Example:
+    >>> from reddit_to_video.scraping.browser import get_browser_pool
+    >>> with get_browser_pool("chrome").session() as driver:
+    ...     driver.get("https://streamable.com/fpuv4")
+"""
+
+import atexit
+from contextlib import contextmanager
+from threading import Condition, Lock
+
+firefox_names = ["firefox"]
+chrome_names = ["chrome"]
+
+# each worker process has its own pools, so keep them small
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_USES = 25
+
+WINDOW_WIDTH = 1280
+WINDOW_HEIGHT = 1600
+
+
+def create_firefox_driver():
+    """Creates a headless firefox driver that skips web fonts, media and trackers"""
+    from selenium import webdriver
+
+    options = webdriver.FirefoxOptions()
+    options.add_argument("-headless")
+    options.add_argument(f"--width={WINDOW_WIDTH}")
+    options.add_argument(f"--height={WINDOW_HEIGHT}")
+
+    # ads and trackers
+    options.set_preference("browser.contentblocking.category", "strict")
+    options.set_preference("privacy.trackingprotection.enabled", True)
+    options.set_preference("dom.webnotifications.enabled", False)
+    # fonts and media, screenshots fall back to system fonts
+    options.set_preference("gfx.downloadable_fonts.enabled", False)
+    options.set_preference("media.autoplay.default", 5)
+    options.set_preference("media.mediasource.enabled", False)
+
+    return webdriver.Firefox(options=options)
+
+
+def create_chrome_driver():
+    """Creates a headless chrome driver that skips images, web fonts and media playback,
+    clip scraping only needs the page's <video> tag"""
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("headless")
+    options.add_argument("--mute-audio")
+    options.add_argument("--disable-remote-fonts")
+    options.add_argument("--autoplay-policy=user-gesture-required")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2
+    })
+
+    return webdriver.Chrome('chromedriver', chrome_options=options)
+
+
+def create_driver(browser: str):
+    """Creates a new headless web driver with unneeded content blocked"""
+    if browser in firefox_names:
+        return create_firefox_driver()
+    if browser in chrome_names:
+        return create_chrome_driver()
+
+    raise ValueError(f"create_driver() unknown browser {browser}")
+
+
+def is_driver_alive(driver) -> bool:
+    """Returns True if the driver's browser still responds, False otherwise"""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def quit_driver(driver) -> None:
+    """Quits a driver, ignoring browsers that have already crashed"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+class BrowserPool:
+    """A bounded pool of warm web drivers for one browser"""
+
+    def __init__(self, browser: str, max_size: int = DEFAULT_POOL_SIZE, max_uses: int = DEFAULT_MAX_USES, factory=None):
+        """Initialises the pool. The factory creates a new driver and defaults to create_driver"""
+        if max_size < 1:
+            raise ValueError("BrowserPool() max_size must be at least 1")
+
+        self.browser = browser
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.factory = factory
+
+        if self.factory is None:
+            self.factory = lambda: create_driver(self.browser)
+
+        self._idle = []
+        self._uses = {}
+        self._size = 0
+        self._condition = Condition()
+
+    @property
+    def size(self) -> int:
+        """Returns the number of drivers that are open, in use or idle"""
+        return self._size
+
+    def acquire(self, timeout: float = None):
+        """Takes a driver from the pool, starting one if the pool isn't full.
+        Blocks until a driver is released if the pool is full"""
+        with self._condition:
+            while True:
+                if len(self._idle) > 0:
+                    driver = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    driver = None
+                    break
+
+                if not self._condition.wait(timeout):
+                    raise TimeoutError(
+                        f"BrowserPool() no {self.browser} driver free after {timeout} seconds")
+
+        if driver is not None:
+            if is_driver_alive(driver):
+                return driver
+
+            # the browser crashed, replace it keeping its place in the pool
+            quit_driver(driver)
+            self._uses.pop(id(driver), None)
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        self._uses[id(driver)] = 0
+
+        return driver
+
+    def release(self, driver) -> None:
+        """Gives a driver back to the pool, quitting it once it has been used max_uses times"""
+        self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+
+        if self._uses[id(driver)] >= self.max_uses:
+            self.discard(driver)
+            return
+
+        with self._condition:
+            self._idle.append(driver)
+            self._condition.notify()
+
+    def discard(self, driver) -> None:
+        """Quits a driver and frees its place in the pool"""
+        quit_driver(driver)
+        self._forget(driver)
+
+    def _forget(self, driver) -> None:
+        with self._condition:
+            self._uses.pop(id(driver), None)
+            self._size -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def session(self, timeout: float = None):
+        """Context manager that acquires a driver and releases it afterwards"""
+        driver = self.acquire(timeout)
+
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self) -> None:
+        """Quits every idle driver, drivers in use are quit when released"""
+        with self._condition:
+            drivers = self._idle
+            self._idle = []
+            self.max_uses = 0
+
+        for driver in drivers:
+            self.discard(driver)
+
+
+pool_settings = {"max_size": DEFAULT_POOL_SIZE, "max_uses": DEFAULT_MAX_USES}
+browser_pools = {}
+pools_lock = Lock()
+
+
+def configure_browser_pools(max_size: int = None, max_uses: int = None) -> None:
+    """Sets the size and session reuse of pools created after this call"""
+    if max_size is not None:
+        pool_settings["max_size"] = max_size
+    if max_uses is not None:
+        pool_settings["max_uses"] = max_uses
+
+
+def get_browser_pool(browser: str) -> BrowserPool:
+    """Gets the shared pool for a browser, creating it on first use"""
+    with pools_lock:
+        if browser not in browser_pools:
+            browser_pools[browser] = BrowserPool(browser, **pool_settings)
+
+        return browser_pools[browser]
+
+
+@atexit.register
+def close_browser_pools() -> None:
+    """Quits every driver in the shared pools"""
+    with pools_lock:
+        pools = list(browser_pools.values())
+        browser_pools.clear()
+
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,160 @@
+"""Streams downloads to disk in chunks, resuming interrupted downloads
+
+Files are written to a .part file next to the output and only renamed to the output once
+every byte has arrived, so a crashed run never leaves a truncated file that looks cached.
+If the connection drops the download continues from the end of the .part file with an
+HTTP Range request instead of starting again, and memory use stays at one chunk.
+Downloads use the shared session in transport and hold a slot for their host while streaming.
+
+Functions:
+    get_part_path(output: str) -> str:
+        Returns the path a download is written to before it is finished
+
+    download_file(url: str, output: str, chunk_size: int = CHUNK_SIZE, retries: int = 3,
+                  timeout: tuple = None, session=None) -> str:
+        Streams a url to a file, resuming from a partial download if there is one
+
+    finish_download(part_path: str, output: str) -> str:
+        Atomically moves a finished download to its output path
+
+    check_cancelled():
+        Raises DownloadCancelledError if the running download was cancelled
+
+Example:
+    >>> from reddit_to_video.scraping.download import download_file
+    >>> download_file("https://i.redd.it/qu2gqppixcta1.jpg", "output/posts/qu2gqppixcta1.jpg")
+    'output/posts/qu2gqppixcta1.jpg'
+"""
+
+from contextvars import ContextVar
+from os import remove as remove_file
+from os import replace as replace_file
+from os.path import getsize as get_size
+from os.path import isfile as is_file
+
+from reddit_to_video.scraping.transport import get_session, host_slot, transport_settings
+from reddit_to_video.exceptions import IncompleteDownloadError, DownloadCancelledError, ExpiredUrlError
+
+CHUNK_SIZE = 1024 * 1024
+
+# set by the download scheduler for each job, so a download can stop between chunks
+current_cancel_event = ContextVar("current_cancel_event", default=None)
+
+
+def check_cancelled() -> None:
+    """Raises DownloadCancelledError if the running download was cancelled"""
+    cancel_event = current_cancel_event.get()
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise DownloadCancelledError("check_cancelled() download was cancelled")
+
+
+def get_part_path(output: str) -> str:
+    """Returns the path a download is written to before it is finished"""
+    return output + ".part"
+
+
+def finish_download(part_path: str, output: str) -> str:
+    """Atomically moves a finished download to its output path"""
+    replace_file(part_path, output)
+    return output
+
+
+def get_total_size(response, offset: int) -> int:
+    """Returns the full size of the file a response is part of, or None if it isn't known"""
+    if response.status_code == 206:
+        # Content-Range: bytes 1000-1999/2000
+        content_range = response.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+
+        if total.isdigit():
+            return int(total)
+
+    content_length = response.headers.get("Content-Length")
+
+    # the length of compressed responses isn't the length of the decoded content
+    if response.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+
+    if content_length is None or not content_length.isdigit():
+        return None
+
+    return offset + int(content_length)
+
+
+def stream_response(url: str, part_path: str, chunk_size: int, timeout, session) -> None:
+    """Appends a url's content to a part file, continuing from the bytes already in it"""
+    offset = get_size(part_path) if is_file(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset > 0 else {}
+
+    response = session.get(url, stream=True, headers=headers, timeout=timeout)
+
+    try:
+        if response.status_code == 416 and offset > 0:
+            # nothing past the end of the part file, it's already complete
+            # unless the server says the file is a different size
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+
+            if total.isdigit() and int(total) != offset:
+                remove_file(part_path)
+                raise IncompleteDownloadError(
+                    f"download_file() part file of {url} is {offset} bytes but the file is {total}")
+
+            return
+
+        if response.status_code in [403, 410]:
+            # signed media urls are refused once their signature expires
+            raise ExpiredUrlError(
+                f"download_file() {url} response status code is {response.status_code}")
+
+        if response.status_code == 200:
+            # the server ignored the range, start again
+            offset = 0
+        elif response.status_code != 206 or offset == 0:
+            raise Exception(
+                f"download_file() response status code is {response.status_code}")
+
+        total_size = get_total_size(response, offset)
+
+        with open(part_path, "ab" if offset > 0 else "wb") as file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                # the part file is kept so the download can be resumed later
+                check_cancelled()
+                file.write(chunk)
+
+        if total_size is not None and get_size(part_path) != total_size:
+            raise IncompleteDownloadError(
+                f"download_file() got {get_size(part_path)} of {total_size} bytes from {url}")
+    finally:
+        response.close()
+
+
+def download_file(url: str, output: str, chunk_size: int = CHUNK_SIZE, retries: int = 3,
+                  timeout: tuple = None, session=None) -> str:
+    """Streams a url to a file, resuming from a partial download if there is one.
+    Dropped connections are retried from where they stopped up to retries times.
+    The timeout is (connect, read) seconds, the read timeout is between chunks.
+    Returns the output path"""
+    if session is None:
+        session = get_session()
+
+    if timeout is None:
+        timeout = transport_settings["timeout"]
+
+    # imported here so importing the scraping package stays fast
+    from requests.exceptions import ConnectionError, ChunkedEncodingError, Timeout
+
+    part_path = get_part_path(output)
+
+    for attempt in range(retries + 1):
+        check_cancelled()
+
+        try:
+            with host_slot(url):
+                stream_response(url, part_path, chunk_size, timeout, session)
+            break
+        except (ConnectionError, ChunkedEncodingError, Timeout, IncompleteDownloadError):
+            if attempt == retries:
+                raise
+
+    return finish_download(part_path, output)
@@ -0,0 +1,314 @@
+"""Finds a clip's duration and size before downloading it
+
+Clips that are too long or too big are only found after they are downloaded, so probing
+first saves downloading clips that are thrown away. Each probe uses the cheapest source
+that knows the answer: reddit's metadata, the Content-Length of a HEAD request, a HLS or
+DASH manifest, or the header (moov/mvhd box) of an mp4 read with small range requests.
+
+Classes:
+    ProbeResult(dataclass): The duration and size of a clip, None when they aren't known
+
+Functions:
+    probe_media_url(url: str) -> ProbeResult: Probes a direct media, HLS or DASH url
+    probe_post(post: PostRecord) -> ProbeResult: Probes a post's clip without downloading it
+    check_probe(result: ProbeResult, max_duration: float = None, max_size_mb: float = None):
+        Raises an error if a probed clip is too long or too big
+
+Example:
+    >>> from reddit_to_video.scraping.probe import probe_post, check_probe
+    >>> result = probe_post(post)
+    >>> result.duration, result.size
+    (28.0, 4718592)
+    >>> check_probe(result, max_duration=20)
+    DurationTooLongError: check_probe() clip is 28.0 seconds, the limit is 20
+"""
+
+import re
+import struct
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+from reddit_to_video.scraping.transport import get, get_session, host_slot, transport_settings
+from reddit_to_video.scraping.validator import ClipService, get_clip_service_from_url
+from reddit_to_video.records import PostRecord
+from reddit_to_video.exceptions import DurationTooLongError, FileTooLargeError, ScrapingError
+
+# bytes read per range request when looking for the mp4 header
+PROBE_CHUNK_SIZE = 64 * 1024
+# range requests made before giving up on finding the header
+MAX_PROBE_READS = 4
+
+iso_duration_pattern = re.compile(
+    r"P(?:(?P<days>[\d.]+)D)?(?:T(?:(?P<hours>[\d.]+)H)?(?:(?P<minutes>[\d.]+)M)?(?:(?P<seconds>[\d.]+)S)?)?")
+
+
+@dataclass
+class ProbeResult:
+    """The duration and size of a clip, None when they aren't known"""
+    duration: float = None
+    size: int = None
+
+    def merge(self, other):
+        """Returns a result with the known values of both, preferring this result's"""
+        return ProbeResult(
+            duration=self.duration if self.duration is not None else other.duration,
+            size=self.size if self.size is not None else other.size)
+
+
+def parse_iso_duration(text: str) -> float:
+    """Returns the seconds of an ISO 8601 duration, eg. PT1M2.5S, or None if it isn't one"""
+    match = iso_duration_pattern.fullmatch(text.strip())
+
+    if match is None:
+        return None
+
+    return (float(match.group("days") or 0) * 86400 + float(match.group("hours") or 0) * 3600
+            + float(match.group("minutes") or 0) * 60 + float(match.group("seconds") or 0))
+
+
+def parse_hls_duration(playlist: str) -> float:
+    """Returns the total duration of the segments in a HLS media playlist"""
+    return sum(float(line[len("#EXTINF:"):].split(",")[0])
+               for line in playlist.splitlines() if line.startswith("#EXTINF:"))
+
+
+def get_hls_variant_url(playlist: str, playlist_url: str) -> str:
+    """Returns the url of the highest bandwidth variant of a HLS master playlist,
+    or None if it is a media playlist"""
+    best_url = None
+    best_bandwidth = -1
+
+    lines = playlist.splitlines()
+
+    for i, line in enumerate(lines):
+        if not line.startswith("#EXT-X-STREAM-INF") or i + 1 >= len(lines):
+            continue
+
+        bandwidth = re.search(r"BANDWIDTH=(\d+)", line)
+        bandwidth = int(bandwidth.group(1)) if bandwidth else 0
+
+        if bandwidth > best_bandwidth:
+            best_url = urljoin(playlist_url, lines[i + 1].strip())
+            best_bandwidth = bandwidth
+
+    return best_url
+
+
+def get_text(url: str) -> str:
+    """Returns the text of a url, raising ScrapingError for failed responses"""
+    response = get(url)
+
+    if response.status_code != 200:
+        raise ScrapingError(
+            f"get_text() {url} response status code is {response.status_code}")
+
+    return response.text
+
+
+def probe_hls(url: str) -> ProbeResult:
+    """Probes a HLS playlist, following a master playlist to its best variant"""
+    playlist = get_text(url)
+    variant_url = get_hls_variant_url(playlist, url)
+
+    if variant_url is not None:
+        playlist = get_text(variant_url)
+
+    return ProbeResult(duration=parse_hls_duration(playlist))
+
+
+def probe_dash(url: str) -> ProbeResult:
+    """Probes a DASH manifest's mediaPresentationDuration"""
+    manifest = ElementTree.fromstring(get_text(url))
+    duration = manifest.get("mediaPresentationDuration")
+
+    return ProbeResult(duration=parse_iso_duration(duration) if duration else None)
+
+
+def find_mvhd_duration(data: bytes, offset: int = 0) -> tuple:
+    """Walks the mp4 boxes in data, which starts offset bytes into the file.
+    Returns (duration, None) if the mvhd box is found, or (None, next_offset) with the
+    file offset of the first box that isn't in data, or (None, None) if there are no more boxes"""
+    position = 0
+
+    while position + 8 <= len(data):
+        size, box_type = struct.unpack(">I4s", data[position:position + 8])
+        header_size = 8
+
+        if size == 1:
+            if position + 16 > len(data):
+                return None, offset + position
+            size = struct.unpack(">Q", data[position + 8:position + 16])[0]
+            header_size = 16
+        elif size == 0:
+            # the box runs to the end of the file
+            size = len(data) - position
+
+            if box_type != b"moov":
+                return None, None
+
+        if size < header_size:
+            return None, None
+
+        if box_type == b"moov":
+            content = data[position + header_size:position + size]
+            return find_mvhd_in_moov(content), None
+
+        position += size
+
+    return None, offset + position
+
+
+def find_mvhd_in_moov(content: bytes) -> float:
+    """Returns the duration in the mvhd box of a moov box's content, or None"""
+    position = 0
+
+    while position + 8 <= len(content):
+        size, box_type = struct.unpack(">I4s", content[position:position + 8])
+
+        if box_type == b"mvhd":
+            version = content[position + 8]
+
+            if version == 1:
+                timescale, duration = struct.unpack(
+                    ">IQ", content[position + 28:position + 40])
+            else:
+                timescale, duration = struct.unpack(
+                    ">II", content[position + 20:position + 28])
+
+            return duration / timescale if timescale else None
+
+        if size < 8:
+            return None
+
+        position += size
+
+    return None
+
+
+def read_range(url: str, start: int, length: int) -> tuple:
+    """Reads length bytes of a url from start with a range request.
+    Returns (data, total size), total size is None if the server didn't say"""
+    with host_slot(url):
+        response = get_session().get(url, stream=True, timeout=transport_settings["timeout"],
+                                     headers={"Range": f"bytes={start}-{start + length - 1}"})
+
+        try:
+            if response.status_code not in [200, 206]:
+                raise ScrapingError(
+                    f"read_range() {url} response status code is {response.status_code}")
+
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+
+            if response.status_code == 200 and start > 0:
+                raise ScrapingError(
+                    f"read_range() {url} doesn't support range requests")
+
+            if response.status_code == 200:
+                # the whole file is being sent, only read the start of it
+                total = response.headers.get("Content-Length", "")
+
+            data = b""
+
+            for chunk in response.iter_content(chunk_size=length):
+                data += chunk
+
+                if len(data) >= length:
+                    break
+
+            return data[:length], int(total) if total.isdigit() else None
+        finally:
+            response.close()
+
+
+def probe_mp4(url: str) -> ProbeResult:
+    """Finds an mp4's duration from its mvhd box with small range requests,
+    skipping over boxes like mdat when the header is at the end of the file"""
+    offset = 0
+    size = None
+
+    for _ in range(MAX_PROBE_READS):
+        data, total = read_range(url, offset, PROBE_CHUNK_SIZE)
+        size = size or total
+
+        duration, next_offset = find_mvhd_duration(data, offset)
+
+        if duration is not None or next_offset is None or (size is not None and next_offset >= size):
+            return ProbeResult(duration=duration, size=size)
+
+        offset = next_offset
+
+    return ProbeResult(size=size)
+
+
+def probe_head(url: str) -> ProbeResult:
+    """Finds a url's size from the Content-Length of a HEAD request"""
+    with host_slot(url):
+        response = get_session().head(url, allow_redirects=True,
+                                      timeout=transport_settings["timeout"])
+
+    content_length = response.headers.get("Content-Length", "")
+
+    if response.status_code != 200 or not content_length.isdigit():
+        return ProbeResult()
+
+    return ProbeResult(size=int(content_length))
+
+
+def probe_media_url(url: str) -> ProbeResult:
+    """Probes a direct media, HLS or DASH url"""
+    path = urlsplit(url).path.lower()
+
+    if path.endswith(".m3u8"):
+        return probe_hls(url)
+    if path.endswith(".mpd"):
+        return probe_dash(url)
+
+    return probe_mp4(url)
+
+
+def probe_youtube(url: str) -> ProbeResult:
+    """Probes a youtube video with its metadata"""
+    # pytube is imported here so probing other services doesn't load it
+    from pytube import YouTube
+
+    youtube_obj = YouTube(url)
+
+    return ProbeResult(duration=youtube_obj.length,
+                       size=youtube_obj.streams.get_highest_resolution().filesize)
+
+
+def probe_post(post: PostRecord, url: str = None, clip_service: ClipService = None) -> ProbeResult:
+    """Probes a post's clip without downloading it. The url and clip service default
+    to the post's. Raises an exception if the clip can't be probed"""
+    # imported here to avoid importing reddit_media and resolvers when only parsing
+    from reddit_to_video.scraping.reddit_media import get_reddit_media_plan
+    from reddit_to_video.scraping.resolvers import resolve_media_url
+
+    plan = get_reddit_media_plan(post)
+
+    if plan is not None and plan.is_video:
+        return ProbeResult(duration=plan.duration).merge(probe_head(plan.video_url))
+
+    url = url or post.url
+    clip_service = clip_service or get_clip_service_from_url(url)
+
+    if clip_service.value == ClipService.YOUTUBE.value:
+        return probe_youtube(url)
+
+    if clip_service.value in [ClipService.TWITCH.value, ClipService.STREAMABLE.value, ClipService.KICK.value]:
+        return probe_media_url(resolve_media_url(url, clip_service))
+
+    return ProbeResult()
+
+
+def check_probe(result: ProbeResult, max_duration: float = None, max_size_mb: float = None) -> None:
+    """Raises DurationTooLongError or FileTooLargeError if a probed clip is too long or too big.
+    Unknown values pass"""
+    if max_duration is not None and result.duration is not None and result.duration > max_duration:
+        raise DurationTooLongError(
+            f"check_probe() clip is {result.duration} seconds, the limit is {max_duration}")
+
+    if max_size_mb is not None and result.size is not None and result.size > max_size_mb * 1024 * 1024:
+        raise FileTooLargeError(
+            f"check_probe() clip is {result.size / 1024 / 1024:.1f}MB, the limit is {max_size_mb}MB")
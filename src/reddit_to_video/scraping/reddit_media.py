@@ -0,0 +1,200 @@
+"""Downloads reddit hosted videos and images from the post's API metadata
+
+praw already returns the urls of a reddit video's streams (media['reddit_video']) and the
+full size preview image of a post, so a download plan can be built straight from a
+PostRecord without opening a browser or scraping the post page again. A plan also knows a
+video's duration and size before any bytes are downloaded.
+
+Reddit serves a video's picture and sound as separate DASH streams, the sound stream is
+found in the DASH manifest and merged with ffmpeg without re-encoding.
+
+Classes:
+    RedditMediaPlan(dataclass): The urls and metadata needed to download a post's media
+
+Functions:
+    get_reddit_media_plan(post: PostRecord) -> RedditMediaPlan:
+        Builds a download plan from a post's metadata, or None if it has no reddit media
+
+    get_dash_audio_url(dash_url: str) -> str:
+        Returns the url of the best audio stream in a DASH manifest, or None if there is none
+
+    download_reddit_video_plan(plan: RedditMediaPlan, output: str) -> str:
+        Downloads a reddit video's streams and merges them into one file
+
+    download_reddit_image_plan(plan: RedditMediaPlan, output: str) -> str:
+        Downloads a post's image from its plan, without a browser
+
+Example:
+    >>> from reddit_to_video.scraping.reddit_media import get_reddit_media_plan, download_reddit_video_plan
+    >>> plan = get_reddit_media_plan(post)
+    >>> plan.duration
+    28
+    >>> download_reddit_video_plan(plan, "output/posts/ei6pek.mp4")
+    'output/posts/ei6pek.mp4'
+"""
+
+import subprocess
+from dataclasses import dataclass
+from html import unescape
+from os import remove as remove_file
+from os.path import isfile as is_file
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+from reddit_to_video.scraping.transport import get
+from reddit_to_video.scraping.download import download_file, get_part_path, finish_download
+from reddit_to_video.records import PostRecord
+from reddit_to_video.exceptions import NoImageError, ScrapingError
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+IMAGE_HOSTS = ["i.redd.it", "i.imgur.com"]
+
+
+@dataclass
+class RedditMediaPlan:
+    """The urls and metadata needed to download a post's media"""
+    video_url: str = None
+    dash_url: str = None
+    hls_url: str = None
+    image_url: str = None
+    duration: float = None
+    width: int = None
+    height: int = None
+    has_audio: bool = None
+
+    @property
+    def is_video(self) -> bool:
+        """Returns True if the plan downloads a video, False if it downloads an image"""
+        return self.video_url is not None
+
+
+def is_image_url(url: str) -> bool:
+    """Returns True if a url links straight to an image"""
+    parts = urlsplit(url or "")
+
+    return parts.netloc.lower() in IMAGE_HOSTS or parts.path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def get_reddit_media_plan(post: PostRecord) -> RedditMediaPlan:
+    """Builds a download plan from a post's metadata, or None if it has no reddit media"""
+    if post.reddit_video:
+        video = post.reddit_video
+
+        return RedditMediaPlan(
+            video_url=video.get("fallback_url"),
+            dash_url=video.get("dash_url"),
+            hls_url=video.get("hls_url"),
+            duration=video.get("duration"),
+            width=video.get("width"),
+            height=video.get("height"),
+            # gifs have no sound, older posts don't say so check the manifest
+            has_audio=False if video.get("is_gif") else video.get("has_audio"))
+
+    if is_image_url(post.url):
+        return RedditMediaPlan(image_url=post.url)
+
+    if post.preview_url:
+        # the API html escapes the query of preview urls
+        return RedditMediaPlan(image_url=unescape(post.preview_url))
+
+    return None
+
+
+def get_local_name(tag: str) -> str:
+    """Returns a xml tag without its namespace"""
+    return tag.rpartition("}")[2]
+
+
+def get_dash_audio_url(dash_url: str) -> str:
+    """Returns the url of the best audio stream in a DASH manifest, or None if there is none"""
+    response = get(dash_url)
+
+    if response.status_code != 200:
+        raise ScrapingError(
+            f"get_dash_audio_url() manifest response status code is {response.status_code}")
+
+    manifest = ElementTree.fromstring(response.content)
+
+    best_url = None
+    best_bandwidth = -1
+
+    for adaptation_set in manifest.iter():
+        if get_local_name(adaptation_set.tag) != "AdaptationSet":
+            continue
+
+        is_audio = (adaptation_set.get("contentType") == "audio"
+                    or (adaptation_set.get("mimeType") or "").startswith("audio"))
+
+        for representation in adaptation_set:
+            if get_local_name(representation.tag) != "Representation":
+                continue
+
+            if not is_audio and not (representation.get("mimeType") or "").startswith("audio"):
+                continue
+
+            base_url = next((child.text for child in representation
+                             if get_local_name(child.tag) == "BaseURL"), None)
+            bandwidth = int(representation.get("bandwidth") or 0)
+
+            if base_url and bandwidth > best_bandwidth:
+                best_url = urljoin(dash_url, base_url.strip())
+                best_bandwidth = bandwidth
+
+    return best_url
+
+
+def merge_audio_video(video_path: str, audio_path: str, output: str) -> str:
+    """Merges a video and audio stream into one mp4 without re-encoding"""
+    # moviepy depends on imageio-ffmpeg, so its ffmpeg is always available
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    subprocess.run([get_ffmpeg_exe(), "-y", "-loglevel", "error",
+                    "-i", video_path, "-i", audio_path,
+                    "-map", "0:v:0", "-map", "1:a:0", "-c", "copy",
+                    "-f", "mp4", output],
+                   check=True, capture_output=True)
+
+    return output
+
+
+def download_reddit_video_plan(plan: RedditMediaPlan, output: str) -> str:
+    """Downloads a reddit video's streams and merges them into one file.
+    The output only appears once the merged file is complete"""
+    if not plan.is_video:
+        raise ValueError(
+            "download_reddit_video_plan() plan has no video to download")
+
+    audio_url = None
+
+    if plan.has_audio is not False and plan.dash_url is not None:
+        audio_url = get_dash_audio_url(plan.dash_url)
+
+    if audio_url is None:
+        return download_file(plan.video_url, output)
+
+    video_path = f"{output}.video"
+    audio_path = f"{output}.audio"
+
+    download_file(plan.video_url, video_path)
+    download_file(audio_url, audio_path)
+
+    part_path = get_part_path(output)
+
+    try:
+        merge_audio_video(video_path, audio_path, part_path)
+    finally:
+        for path in [video_path, audio_path]:
+            if is_file(path):
+                remove_file(path)
+
+    return finish_download(part_path, output)
+
+
+def download_reddit_image_plan(plan: RedditMediaPlan, output: str) -> str:
+    """Downloads a post's image from its plan, without a browser.
+    The output only appears once the image is complete"""
+    if plan.image_url is None:
+        raise NoImageError(
+            "download_reddit_image_plan() plan has no image to download")
+
+    return download_file(plan.image_url, output)
@@ -0,0 +1,289 @@
+"""Resolves clip page urls to direct media urls without a browser
+
+Each clip service has a resolver that asks the service's public metadata endpoint for the
+clip's media url, which usually takes one HTTP request. Pages without an endpoint are
+streamed and scanned for a <video> tag or og:video meta tag, stopping at the first match
+instead of downloading and parsing the whole page. The browser is only needed when
+every resolver fails.
+
+Functions:
+    resolve_streamable(url: str) -> str: Resolves a streamable clip with its videos API
+    resolve_kick(url: str) -> str: Resolves a kick clip with its clips API
+    resolve_twitch(url: str) -> str: Resolves a twitch clip with twitch's GQL API
+    resolve_from_html(url: str) -> str: Finds the first video url in a page's html
+    resolve_media_url(url: str, clip_service: ClipService) -> str: Resolves a clip url with
+        its service's resolver, falling back to the page's html
+    forget_resolved_url(url: str, clip_service: ClipService): Drops a clip's resolved url, eg. once it expired
+    clear_resolved_urls(): Drops every resolved url
+
+Example:
+    >>> from reddit_to_video.scraping.resolvers import resolve_media_url
+    >>> resolve_media_url("https://streamable.com/fpuv4", ClipService.STREAMABLE)
+    'https://cdn-cf-east.streamable.com/video/mp4/fpuv4.mp4?Expires=...'
+"""
+
+import re
+from html import unescape
+from threading import Lock
+from time import monotonic
+from urllib.parse import quote, urljoin, urlsplit
+
+from reddit_to_video.scraping.transport import get, post, get_session, host_slot, transport_settings
+from reddit_to_video.scraping.validator import ClipService, classify_url
+from reddit_to_video.exceptions import ScrapingError
+
+STREAMABLE_API = "https://api.streamable.com/videos/"
+KICK_API = "https://kick.com/api/v2/clips/"
+TWITCH_GQL = "https://gql.twitch.tv/gql"
+# the public client id twitch's own web player uses
+TWITCH_CLIENT_ID = "kimne78kx3ncx6brgo4mv6wki5h1ko"
+
+TWITCH_CLIP_QUERY = """query($slug: ID!) {
+  clip(slug: $slug) {
+    videoQualities { quality sourceURL }
+    playbackAccessToken(params: {platform: "web", playerBackend: "mediaplayer", playerType: "site"}) {
+      signature
+      value
+    }
+  }
+}"""
+
+# og:video meta tags, with the attributes in either order, then <video> and <source> tags
+html_video_patterns = [
+    re.compile(
+        r"""<meta[^>]+property=["']og:video(?::secure_url|:url)?["'][^>]+content=["']([^"']+)["']""", re.I),
+    re.compile(
+        r"""<meta[^>]+content=["']([^"']+)["'][^>]+property=["']og:video(?::secure_url|:url)?["']""", re.I),
+    re.compile(r"""<video[^>]+src=["']([^"']+)["']""", re.I),
+    re.compile(r"""<source[^>]+src=["']([^"']+)["']""", re.I)
+]
+
+# resolved urls are signed and expire, they're kept for less time than the shortest signature
+RESOLVED_URL_TTL = 60
+MAX_RESOLVED_URLS = 256
+
+HTML_CHUNK_SIZE = 16 * 1024
+# bytes kept from the previous chunk so a tag split between chunks still matches
+HTML_OVERLAP = 2048
+
+
+def get_json(response, url: str) -> dict:
+    """Returns the json of a response, raising ScrapingError for failed responses"""
+    if response.status_code != 200:
+        raise ScrapingError(
+            f"get_json() {url} response status code is {response.status_code}")
+
+    try:
+        return response.json()
+    except ValueError as e:
+        raise ScrapingError(f"get_json() {url} didn't return json") from e
+
+
+def get_last_path_segment(url: str) -> str:
+    """Returns the last part of a url's path, eg. fpuv4 from https://streamable.com/fpuv4"""
+    segments = [segment for segment in urlsplit(
+        url).path.split("/") if segment != ""]
+
+    if len(segments) == 0:
+        raise ScrapingError(f"get_last_path_segment() {url} has no path")
+
+    return segments[-1]
+
+
+def get_clip_id(url: str) -> str:
+    """Returns the clip id of a clip url, falling back to the last part of its path"""
+    clip_id = classify_url(url)[1]
+
+    if clip_id is None:
+        return get_last_path_segment(url)
+
+    return clip_id
+
+
+def resolve_streamable(url: str) -> str:
+    """Resolves a streamable clip with its videos API"""
+    shortcode = get_clip_id(url)
+    api_url = STREAMABLE_API + shortcode
+
+    files = get_json(get(api_url), api_url).get("files") or {}
+
+    for name in ["mp4", "mp4-mobile"]:
+        if (files.get(name) or {}).get("url"):
+            # the API returns protocol relative urls
+            return urljoin("https:", files[name]["url"])
+
+    raise ScrapingError(
+        f"resolve_streamable() streamable clip {shortcode} has no mp4 file")
+
+
+def resolve_kick(url: str) -> str:
+    """Resolves a kick clip with its clips API"""
+    service, clip_id = classify_url(url)
+
+    if service.value != ClipService.KICK.value or clip_id is None:
+        raise ScrapingError(f"resolve_kick() {url} has no clip id")
+
+    api_url = KICK_API + clip_id
+    clip = get_json(get(api_url), api_url).get("clip") or {}
+
+    # clip_url is a HLS playlist that can't be streamed to a file
+    video_url = clip.get("video_url")
+
+    if not video_url or ".m3u8" in video_url:
+        raise ScrapingError(
+            f"resolve_kick() kick clip {clip_id} has no mp4 url")
+
+    return video_url
+
+
+def resolve_twitch(url: str) -> str:
+    """Resolves a twitch clip with twitch's GQL API, returning its best quality"""
+    slug = get_clip_id(url)
+
+    response = post(TWITCH_GQL, json={"query": TWITCH_CLIP_QUERY, "variables": {"slug": slug}},
+                    headers={"Client-ID": TWITCH_CLIENT_ID})
+
+    clip = (get_json(response, TWITCH_GQL).get("data") or {}).get("clip")
+
+    if not clip or not clip.get("videoQualities"):
+        raise ScrapingError(
+            f"resolve_twitch() twitch clip {slug} not found")
+
+    best_quality = max(clip["videoQualities"],
+                       key=lambda quality: float(quality.get("quality") or 0))
+    token = clip.get("playbackAccessToken") or {}
+
+    if not token.get("signature") or not token.get("value"):
+        raise ScrapingError(
+            f"resolve_twitch() twitch clip {slug} has no access token")
+
+    return (f"{best_quality['sourceURL']}?sig={token['signature']}"
+            f"&token={quote(token['value'])}")
+
+
+def find_video_url(html: str) -> str:
+    """Returns the first video url in some html, or None if there isn't one"""
+    for pattern in html_video_patterns:
+        match = pattern.search(html)
+
+        if match is not None and not match.group(1).startswith("blob:"):
+            return unescape(match.group(1))
+
+    return None
+
+
+def resolve_from_html(url: str) -> str:
+    """Finds the first video url in a page's html.
+    The page is streamed and closed as soon as a url is found"""
+    with host_slot(url):
+        response = get_session().get(url, stream=True,
+                                     timeout=transport_settings["timeout"])
+
+        try:
+            if response.status_code != 200:
+                raise ScrapingError(
+                    f"resolve_from_html() {url} response status code is {response.status_code}")
+
+            html = ""
+
+            for chunk in response.iter_content(chunk_size=HTML_CHUNK_SIZE, decode_unicode=True):
+                if isinstance(chunk, bytes):
+                    chunk = chunk.decode("utf-8", errors="ignore")
+
+                html = html[-HTML_OVERLAP:] + chunk
+                video_url = find_video_url(html)
+
+                if video_url is not None:
+                    return urljoin(url, video_url)
+        finally:
+            response.close()
+
+    raise ScrapingError(f"resolve_from_html() {url} has no video tag")
+
+
+service_resolvers = {
+    ClipService.STREAMABLE.value: resolve_streamable,
+    ClipService.KICK.value: resolve_kick,
+    ClipService.TWITCH.value: resolve_twitch
+}
+
+
+# probing and downloading a clip both resolve it, so resolved urls are kept for a while
+# (url, clip service value) -> (time resolved, media url)
+resolved_urls = {}
+resolved_urls_lock = Lock()
+
+
+def get_resolved_url(url: str, clip_service: ClipService) -> str:
+    """Returns a clip's media url if it was resolved less than RESOLVED_URL_TTL seconds ago"""
+    with resolved_urls_lock:
+        resolved = resolved_urls.get((url, clip_service.value))
+
+    if resolved is None or monotonic() - resolved[0] > RESOLVED_URL_TTL:
+        return None
+
+    return resolved[1]
+
+
+def keep_resolved_url(url: str, clip_service: ClipService, media_url: str) -> None:
+    """Keeps a clip's media url, dropping expired urls and then the oldest once there are too many"""
+    now = monotonic()
+
+    with resolved_urls_lock:
+        resolved_urls[(url, clip_service.value)] = (now, media_url)
+
+        if len(resolved_urls) > MAX_RESOLVED_URLS:
+            for key, (resolved_at, _) in list(resolved_urls.items()):
+                if now - resolved_at > RESOLVED_URL_TTL:
+                    del resolved_urls[key]
+
+        while len(resolved_urls) > MAX_RESOLVED_URLS:
+            del resolved_urls[min(resolved_urls, key=lambda key: resolved_urls[key][0])]
+
+
+def forget_resolved_url(url: str, clip_service: ClipService) -> None:
+    """Drops a clip's resolved url, so it's resolved again next time (eg. once it expired)"""
+    with resolved_urls_lock:
+        resolved_urls.pop((url, clip_service.value), None)
+
+
+def clear_resolved_urls() -> None:
+    """Drops every resolved url"""
+    with resolved_urls_lock:
+        resolved_urls.clear()
+
+
+def resolve_media_url(url: str, clip_service: ClipService) -> str:
+    """Resolves a clip url with its service's resolver, falling back to the page's html.
+    Urls resolved in the last RESOLVED_URL_TTL seconds aren't resolved again.
+    Raises ScrapingError if neither finds a media url"""
+    media_url = get_resolved_url(url, clip_service)
+
+    if media_url is not None:
+        return media_url
+
+    media_url = find_media_url(url, clip_service)
+    keep_resolved_url(url, clip_service, media_url)
+
+    return media_url
+
+
+def find_media_url(url: str, clip_service: ClipService) -> str:
+    """Resolves a clip url with its service's resolver, falling back to the page's html"""
+    errors = []
+
+    resolver = service_resolvers.get(clip_service.value)
+
+    if resolver is not None:
+        try:
+            return resolver(url)
+        except Exception as e:
+            errors.append(str(e))
+
+    try:
+        return resolve_from_html(url)
+    except Exception as e:
+        errors.append(str(e))
+
+    raise ScrapingError(
+        f"find_media_url() couldn't resolve {url} ({'; '.join(errors)})")
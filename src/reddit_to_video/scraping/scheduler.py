@@ -0,0 +1,288 @@
+"""Asyncio scheduler that runs many downloads in one process
+
+Downloading is almost all waiting on the network, so instead of a process per download
+the scheduler runs downloads on threads driven by one event loop. A global limit caps how
+many run at once and each clip service has its own limit, so a service with strict rate
+limits doesn't slow down the others. Jobs with a lower rank (better posts) start first,
+and a job can be cancelled while it is downloading, stopping at the next chunk. An admit
+callback can hold jobs back, eg. once enough has been downloaded to fill a script.
+
+Jobs can come from a generator, like one over a paginated listing. It is read on a worker
+thread while downloads run, and only while fewer than max_pending jobs are waiting to start,
+so the first downloads start after the first page and the listing is never read further
+ahead than the downloads need.
+
+Classes:
+    DownloadJob(dataclass): A download to run, with its rank, service and result
+    DownloadScheduler: Runs download jobs with global and per service concurrency limits
+
+Functions:
+    configure_downloads(max_concurrent: int = None, service_limits: dict = None):
+        Sets the default concurrency of schedulers
+
+Example:
+    >>> from reddit_to_video.scraping.scheduler import DownloadScheduler, DownloadJob
+    >>> scheduler = DownloadScheduler(max_concurrent=16)
+    >>> jobs = scheduler.run([DownloadJob(rank, get_video_from_post, (post,), ClipService.TWITCH)
+    ...                       for rank, post in enumerate(posts)])
+    >>> jobs[0].result
+    <ScriptElement ...>
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count
+from threading import Event
+
+from reddit_to_video.scraping.validator import ClipService
+from reddit_to_video.scraping.download import current_cancel_event
+from reddit_to_video.exceptions import DownloadCancelledError
+
+DEFAULT_MAX_CONCURRENT = 16
+
+# downloads of each service that can run at once, services not listed use the default
+DEFAULT_SERVICE_LIMITS = {
+    ClipService.REDDIT.value: 8,
+    ClipService.YOUTUBE.value: 4,
+    ClipService.TWITCH.value: 4,
+    ClipService.STREAMABLE.value: 4,
+    ClipService.KICK.value: 2
+}
+DEFAULT_SERVICE_LIMIT = 2
+
+download_settings = {
+    "max_concurrent": DEFAULT_MAX_CONCURRENT,
+    "service_limits": dict(DEFAULT_SERVICE_LIMITS)
+}
+
+
+def configure_downloads(max_concurrent: int = None, service_limits: dict = None) -> None:
+    """Sets the default concurrency of schedulers. Service limits are keyed by ClipService"""
+    if max_concurrent is not None:
+        download_settings["max_concurrent"] = max_concurrent
+
+    if service_limits is not None:
+        for service, limit in service_limits.items():
+            download_settings["service_limits"][service.value] = limit
+
+
+job_counter = count()
+
+
+@dataclass
+class DownloadJob:
+    """A download to run, with its rank, service and result.
+    function(*args) runs on a worker thread, jobs with a lower rank start first"""
+    rank: int
+    function: object
+    args: tuple = ()
+    service: ClipService = ClipService.NONE
+    # the duration of the job's clip when it is known before downloading
+    duration: float = None
+
+    result: object = None
+    error: Exception = None
+    cancelled: bool = False
+    finished: bool = False
+
+    cancel_event: Event = field(default_factory=Event, repr=False)
+    order: int = field(default_factory=lambda: next(job_counter), repr=False)
+
+    @property
+    def succeeded(self) -> bool:
+        """Returns True if the job finished without an error and wasn't cancelled"""
+        return self.finished and self.error is None and not self.cancelled
+
+
+class DownloadScheduler:
+    """Runs download jobs with global and per service concurrency limits"""
+
+    def __init__(self, max_concurrent: int = None, service_limits: dict = None, admit=None,
+                 max_pending: int = None):
+        """Initialises the scheduler. Limits default to the configured download settings,
+        service limits are keyed by ClipService. admit(job) is called before a job starts,
+        returning False holds back pending jobs until another job finishes. Jobs are only
+        read from a generator while fewer than max_pending (default 2 * max_concurrent)
+        are waiting to start"""
+        self.max_concurrent = max_concurrent or download_settings["max_concurrent"]
+        self.max_pending = max_pending or self.max_concurrent * 2
+        self.admit = admit
+        # the error that stopped jobs being read from a generator, if any
+        self.feed_error = None
+
+        self.service_limits = dict(download_settings["service_limits"])
+
+        if service_limits is not None:
+            for service, limit in service_limits.items():
+                self.service_limits[service.value] = limit
+
+        self._pending = []
+        self._running = {}
+        self._stopped = False
+
+    def get_service_limit(self, service: ClipService) -> int:
+        """Returns how many downloads of a service can run at once"""
+        return self.service_limits.get(service.value, DEFAULT_SERVICE_LIMIT)
+
+    @property
+    def pending(self) -> list[DownloadJob]:
+        """Returns the jobs that haven't started, in the order they will start"""
+        return sorted(self._pending, key=lambda job: (job.rank, job.order))
+
+    @property
+    def running(self) -> list[DownloadJob]:
+        """Returns the jobs that are downloading"""
+        return list(self._running.values())
+
+    def submit(self, job: DownloadJob) -> None:
+        """Adds a job to be started when there is a free slot for it"""
+        if self._stopped:
+            job.cancelled = True
+            return
+
+        self._pending.append(job)
+
+    def cancel(self, job: DownloadJob) -> None:
+        """Cancels a job, a running job stops at its next cancellation check"""
+        job.cancelled = True
+        job.cancel_event.set()
+
+        if job in self._pending:
+            self._pending.remove(job)
+
+    def stop(self) -> None:
+        """Stops starting new jobs and cancels the pending ones, running jobs finish"""
+        self._stopped = True
+
+        for job in self._pending:
+            job.cancelled = True
+
+        self._pending = []
+
+    def cancel_all(self) -> None:
+        """Cancels every pending and running job"""
+        running = self.running
+        self.stop()
+
+        for job in running:
+            self.cancel(job)
+
+    def _next_job(self) -> DownloadJob:
+        """Returns the best ranked pending job whose service has a free slot"""
+        running_per_service = {}
+
+        for job in self._running.values():
+            running_per_service[job.service.value] = running_per_service.get(
+                job.service.value, 0) + 1
+
+        for job in self.pending:
+            if running_per_service.get(job.service.value, 0) < self.get_service_limit(job.service):
+                return job
+
+        return None
+
+    async def _run_job(self, job: DownloadJob) -> DownloadJob:
+        # each task has its own context, to_thread copies it to the worker thread
+        current_cancel_event.set(job.cancel_event)
+
+        try:
+            job.result = await asyncio.to_thread(job.function, *job.args)
+        except DownloadCancelledError:
+            job.cancelled = True
+        except Exception as e:
+            job.error = e
+
+        job.finished = True
+
+        return job
+
+    def _start_jobs(self) -> None:
+        """Starts pending jobs until the global or service limits are reached"""
+        while not self._stopped and len(self._running) < self.max_concurrent:
+            job = self._next_job()
+
+            if job is None or (self.admit is not None and not self.admit(job)):
+                return
+
+            self._pending.remove(job)
+            self._running[asyncio.ensure_future(self._run_job(job))] = job
+
+    def _can_feed(self) -> bool:
+        """Returns True if another job should be read from the jobs being run"""
+        return not self._stopped and len(self._pending) < self.max_pending
+
+    async def run_async(self, jobs=(), on_finished=None) -> list[DownloadJob]:
+        """Runs jobs until every submitted job has finished or been cancelled.
+        jobs can be a list or a generator, generators are read lazily on a worker thread.
+        on_finished(job) is called as each job finishes and may submit, cancel or stop"""
+        if hasattr(jobs, "__len__"):
+            for job in jobs:
+                self.submit(job)
+
+            jobs = iter(())
+
+        jobs = iter(jobs)
+
+        loop = asyncio.get_running_loop()
+        # one more thread than downloads for reading the jobs
+        loop.set_default_executor(ThreadPoolExecutor(
+            max_workers=self.max_concurrent + 1, thread_name_prefix="download"))
+
+        finished = []
+        feeding = None
+        fed_all = False
+
+        self._start_jobs()
+
+        while True:
+            if feeding is None and not fed_all and self._can_feed():
+                feeding = asyncio.ensure_future(
+                    asyncio.to_thread(next, jobs, None))
+
+            waiting = set(self._running)
+
+            if feeding is not None:
+                waiting.add(feeding)
+
+            if len(waiting) == 0:
+                break
+
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if feeding in done:
+                try:
+                    job = feeding.result()
+                except Exception as e:
+                    self.feed_error = e
+                    job = None
+
+                feeding = None
+
+                if job is None:
+                    fed_all = True
+                else:
+                    self.submit(job)
+
+            for task in done:
+                if task not in self._running:
+                    continue
+
+                job = self._running.pop(task)
+                finished.append(job)
+
+                if on_finished is not None:
+                    on_finished(job)
+
+            self._start_jobs()
+
+        # jobs held back with nothing running can never be admitted
+        if len(self._pending) > 0:
+            self.stop()
+
+        return finished
+
+    def run(self, jobs=(), on_finished=None) -> list[DownloadJob]:
+        """Runs jobs on a new event loop until they have all finished or been cancelled.
+        Returns the finished jobs in the order they finished"""
+        return asyncio.run(self.run_async(jobs, on_finished))
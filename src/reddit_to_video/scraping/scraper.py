@@ -1,24 +1,25 @@
-from os import rename as rename_file
+import logging
+
+from os import replace as replace_file
 from os.path import join as path_join
 
-from requests import get
 from redvid import Downloader
 from pytube import YouTube
 from bs4 import BeautifulSoup
 
-from selenium import webdriver
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 
 from reddit_to_video.scraping.validator import is_valid_kick_clip, is_valid_streamable_clip, is_valid_twitch_clip_url, ClipService
-from reddit_to_video.exceptions import DurationTooLongError
-
+from reddit_to_video.scraping.browser import get_browser_pool
+from reddit_to_video.scraping.transport import get
+from reddit_to_video.scraping.download import download_file, get_part_path, finish_download
+from reddit_to_video.scraping.resolvers import resolve_media_url, resolve_from_html, forget_resolved_url
+from reddit_to_video.exceptions import DurationTooLongError, ScrapingError, ExpiredUrlError
 
-DEFAULT_REQ_TIMEOUT = 3000
 
-
-def retreieve_content_from_url(url: str, timeout: int = DEFAULT_REQ_TIMEOUT) -> bytes:
+def retreieve_content_from_url(url: str, timeout: tuple = None) -> bytes:
     """Retreives the content of a url and returns it as bytes.
     Used for downloading img or video files"""
     response = get(url, timeout=timeout)
@@ -30,7 +31,7 @@ def retreieve_content_from_url(url: str, timeout: int = DEFAULT_REQ_TIMEOUT) ->
     return response.content
 
 
-def get_html_from_url(url: str, timeout: int = 3000) -> str:
+def get_html_from_url(url: str, timeout: tuple = None) -> str:
     """Retreives the html of a url and returns it as a string"""
     response = get(url, timeout=timeout)
 
@@ -41,7 +42,7 @@ def get_html_from_url(url: str, timeout: int = 3000) -> str:
     return response.text
 
 
-def get_soup_from_url(url: str, timeout: int = 3000) -> BeautifulSoup:
+def get_soup_from_url(url: str, timeout: tuple = None) -> BeautifulSoup:
     """Retreives the html of a url and returns it as a BeautifulSoup object"""
     html = get_html_from_url(url, timeout=timeout)
     return BeautifulSoup(html, "html.parser")
@@ -51,7 +52,13 @@ def download_youtube_video(url: str, output: str):
     """Downloads a youtube video to a file.
     The output must be a path that can be written to"""
     youtube_obj = YouTube(url)
-    youtube_obj.streams.get_highest_resolution().download(filename=output)
+    part_path = get_part_path(output)
+
+    # pytube streams in chunks itself, it only needs to be moved when finished
+    youtube_obj.streams.get_highest_resolution().download(
+        filename=part_path, skip_existing=False)
+
+    finish_download(part_path, output)
 
 
 def download_streamable_video(url: str, output: str):
@@ -61,7 +68,7 @@ def download_streamable_video(url: str, output: str):
         raise Exception(
             f"download_streamable_video() url {url} is not a valid streamable url")
 
-    return download_from_video_tag_js(url, output)
+    return download_resolved_clip(url, ClipService.STREAMABLE, output)
 
 
 def download_kick_video(url: str, output: str):
@@ -71,7 +78,7 @@ def download_kick_video(url: str, output: str):
         raise Exception(
             f"download_kick_video() url {url} is not a valid kick url")
 
-    return download_from_video_tag_js(url, output)
+    return download_resolved_clip(url, ClipService.KICK, output)
 
 
 def download_twitch_clip(url: str, output: str) -> None:
@@ -81,7 +88,25 @@ def download_twitch_clip(url: str, output: str) -> None:
         raise Exception(
             f"download_twitch_clip() url {url} is not a valid twitch clip url")
 
-    return download_from_video_tag_js(url, output)
+    return download_resolved_clip(url, ClipService.TWITCH, output)
+
+
+def download_resolved_clip(url: str, clip_service: ClipService, output: str) -> None:
+    """Downloads a clip from the media url its resolver finds,
+    only loading the page in a browser if it can't be resolved"""
+    try:
+        src = resolve_media_url(url, clip_service)
+    except ScrapingError as e:
+        logging.info(
+            f"Couldn't resolve {url} without a browser, loading the page ({e})")
+        return download_from_video_tag_js(url, output)
+
+    try:
+        download_from_link(src, output)
+    except ExpiredUrlError:
+        # the url's signature expired since it was resolved, it's resolved once more
+        forget_resolved_url(url, clip_service)
+        download_from_link(resolve_media_url(url, clip_service), output)
 
 
 def download_from_video_tag_js(url: str, output: str) -> None:
@@ -89,11 +114,7 @@ def download_from_video_tag_js(url: str, output: str) -> None:
     # load page with selenium then wait for it to load
     src = ""
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("headless")
-    options.add_experimental_option('excludeSwitches', ['enable-logging'])
-
-    with webdriver.Chrome('chromedriver', chrome_options=options) as driver:
+    with get_browser_pool("chrome").session() as driver:
         driver.get(url)
 
         delay = 3
@@ -107,29 +128,16 @@ def download_from_video_tag_js(url: str, output: str) -> None:
 
 
 def download_from_link(src: str, output: str):
-    """Downloads the contents of a response to a file."""
-    # get the video content
-    video_content = retreieve_content_from_url(src)
-
-    # write the video content to a file
-    with open(output, "wb") as f:
-        f.write(video_content)
+    """Downloads the contents of a response to a file.
+    The file is streamed in chunks and only written to output once complete"""
+    download_file(src, output)
 
 
 def download_from_video_tag(url: str, output: str):
     """Downloads a video from a video tag to a file.
     The output must be a path that can be written to"""
-    # get html
-    html = get_soup_from_url(url)
-    # find video tag in entire html
-    video = html.find_all("video", recursive=True)[0]
-
-    if video is None:
-        raise Exception(
-            "download_from_video_tag() could not find video tag in html")
-
-    # get the src attribute
-    src = video['src']
+    # the page is only read up to the first video tag
+    src = resolve_from_html(url)
 
     download_from_link(src, output)
 
@@ -148,7 +156,7 @@ def download_reddit_video(url: str, output: str) -> str:
                             max_q=True, log=False).download()
 
     if isinstance(downloader, str):
-        rename_file(downloader, path_join(file_path, file_name))
+        replace_file(downloader, path_join(file_path, file_name))
         return downloader
 
     if downloader == 0:
@@ -0,0 +1,155 @@
+"""Shared HTTP session for scraping and media downloads
+
+Every request goes through one requests session whose adapters keep a pool of open
+connections per host, so fetching many clips from the same CDN reuses connections instead
+of paying a TCP and TLS handshake for every file. Requests get a connect and read timeout
+instead of hanging for minutes, and a per host semaphore caps how many requests run
+against one host at once.
+
+Functions:
+    get_session() -> Session: Gets the shared session, creating it on first use
+    configure_transport(max_per_host: int = None, pool_size: int = None, timeout: tuple = None):
+        Sets the connection pool size, per host concurrency and timeouts
+    host_slot(url: str): Context manager that holds one of a host's concurrent request slots
+    get(url: str, **kwargs) -> Response: Sends a GET request with the shared session
+    post(url: str, **kwargs) -> Response: Sends a POST request with the shared session
+    close_session(): Closes the shared session's connections
+
+Example:
+    >>> from reddit_to_video.scraping.transport import get
+    >>> get("https://streamable.com/fpuv4").status_code
+    200
+"""
+
+import atexit
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+
+# seconds to wait for a connection and between bytes of a response
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# open connections kept per host, and the number of hosts kept
+DEFAULT_POOL_SIZE = 8
+DEFAULT_HOST_POOLS = 16
+DEFAULT_MAX_PER_HOST = 4
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:109.0) Gecko/20100101 Firefox/115.0"
+
+transport_settings = {
+    "max_per_host": DEFAULT_MAX_PER_HOST,
+    "pool_size": DEFAULT_POOL_SIZE,
+    "timeout": DEFAULT_TIMEOUT
+}
+
+session_lock = Lock()
+shared_session = None
+host_slots = {}
+
+
+def configure_transport(max_per_host: int = None, pool_size: int = None, timeout: tuple = None) -> None:
+    """Sets the connection pool size, per host concurrency and timeouts.
+    Only affects sessions and hosts that haven't been used yet"""
+    if max_per_host is not None:
+        transport_settings["max_per_host"] = max_per_host
+    if pool_size is not None:
+        transport_settings["pool_size"] = pool_size
+    if timeout is not None:
+        transport_settings["timeout"] = timeout
+
+
+def create_session():
+    """Creates a session with a keep-alive connection pool per host"""
+    # imported here so importing the scraping package stays fast
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = Session()
+    session.headers["User-Agent"] = USER_AGENT
+
+    # only connection failures are retried here, responses are handled by the caller
+    adapter = HTTPAdapter(pool_connections=DEFAULT_HOST_POOLS,
+                          pool_maxsize=transport_settings["pool_size"],
+                          max_retries=Retry(total=None, connect=2, read=0, redirect=5,
+                                            status=0, backoff_factor=0.5),
+                          pool_block=False)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_session():
+    """Gets the shared session, creating it on first use"""
+    global shared_session
+
+    with session_lock:
+        if shared_session is None:
+            shared_session = create_session()
+
+        return shared_session
+
+
+def get_host(url: str) -> str:
+    """Returns the host of a url in lower case"""
+    return urlsplit(url).netloc.lower()
+
+
+def get_host_slots(host: str) -> BoundedSemaphore:
+    """Gets the semaphore limiting concurrent requests to a host"""
+    with session_lock:
+        if host not in host_slots:
+            host_slots[host] = BoundedSemaphore(
+                transport_settings["max_per_host"])
+
+        return host_slots[host]
+
+
+@contextmanager
+def host_slot(url: str):
+    """Context manager that holds one of a host's concurrent request slots,
+    blocking until one is free"""
+    slots = get_host_slots(get_host(url))
+    slots.acquire()
+
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def get(url: str, **kwargs):
+    """Sends a GET request with the shared session and the default timeout.
+    Streamed responses should be read inside host_slot instead, since the slot is
+    released when this returns"""
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = transport_settings["timeout"]
+
+    with host_slot(url):
+        return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    """Sends a POST request with the shared session and the default timeout"""
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = transport_settings["timeout"]
+
+    with host_slot(url):
+        return get_session().post(url, **kwargs)
+
+
+@atexit.register
+def close_session() -> None:
+    """Closes the shared session's connections"""
+    global shared_session
+
+    with session_lock:
+        session = shared_session
+        shared_session = None
+
+    if session is not None:
+        session.close()
@@ -1,10 +1,17 @@
 """Validator module used for validating urls specifically video platforms
 
+Urls are classified by splitting them once and looking their host up in a table, instead
+of trying a regex for every service. The host's classifier also extracts the clip's id, which
+is the same for every form of a clip's url (eg. twitch.tv/<channel>/clip/<slug> and
+clips.twitch.tv/<slug>), so it can be used as a cache key.
+
 Classes:
     ClipService: Enum representing a video platform
 
 Functions:
-    validate_url: Validates a url and returns the service it belongs to
+    classify_url: Returns the service a url belongs to and its clip id
+    get_clip_key: Returns a key that is the same for every url of a clip
+    get_urls_from_string: Returns the urls in a string
     get_clip_service_from_url: Returns the service a url belongs to
     is_valid_twitch_clip_url: Returns true if the url is a valid twitch clip url
     is_valid_youtube_url: Returns true if the url is a valid youtube url
@@ -15,27 +22,10 @@ Functions:
 
 import re
 from enum import Enum
+from functools import lru_cache
+from urllib.parse import unquote
 
-url_pattern = re.compile("\b((?:https?://)?(?:(?:www\.)?(?:[\da-z\.-]+)\.(?:[a-z]{2,6})|(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|(?:(?:[0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])))(?::[0-9]{1,4}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])?(?:/[\w\.-]*)*/?)\b")
-
-# twitch
-twitch_clip_pattern = re.compile(r".*clips\.twitch\.tv.*")
-twitch_channel_clip_pattern = re.compile(r".*twitch\.tv\/.*\/clip.*")
-
-# streamable
-streamable_clip_pattern = re.compile(r".*streamable.com\/.*")
-
-# kick
-kick_clip_pattern = re.compile(r".*kick.com\/.*\?clip=.*")
-
-# youtube
-youtube_clip_pattern = re.compile(r".*youtube\.com\/watch\?v=.*")
-youtube_share_clip_pattern = re.compile(r".*youtu\.be\/.*")
-
-# reddit
-reddit_clip_pattern = re.compile(r".*www.reddit.com/r/.*/comments/.*")
-reddit_shortened_pattern = re.compile(
-    r".*v\.redd\.it/.*")  # https://v.redd.it/yw6nan929np31
+url_pattern = re.compile(r"\b((?:https?://)?(?:(?:www\.)?(?:[\da-z\.-]+)\.(?:[a-z]{2,6})|(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)|(?:(?:[0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,7}:|(?:[0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|(?:[0-9a-fA-F]{1,4}:){1,5}(?::[0-9a-fA-F]{1,4}){1,2}|(?:[0-9a-fA-F]{1,4}:){1,4}(?::[0-9a-fA-F]{1,4}){1,3}|(?:[0-9a-fA-F]{1,4}:){1,3}(?::[0-9a-fA-F]{1,4}){1,4}|(?:[0-9a-fA-F]{1,4}:){1,2}(?::[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:(?:(?::[0-9a-fA-F]{1,4}){1,6})|:(?:(?::[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(?::[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(?:ffff(?::0{1,4}){0,1}:){0,1}(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])|(?:[0-9a-fA-F]{1,4}:){1,4}:(?:(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(?:25[0-5]|(?:2[0-4]|1{0,1}[0-9]){0,1}[0-9])))(?::[0-9]{1,4}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])?(?:/[\w\.-]*)*/?(?:\?[\w\.~%&=+-]*)?)\b")
 
 
 class ClipService(Enum):
@@ -53,20 +43,159 @@ def get_urls_from_string(string: str) -> list:
     return url_pattern.findall(string)
 
 
+def split_url(url: str) -> tuple[str, str, str]:
+    """Splits a url, with or without a scheme, into its lower case host (without www.),
+    path (without the leading /) and query. Only does the few string operations
+    classifying needs, which is faster than urlsplit or a regex per service"""
+    url = url.strip()
+
+    if "#" in url:
+        url = url.partition("#")[0]
+
+    scheme_end = url.find("://")
+
+    if scheme_end != -1:
+        url = url[scheme_end + 3:]
+
+    host, _, path = url.partition("/")
+
+    if "?" in host:
+        # eg. kick.com?clip=<id>, the query is everything after the host
+        host, _, query = host.partition("?")
+        path = ""
+    else:
+        path, _, query = path.partition("?")
+
+    if "@" in host or ":" in host:
+        host = host.rpartition("@")[2].partition(":")[0]
+
+    host = host.lower()
+
+    if host.startswith("www."):
+        host = host[4:]
+
+    return host, path, query
+
+
+def get_query_value(query: str, key: str) -> str:
+    """Returns the first value of a query parameter, or None if it isn't there"""
+    prefix = key + "="
+
+    for pair in query.split("&"):
+        if pair.startswith(prefix):
+            value = pair[len(prefix):]
+            return unquote(value.replace("+", " ")) if value else None
+
+    return None
+
+
+def get_first_segment(path: str, query: str) -> str:
+    """Returns the clip id of urls like youtu.be/<id>, v.redd.it/<id> and clips.twitch.tv/<slug>"""
+    return path.partition("/")[0] or None
+
+
+def get_twitch_clip_id(path: str, query: str) -> str:
+    """Returns the slug of twitch.tv/<channel>/clip/<slug> urls"""
+    segments = path.split("/")
+
+    if len(segments) < 3 or segments[1] != "clip":
+        return None
+
+    return segments[2] or None
+
+
+def get_twitch_clips_id(path: str, query: str) -> str:
+    """Returns the slug of clips.twitch.tv/<slug> and clips.twitch.tv/embed?clip=<slug> urls"""
+    if path.rstrip("/") == "embed":
+        return get_query_value(query, "clip")
+
+    return get_first_segment(path, query)
+
+
+def get_streamable_clip_id(path: str, query: str) -> str:
+    """Returns the shortcode of streamable.com/<id> and streamable.com/e/<id> urls"""
+    first, _, rest = path.partition("/")
+
+    if first in ["e", "o", "s"] and rest != "":
+        return rest.partition("/")[0]
+
+    return first or None
+
+
+def get_kick_clip_id(path: str, query: str) -> str:
+    """Returns the clip id of kick.com/<channel>?clip=<id> urls"""
+    return get_query_value(query, "clip")
+
+
+def get_youtube_clip_id(path: str, query: str) -> str:
+    """Returns the video id of youtube.com/watch?v=<id> urls"""
+    if path.rstrip("/") != "watch":
+        return None
+
+    return get_query_value(query, "v")
+
+
+def get_reddit_clip_id(path: str, query: str) -> str:
+    """Returns the post id of reddit.com/r/<subreddit>/comments/<id> urls"""
+    segments = path.split("/", 4)
+
+    if len(segments) < 4 or segments[0] != "r" or segments[2] != "comments":
+        return None
+
+    return segments[3] or None
+
+
+# each host's service and the function that finds a clip id in a url's path and query
+host_classifiers = {
+    "clips.twitch.tv": (ClipService.TWITCH, get_twitch_clips_id),
+    "twitch.tv": (ClipService.TWITCH, get_twitch_clip_id),
+    "m.twitch.tv": (ClipService.TWITCH, get_twitch_clip_id),
+    "streamable.com": (ClipService.STREAMABLE, get_streamable_clip_id),
+    "kick.com": (ClipService.KICK, get_kick_clip_id),
+    "youtube.com": (ClipService.YOUTUBE, get_youtube_clip_id),
+    "m.youtube.com": (ClipService.YOUTUBE, get_youtube_clip_id),
+    "youtu.be": (ClipService.YOUTUBE, get_first_segment),
+    "reddit.com": (ClipService.REDDIT, get_reddit_clip_id),
+    "old.reddit.com": (ClipService.REDDIT, get_reddit_clip_id),
+    "new.reddit.com": (ClipService.REDDIT, get_reddit_clip_id),
+    "v.redd.it": (ClipService.REDDIT, get_first_segment)
+}
+
+
+# a post's url is classified by every stage that handles it, so results are kept
+@lru_cache(maxsize=1024)
+def classify_url(url: str) -> tuple[ClipService, str]:
+    """Returns the service a url belongs to and its clip id, or (ClipService.NONE, None)"""
+    host, path, query = split_url(url)
+
+    classifier = host_classifiers.get(host)
+
+    if classifier is None:
+        return ClipService.NONE, None
+
+    service, get_clip_id = classifier
+    clip_id = get_clip_id(path, query)
+
+    if not clip_id:
+        return ClipService.NONE, None
+
+    return service, clip_id
+
+
+def get_clip_key(url: str) -> str:
+    """Returns a key that is the same for every url of a clip, eg. twitch:<slug>,
+    or None if the url isn't a clip"""
+    service, clip_id = classify_url(url)
+
+    if clip_id is None:
+        return None
+
+    return f"{service.name.lower()}:{clip_id}"
+
+
 def get_clip_service_from_url(url: str) -> ClipService:
     """Returns the clip service from a url"""
-    if is_valid_twitch_clip_url(url):
-        return ClipService.TWITCH
-    if is_valid_streamable_clip(url):
-        return ClipService.STREAMABLE
-    if is_valid_kick_clip(url):
-        return ClipService.KICK
-    if is_valid_youtube_url(url):
-        return ClipService.YOUTUBE
-    if is_valid_reddit_clip_url(url):
-        return ClipService.REDDIT
-
-    return ClipService.NONE
+    return classify_url(url)[0]
 
 
 def is_valid_url(url: str) -> bool:
@@ -76,39 +205,24 @@ def is_valid_url(url: str) -> bool:
 
 def is_valid_reddit_clip_url(url: str) -> bool:
     """Returns true if the url is a reddit clip"""
-    if reddit_clip_pattern.match(url) is None and reddit_shortened_pattern.match(url) is None:
-        return False
-
-    return True
+    return get_clip_service_from_url(url).value == ClipService.REDDIT.value
 
 
 def is_valid_twitch_clip_url(url: str) -> bool:
     """Returns true if the url is a twitch clip"""
-    if twitch_clip_pattern.match(url) is None and twitch_channel_clip_pattern.match(url) is None:
-        return False
-
-    return True
+    return get_clip_service_from_url(url).value == ClipService.TWITCH.value
 
 
 def is_valid_streamable_clip(url: str) -> bool:
     """Returns true if the url is a streamable clip"""
-    if streamable_clip_pattern.match(url) is None:
-        return False
-
-    return True
+    return get_clip_service_from_url(url).value == ClipService.STREAMABLE.value
 
 
 def is_valid_kick_clip(url: str) -> bool:
     """Returns true if the url is a kick clip"""
-    if kick_clip_pattern.match(url) is None:
-        return False
-
-    return True
+    return get_clip_service_from_url(url).value == ClipService.KICK.value
 
 
 def is_valid_youtube_url(url: str) -> bool:
     """Returns true if the url is a youtube clip"""
-    if youtube_clip_pattern.match(url) is None and youtube_share_clip_pattern.match(url) is None:
-        return False
-
-    return True
+    return get_clip_service_from_url(url).value == ClipService.YOUTUBE.value
@@ -0,0 +1,333 @@
+"""Long running render service with a local HTTP/JSON job API
+
+The service keeps the reddit client, loaded TTS engines and web drivers warm between jobs,
+so each job only pays for the work itself. Jobs are rendered one at a time in the order they
+were submitted.
+
+Classes:
+    JobStatus(Enum): The state of a job in the render service
+    ServiceJob: A job submitted to the render service
+    RenderService: Renders queued jobs on a worker thread
+    ServiceRequestHandler(BaseHTTPRequestHandler): Serves the job API of a RenderService
+    LocalServiceClient: Submits jobs to a RenderService in the same process
+    HttpServiceClient: Submits jobs to a RenderService over HTTP
+
+Functions:
+    create_server(service: RenderService, host: str, port: int) -> ThreadingHTTPServer:
+        Creates a HTTP server for the job API of a RenderService
+
+Endpoints:
+    POST /jobs: Queues a job, the body is {"config": <video config json or name>, ...job settings}
+    GET /jobs: Lists every job
+    GET /jobs/<id>: Gets the status of a job
+    GET /jobs/<id>/output: Gets the output path of a finished job
+
+Example:
+    >>> service = RenderService(reddit, video_configs)
+    >>> service.start()
+    >>> client = LocalServiceClient(service)
+    >>> job_id = client.enqueue("YouTube haiku")
+    >>> client.status(job_id)["status"]
+    'queued'
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from queue import Queue
+from threading import Lock, Thread
+from time import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from uuid import uuid4
+
+from reddit_to_video.batch import BatchJob, run_batch_job
+from reddit_to_video.video.config import VideoConfig
+from reddit_to_video.scraping.browser import close_browser_pools
+from reddit_to_video.exceptions import ConfigKeyError, NotInCollectionError, DirectoryNotFoundError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8620
+
+
+class JobStatus(Enum):
+    """The state of a job in the render service"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+
+@dataclass
+class ServiceJob:
+    """A job submitted to the render service"""
+    id: str
+    batch_job: BatchJob
+    status: JobStatus = JobStatus.QUEUED
+    output_path: str = None
+    error: str = None
+    created: float = field(default_factory=time)
+    finished: float = None
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "config": self.batch_job.config.name,
+            "status": self.status.value,
+            "output": self.output_path,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished
+        }
+
+
+class RenderService:
+    """Renders queued jobs on a worker thread, keeping resources warm between jobs"""
+
+    def __init__(self, reddit, video_configs: list = None, runner=None):
+        """Initialises the render service. The runner renders a BatchJob and returns its
+        output path, by default it is run_batch_job with the service's reddit client"""
+        self.reddit = reddit
+        self.video_configs = {
+            config.name: config for config in video_configs or []}
+
+        self.runner = runner
+
+        if self.runner is None:
+            self.runner = lambda job: run_batch_job(self.reddit, job)
+
+        self.jobs = {}
+        self._jobs_lock = Lock()
+        self._queue = Queue()
+        self._worker = None
+
+    def start(self):
+        """Starts the worker thread"""
+        if self._worker is not None:
+            return
+
+        self._worker = Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stops the worker thread after the running job and closes warm resources"""
+        if self._worker is None:
+            return
+
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+
+        close_browser_pools()
+
+    def enqueue(self, config, **job_settings) -> str:
+        """Queues a job and returns its id. The config can be a VideoConfig,
+        video config json, or the name of a config the service was started with"""
+        if isinstance(config, str):
+            if config not in self.video_configs:
+                raise ConfigKeyError(f"Service: No video config named {config}")
+            config = self.video_configs[config]
+        elif isinstance(config, dict):
+            config = VideoConfig(config)
+
+        job = ServiceJob(uuid4().hex, BatchJob(config, **job_settings))
+
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+
+        self._queue.put(job)
+
+        return job.id
+
+    def get_job(self, job_id: str) -> ServiceJob:
+        """Gets a job by its id"""
+        with self._jobs_lock:
+            if job_id not in self.jobs:
+                raise NotInCollectionError(f"Service: No job with id {job_id}")
+
+            return self.jobs[job_id]
+
+    def all_jobs(self) -> list[ServiceJob]:
+        """Gets every job in the order they were submitted"""
+        with self._jobs_lock:
+            return list(self.jobs.values())
+
+    def wait(self):
+        """Blocks until every queued job has been rendered"""
+        self._queue.join()
+
+    def _work(self):
+        """Renders jobs from the queue until stopped"""
+        while True:
+            job = self._queue.get()
+
+            if job is None:
+                self._queue.task_done()
+                return
+
+            job.status = JobStatus.RUNNING
+
+            try:
+                job.output_path = self.runner(job.batch_job)
+                job.status = JobStatus.FINISHED
+            except Exception as e:
+                job.error = str(e)
+                job.status = JobStatus.FAILED
+
+            job.finished = time()
+            self._queue.task_done()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Serves the job API of the RenderService set on the server"""
+
+    def _send_json(self, status: int, body):
+        data = dumps(body).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _get_job(self, job_id: str) -> ServiceJob:
+        try:
+            return self.server.service.get_job(job_id)
+        except NotInCollectionError as e:
+            self._send_json(404, {"error": str(e)})
+            return None
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+
+        if parts == ["jobs"]:
+            self._send_json(
+                200, [job.to_json() for job in self.server.service.all_jobs()])
+            return
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self._get_job(parts[1])
+
+            if job is not None:
+                self._send_json(200, job.to_json())
+            return
+
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "output":
+            job = self._get_job(parts[1])
+
+            if job is None:
+                return
+
+            if job.status != JobStatus.FINISHED:
+                self._send_json(
+                    409, {"error": f"Job is {job.status.value}", "status": job.status.value})
+                return
+
+            self._send_json(200, {"output": job.output_path})
+            return
+
+        self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path.strip("/") != "jobs":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = loads(self.rfile.read(length) or b"{}")
+
+            if "config" not in body:
+                raise ConfigKeyError("Service: Missing key config")
+
+            config = body.pop("config")
+            job_id = self.server.service.enqueue(config, **body)
+        except (ValueError, TypeError, ConfigKeyError, FileNotFoundError, DirectoryNotFoundError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        self._send_json(202, self.server.service.get_job(job_id).to_json())
+
+    def log_message(self, format, *args):
+        # requests are polled often, keep the console for render output
+        pass
+
+
+def create_server(service: RenderService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Creates a HTTP server for the job API of a RenderService"""
+    server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    server.service = service
+
+    return server
+
+
+class LocalServiceClient:
+    """Submits jobs to a RenderService in the same process"""
+
+    def __init__(self, service: RenderService):
+        self.service = service
+
+    def enqueue(self, config, **job_settings) -> str:
+        """Queues a job and returns its id"""
+        return self.service.enqueue(config, **job_settings)
+
+    def status(self, job_id: str) -> dict:
+        """Gets the status of a job"""
+        return self.service.get_job(job_id).to_json()
+
+    def output(self, job_id: str) -> str:
+        """Gets the output path of a job, or None if it hasn't finished"""
+        return self.service.get_job(job_id).output_path
+
+
+class HttpServiceClient:
+    """Submits jobs to a RenderService over HTTP"""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, timeout: int = 10):
+        self.url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def _request(self, path: str, body: dict = None) -> tuple[int, dict]:
+        data = None
+
+        if body is not None:
+            data = dumps(body).encode("utf-8")
+
+        request = Request(self.url + path, data=data, headers={
+                          "Content-Type": "application/json"})
+
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, loads(response.read())
+        except HTTPError as e:
+            return e.code, loads(e.read())
+
+    def enqueue(self, config, **job_settings) -> str:
+        """Queues a job and returns its id"""
+        status, body = self._request("/jobs", {"config": config, **job_settings})
+
+        if status != 202:
+            raise ValueError(f"HttpServiceClient() {body['error']}")
+
+        return body["id"]
+
+    def status(self, job_id: str) -> dict:
+        """Gets the status of a job"""
+        status, body = self._request(f"/jobs/{job_id}")
+
+        if status != 200:
+            raise NotInCollectionError(f"HttpServiceClient() {body['error']}")
+
+        return body
+
+    def output(self, job_id: str) -> str:
+        """Gets the output path of a job, or None if it hasn't finished"""
+        status, body = self._request(f"/jobs/{job_id}/output")
+
+        if status == 409:
+            return None
+        if status != 200:
+            raise NotInCollectionError(f"HttpServiceClient() {body['error']}")
+
+        return body["output"]
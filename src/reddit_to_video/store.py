@@ -0,0 +1,417 @@
+"""Content addressed store for downloaded media
+
+Media is stored by a hash of its clip id (or normalised source url for other urls) instead
+of the id of the post it came from, so a clip cross posted to several subreddits is only
+downloaded once, and a second url that serves identical bytes shares the first url's file. Each entry has a json
+sidecar in the index with its url, size, content hash and when it was last used.
+
+Downloads are single flight, a thread lock and a lock file make sure concurrent threads
+and worker processes never fetch the same url twice, the others wait and reuse the result.
+When the store is over its disk budget the least recently used entries are evicted,
+except pinned entries (footage that configs reference) and entries used in this run.
+
+Classes:
+    MediaStore: Stores downloaded media by url with single flight downloads and LRU eviction
+
+Functions:
+    normalise_url(url: str) -> str: Normalises a url so different forms of it share a key
+    get_media_store() -> MediaStore: Gets the shared media store, creating it on first use
+    configure_media_store(store_dir: str = None, budget_mb: float = None): Sets where and how big the shared store is
+    get_footage(footage: str) -> str: Returns the local path of footage, downloading and pinning urls
+
+Example:
+    >>> from reddit_to_video.store import get_media_store
+    >>> store = get_media_store()
+    >>> url = "https://streamable.com/fpuv4"
+    >>> store.fetch(url, lambda path: download_streamable_video(url, path))
+    'output/store/media/2f1d5e0c1b6b2c5e77cd4d9b8a3a6b9d1f7c0e53.mp4'
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from hashlib import sha1, sha256
+from json import dumps, loads
+from os import listdir as list_dir
+from os import makedirs as make_dir
+from os import remove as remove_file
+from os import replace as replace_file
+from os.path import getmtime as get_modified_time
+from os.path import getsize as get_size
+from os.path import isdir as is_dir
+from os.path import isfile as is_file
+from os.path import join as path_join
+from os.path import splitext as split_ext
+from threading import Lock
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from uuid import uuid4
+
+from reddit_to_video.scraping.validator import get_clip_key
+
+DEFAULT_STORE_PATH = "output/store/"
+
+# query parameters that only track where a link was shared from
+TRACKING_PARAMS = ["utm_source", "utm_medium", "utm_campaign", "utm_term",
+                   "utm_content", "ref", "ref_source", "si", "feature", "share_id"]
+
+# a lock file older than this is left over from a crashed process
+STALE_LOCK_SECONDS = 30 * 60
+LOCK_POLL_SECONDS = 0.2
+
+
+def normalise_url(url: str) -> str:
+    """Normalises a url so different forms of it share a key.
+    Lower cases the scheme and host, removes www., fragments, tracking parameters
+    and trailing slashes, and sorts the query"""
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower() or "https"
+    if scheme == "http":
+        scheme = "https"
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+
+    path = parts.path.rstrip("/")
+
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMS)
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def get_file_hash(path: str) -> str:
+    """Returns the sha256 of a file, read in chunks"""
+    file_hash = sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+class MediaStore:
+    """Stores downloaded media by url with single flight downloads and LRU eviction"""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_PATH, budget_mb: float = None):
+        """Initialises the store. Entries are evicted when the store is bigger than
+        budget_mb megabytes, None or 0 means the store is never evicted"""
+        self.store_dir = store_dir
+        self.budget_mb = budget_mb
+
+        self.media_dir = path_join(store_dir, "media")
+        self.index_dir = path_join(store_dir, "index")
+        self.lock_dir = path_join(store_dir, "locks")
+
+        self._lock = Lock()
+        self._key_locks = {}
+        # keys used in this run, never evicted while the run needs them
+        self._session_keys = set()
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        """Returns the key of a url's entry. Clip urls are keyed by their clip id,
+        so every form of a clip's url shares an entry"""
+        clip_key = get_clip_key(url)
+
+        if clip_key is None:
+            clip_key = normalise_url(url)
+
+        return sha1(clip_key.encode("utf-8")).hexdigest()
+
+    def _get_index_path(self, key: str) -> str:
+        return path_join(self.index_dir, f"{key}.json")
+
+    def _get_key_lock(self, key: str) -> Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = Lock()
+
+            return self._key_locks[key]
+
+    def _read_entry(self, key: str) -> dict:
+        """Returns the index entry of a key, or None if there isn't one"""
+        try:
+            with open(self._get_index_path(key), "r", encoding="utf-8") as file:
+                return loads(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, entry: dict) -> None:
+        """Writes an index entry, atomically so readers never see half an entry"""
+        make_dir(self.index_dir, exist_ok=True)
+
+        path = self._get_index_path(entry["key"])
+        temp_path = f"{path}.{uuid4().hex}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(dumps(entry))
+
+        replace_file(temp_path, path)
+
+    def entries(self) -> list[dict]:
+        """Returns every entry in the index"""
+        if not is_dir(self.index_dir):
+            return []
+
+        entries = []
+
+        for file_ in list_dir(self.index_dir):
+            if file_.endswith(".json"):
+                entry = self._read_entry(file_[:-len(".json")])
+
+                if entry is not None:
+                    entries.append(entry)
+
+        return entries
+
+    def get(self, url: str) -> str:
+        """Returns the path of a url's media, or None if it isn't stored"""
+        key = self.get_key(url)
+        entry = self._read_entry(key)
+
+        if entry is None:
+            return None
+
+        path = path_join(self.media_dir, entry["file"])
+
+        if not is_file(path):
+            # the file was removed outside the store
+            self._remove_entries([entry])
+            return None
+
+        entry["last_used"] = time.time()
+        self._write_entry(entry)
+        self._session_keys.add(key)
+
+        return path
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        """Context manager holding a lock file for a key, shared with other processes"""
+        make_dir(self.lock_dir, exist_ok=True)
+        lock_path = path_join(self.lock_dir, f"{key}.lock")
+
+        while True:
+            try:
+                lock_file = os.open(
+                    lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - get_modified_time(lock_path) > STALE_LOCK_SECONDS:
+                        remove_file(lock_path)
+                        continue
+                except OSError:
+                    # released between the two checks
+                    continue
+
+                time.sleep(LOCK_POLL_SECONDS)
+
+        try:
+            os.write(lock_file, str(os.getpid()).encode("utf-8"))
+            os.close(lock_file)
+            yield
+        finally:
+            try:
+                remove_file(lock_path)
+            except OSError:
+                pass
+
+    def fetch(self, url: str, download, extension: str = ".mp4", pin: bool = False) -> str:
+        """Returns the path of a url's media, calling download(path) to create the file
+        if it isn't stored. Concurrent fetches of the same url only download it once.
+        download must create the file atomically, it is only called if no other thread or
+        process is downloading the url"""
+        key = self.get_key(url)
+
+        with self._get_key_lock(key):
+            path = self.get(url)
+
+            if path is None:
+                with self._file_lock(key):
+                    # another process may have finished it while we waited
+                    path = self.get(url)
+
+                    if path is None:
+                        path = self._download(url, key, download, extension)
+
+            if pin:
+                self.pin(url)
+
+        self.evict()
+
+        return path
+
+    def _download(self, url: str, key: str, download, extension: str) -> str:
+        """Downloads a url's media and adds it to the index, sharing the file of an
+        entry with the same content"""
+        make_dir(self.media_dir, exist_ok=True)
+
+        file_name = key + extension
+        path = path_join(self.media_dir, file_name)
+
+        download(path)
+
+        if not is_file(path):
+            raise FileNotFoundError(
+                f"MediaStore.fetch() download of {url} didn't create {path}")
+
+        content_hash = get_file_hash(path)
+
+        for entry in self.entries():
+            existing_path = path_join(self.media_dir, entry["file"])
+
+            if (entry.get("content_hash") == content_hash and entry["file"] != file_name
+                    and is_file(existing_path)):
+                remove_file(path)
+                file_name = entry["file"]
+                path = existing_path
+                break
+
+        now = time.time()
+
+        self._write_entry({
+            "key": key,
+            "url": url,
+            "normalised_url": normalise_url(url),
+            "file": file_name,
+            "size": get_size(path),
+            "content_hash": content_hash,
+            "created": now,
+            "last_used": now,
+            "pinned": False
+        })
+
+        self._session_keys.add(key)
+
+        return path
+
+    def pin(self, url: str, pinned: bool = True) -> None:
+        """Pins a url's media so it is never evicted, or unpins it"""
+        entry = self._read_entry(self.get_key(url))
+
+        if entry is None:
+            raise KeyError(f"MediaStore.pin() {url} is not stored")
+
+        entry["pinned"] = pinned
+        self._write_entry(entry)
+
+    def get_size(self) -> int:
+        """Returns the size of the stored media in bytes, shared files count once"""
+        return sum({entry["file"]: entry["size"] for entry in self.entries()}.values())
+
+    def evict(self, budget_mb: float = None) -> list[str]:
+        """Removes the least recently used media until the store fits in the budget.
+        Pinned entries and entries used in this run are kept.
+        Returns the urls of the removed entries"""
+        if budget_mb is None:
+            budget_mb = self.budget_mb
+
+        if not budget_mb:
+            return []
+
+        budget = budget_mb * 1024 * 1024
+
+        files = {}
+
+        for entry in self.entries():
+            files.setdefault(entry["file"], []).append(entry)
+
+        size = sum(entries[0]["size"] for entries in files.values())
+
+        if size <= budget:
+            return []
+
+        evictable = [entries for entries in files.values()
+                     if not any(entry.get("pinned") or entry["key"] in self._session_keys
+                                for entry in entries)]
+
+        # least recently used file first, a shared file is as recent as its newest entry
+        evictable.sort(key=lambda entries: max(
+            entry["last_used"] for entry in entries))
+
+        removed = []
+
+        for entries in evictable:
+            if size <= budget:
+                break
+
+            self._remove_entries(entries)
+            size -= entries[0]["size"]
+            removed += [entry["url"] for entry in entries]
+
+        return removed
+
+    def _remove_entries(self, entries: list[dict]) -> None:
+        """Removes entries from the index and their file if no other entry uses it"""
+        for entry in entries:
+            try:
+                remove_file(self._get_index_path(entry["key"]))
+            except OSError:
+                pass
+
+        files = {entry["file"] for entry in entries}
+        used_files = {entry["file"] for entry in self.entries()}
+
+        for file_ in files - used_files:
+            try:
+                remove_file(path_join(self.media_dir, file_))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """Removes every entry and file from the store, including pinned ones"""
+        for directory in [self.index_dir, self.media_dir]:
+            if not is_dir(directory):
+                continue
+
+            for file_ in list_dir(directory):
+                remove_file(path_join(directory, file_))
+
+        self._session_keys.clear()
+
+
+store_settings = {"store_dir": DEFAULT_STORE_PATH, "budget_mb": None}
+shared_store = None
+store_lock = Lock()
+
+
+def configure_media_store(store_dir: str = None, budget_mb: float = None) -> None:
+    """Sets where the shared store is and its disk budget, call before it is used"""
+    global shared_store
+
+    if store_dir is not None:
+        store_settings["store_dir"] = store_dir
+    if budget_mb is not None:
+        store_settings["budget_mb"] = budget_mb
+
+    shared_store = None
+
+
+def get_media_store() -> MediaStore:
+    """Gets the shared media store, creating it on first use"""
+    global shared_store
+
+    with store_lock:
+        if shared_store is None:
+            shared_store = MediaStore(**store_settings)
+
+        return shared_store
+
+
+def get_footage(footage: str) -> str:
+    """Returns the local path of footage. Footage urls are downloaded into the
+    media store and pinned so they are never evicted"""
+    if footage is None or not footage.lower().startswith(("http://", "https://")):
+        return footage
+
+    # imported here so the store can be used without loading requests
+    from reddit_to_video.scraping.download import download_file
+
+    extension = split_ext(urlsplit(footage).path)[1] or ".mp4"
+
+    return get_media_store().fetch(footage, lambda path: download_file(footage, path),
+                                   extension=extension, pin=True)
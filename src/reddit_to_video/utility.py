@@ -10,6 +10,12 @@ Functions:
     get_audio_duration(audio_path: str) -> float: 
         Returns the duration of an audio file in seconds
 
+    get_audio_info(audio_path: str) -> tuple[float, int]: 
+        Returns the duration and sample rate of an audio file
+
+    read_audio(audio_path: str, channels: int = None) -> tuple[numpy.ndarray, int]: 
+        Returns the samples and sample rate of an audio file
+
     get_video_duration(video_path: str) -> float: 
         Returns the duration of a video file in seconds
     
@@ -22,6 +28,12 @@ Functions:
     split_sentences(text: str) -> list: 
         Splits text into sentences
 
+    split_tts_sentences(text: str) -> list[str]: 
+        Splits text into the sentences a TTS engine reads separately
+
+    join_samples(samples: list, sample_rate: int, gap: float = DEFAULT_SENTENCE_GAP) -> numpy.ndarray: 
+        Joins the samples of sentences in order, with silence between them
+
     preview_video(video_path: str) -> None: 
         Opens the video in the default video player
 
@@ -38,14 +50,12 @@ from os.path import isdir as is_dir
 from os.path import join as path_join
 from os import makedirs as make_dir
 
-from requests import get
-
-from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.audio.io.AudioFileClip import AudioFileClip
-
 from reddit_to_video.exceptions import OsNotSupportedError
 
-GLOBAL_TIMEOUT = 3000
+# seconds of silence between sentences read separately, about what Coqui puts between them itself
+DEFAULT_SENTENCE_GAP = 0.45
+
+word_pattern = re.compile(r"\w")
 
 
 def remove_links_from_text(text: str) -> str:
@@ -57,10 +67,10 @@ def remove_links_from_text(text: str) -> str:
 
 def download_img(url: str, destination: str) -> None:
     """Downloads an image from a url to a destination"""
-    img_data = get(url, timeout=GLOBAL_TIMEOUT).content
+    # imported here so importing utility doesn't load requests
+    from reddit_to_video.scraping.download import download_file
 
-    with open(destination, 'wb') as handler:
-        handler.write(img_data)
+    download_file(url, destination)
 
 
 def get_audio_duration(audio_path: str) -> float:
@@ -69,16 +79,75 @@ def get_audio_duration(audio_path: str) -> float:
         raise FileNotFoundError(
             f"get_audio_duration() audio_path {audio_path} is not a file")
 
-    if not audio_path.endswith(".mp3"):
+    if not audio_path.endswith(".mp3") and not audio_path.endswith(".wav"):
         raise TypeError(
-            f"get_audio_duration() audio_path {audio_path} is not an mp3 file")
+            f"get_audio_duration() audio_path {audio_path} is not an mp3 or wav file")
+
+    if audio_path.endswith(".wav"):
+        import soundfile
+
+        # the sample count in the header, without decoding or starting ffmpeg
+        info = soundfile.info(audio_path)
+        return info.frames / info.samplerate
+
+    # moviepy is imported here so importing utility doesn't start ffmpeg lookups
+    from moviepy.audio.io.AudioFileClip import AudioFileClip
 
     audio = AudioFileClip(audio_path)
     return audio.duration
 
 
+def get_audio_info(audio_path: str) -> tuple[float, int]:
+    """Returns the duration in seconds and the sample rate of an audio file.
+    Read from the file's header with soundfile when it can, otherwise with moviepy"""
+    if not is_file(audio_path):
+        raise FileNotFoundError(
+            f"get_audio_info() audio_path {audio_path} is not a file")
+
+    try:
+        import soundfile
+
+        info = soundfile.info(audio_path)
+        return info.duration, info.samplerate
+    except Exception:
+        # older libsndfile builds can't read mp3
+        pass
+
+    from moviepy.audio.io.AudioFileClip import AudioFileClip
+
+    audio = AudioFileClip(audio_path)
+
+    try:
+        return audio.duration, audio.fps
+    finally:
+        audio.close()
+
+
+def read_audio(audio_path: str, channels: int = None) -> tuple:
+    """Returns the samples of an audio file as a (frames, channels) float32 array, and its
+    sample rate. Mono audio is copied to every channel if channels is given"""
+    if not is_file(audio_path):
+        raise FileNotFoundError(
+            f"read_audio() audio_path {audio_path} is not a file")
+
+    import numpy
+    import soundfile
+
+    samples, sample_rate = soundfile.read(audio_path, dtype="float32", always_2d=True)
+
+    if channels is not None and samples.shape[1] != channels:
+        if samples.shape[1] != 1:
+            samples = samples.mean(axis=1, keepdims=True)
+
+        samples = numpy.repeat(samples, channels, axis=1)
+
+    return samples, sample_rate
+
+
 def get_video_duration(video_path: str) -> float:
     """Returns the duration of a video file in seconds"""
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+
     video = VideoFileClip(video_path)
     return video.duration
 
@@ -105,6 +174,31 @@ def split_sentences(text: str) -> list:
     return re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?)\s', text)
 
 
+def split_tts_sentences(text: str) -> list[str]:
+    """Splits text into the sentences a TTS engine reads separately, without sentences
+    that have nothing to say (eg. only punctuation)"""
+    text = remove_links_from_text(text)
+
+    return [sentence.strip() for sentence in split_sentences(text) if word_pattern.search(sentence)]
+
+
+def join_samples(samples: list, sample_rate: int, gap: float = DEFAULT_SENTENCE_GAP):
+    """Joins the samples of sentences in order, with gap seconds of silence between them"""
+    import numpy
+
+    # stereo samples are (frames, channels), the silence has the same channels
+    channels = numpy.shape(samples[0])[1:] if len(samples) > 0 else ()
+    silence = numpy.zeros((int(round(gap * sample_rate)),) + channels, dtype=numpy.float32)
+    pieces = []
+
+    for i, sentence_samples in enumerate(samples):
+        if i > 0 and len(silence) > 0:
+            pieces.append(silence)
+        pieces.append(sentence_samples)
+
+    return numpy.concatenate(pieces) if len(pieces) > 0 else numpy.zeros(0, dtype=numpy.float32)
+
+
 def preview_video(video_path: str) -> None:
     """Opens a video file in the default video player"""
     if not is_file(video_path):
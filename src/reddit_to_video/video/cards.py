@@ -0,0 +1,260 @@
+"""Draws reddit style title and comment cards from post and comment records
+
+Cards are drawn with Pillow straight from the data the API returns, so no browser
+is needed, they don't break when reddit changes its layout, and many cards can be
+drawn at once in a process pool. The images are drop in replacements for screenshots
+in a ScriptElement.
+
+Classes:
+    CardTemplate(dataclass): Layout, font and colour settings for cards
+
+Functions:
+    load_font(size: int, bold: bool = False, font_path: str = None) -> ImageFont:
+        Loads a font, cached so each font is only read from disk once per process
+
+    wrap_text(text: str, font, max_width: int) -> list[str]:
+        Splits text into lines that fit in a width
+
+    format_score(score: int) -> str:
+        Formats a score the way reddit does, eg. 12.3k
+
+    render_title_card(post: PostRecord, output_path: str, template: CardTemplate = None) -> str:
+        Draws a card for a post's title
+
+    render_comment_card(comment: CommentRecord, output_path: str, template: CardTemplate = None) -> str:
+        Draws a card for a comment
+
+    render_cards(cards: list[tuple[Record, str]], template: CardTemplate = None, processes: int = None,
+                 pool: Pool = None) -> list[str]:
+        Draws many cards in a process pool
+
+Example:
+    >>> from reddit_to_video.video.cards import render_comment_card
+    >>> render_comment_card(comment, "output/comments/comment card - g4q7xu.png")
+    'output/comments/comment card - g4q7xu.png'
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from html import unescape
+from multiprocessing.pool import Pool
+
+from PIL import Image, ImageDraw, ImageFont
+
+from reddit_to_video.records import PostRecord, CommentRecord
+
+# tried in order when a template doesn't set a font, covers windows, linux and mac
+REGULAR_FONTS = ["arial.ttf", "DejaVuSans.ttf", "Arial.ttf", "Helvetica.ttc"]
+BOLD_FONTS = ["arialbd.ttf", "DejaVuSans-Bold.ttf",
+              "Arial Bold.ttf", "Helvetica.ttc"]
+
+
+@dataclass
+class CardTemplate:
+    """Layout, font and colour settings for cards, the defaults match reddit's dark theme"""
+    width: int = 1000
+    padding: int = 32
+    corner_radius: int = 16
+
+    font_path: str = None
+    bold_font_path: str = None
+    title_size: int = 44
+    body_size: int = 34
+    meta_size: int = 24
+    line_spacing: float = 1.3
+
+    background: tuple = (26, 26, 27, 255)
+    text_colour: tuple = (215, 218, 220, 255)
+    meta_colour: tuple = (129, 131, 132, 255)
+    accent_colour: tuple = (255, 69, 0, 255)
+
+    @classmethod
+    def from_json(cls, json: dict):
+        """Creates a template from a config's card_template, colours are json lists"""
+        return cls(**{key: tuple(value) if isinstance(value, list) else value
+                      for key, value in json.items()})
+
+
+@lru_cache(maxsize=None)
+def load_font(size: int, bold: bool = False, font_path: str = None):
+    """Loads a font, cached so each font is only read from disk once per process"""
+    candidates = BOLD_FONTS if bold else REGULAR_FONTS
+
+    if font_path is not None:
+        candidates = [font_path]
+
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+
+    if font_path is not None:
+        raise FileNotFoundError(f"load_font() font {font_path} not found")
+
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # older Pillow versions only have a fixed size default font
+        return ImageFont.load_default()
+
+
+def wrap_text(text: str, font, max_width: int) -> list[str]:
+    """Splits text into lines that fit in a width, keeping the text's own line breaks"""
+    lines = []
+
+    for paragraph in text.splitlines():
+        line = ""
+
+        for word in paragraph.split():
+            # words wider than a whole line are split by character
+            while font.getlength(word) > max_width:
+                split = len(word) - 1
+                while split > 1 and font.getlength(word[:split]) > max_width:
+                    split -= 1
+
+                if line != "":
+                    lines.append(line)
+                    line = ""
+
+                lines.append(word[:split])
+                word = word[split:]
+
+            candidate = word if line == "" else f"{line} {word}"
+
+            if font.getlength(candidate) <= max_width:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+
+        lines.append(line)
+
+    return lines
+
+
+def format_score(score: int) -> str:
+    """Formats a score the way reddit does, eg. 12.3k"""
+    if score is None:
+        return "0"
+    if abs(score) >= 100_000:
+        return f"{score / 1000:.0f}k"
+    if abs(score) >= 1000:
+        return f"{score / 1000:.1f}k"
+
+    return str(score)
+
+
+def get_line_height(font, template: CardTemplate) -> int:
+    """Returns the height of a line of text including spacing"""
+    ascent, descent = font.getmetrics()
+    return round((ascent + descent) * template.line_spacing)
+
+
+def draw_card(sections: list[tuple[list[str], object, tuple]], output_path: str, template: CardTemplate) -> str:
+    """Draws sections of lines, each with a font and colour, onto a rounded card"""
+    height = template.padding * 2
+
+    for lines, font, _ in sections:
+        height += get_line_height(font, template) * len(lines)
+
+    image = Image.new("RGBA", (template.width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    draw.rounded_rectangle((0, 0, template.width - 1, height - 1),
+                           radius=template.corner_radius, fill=template.background)
+
+    y = template.padding
+
+    for lines, font, colour in sections:
+        line_height = get_line_height(font, template)
+
+        for line in lines:
+            draw.text((template.padding, y), line, font=font, fill=colour)
+            y += line_height
+
+    image.save(output_path)
+
+    return output_path
+
+
+def get_awards_text(total_awards: int) -> str:
+    if not total_awards:
+        return ""
+
+    return f" • {total_awards} award{'s' if total_awards != 1 else ''}"
+
+
+def render_title_card(post: PostRecord, output_path: str, template: CardTemplate = None) -> str:
+    """Draws a card for a post's title"""
+    if template is None:
+        template = CardTemplate()
+
+    text_width = template.width - template.padding * 2
+
+    meta_font = load_font(template.meta_size, font_path=template.font_path)
+    title_font = load_font(template.title_size, True,
+                           template.bold_font_path)
+
+    header = f"r/{post.subreddit} • Posted by u/{post.author or '[deleted]'}"
+    footer = (f"{format_score(post.score)} points • {format_score(post.num_comments)} comments"
+              f"{get_awards_text(post.total_awards)}")
+
+    return draw_card([
+        ([header], meta_font, template.meta_colour),
+        (wrap_text(unescape(post.title), title_font, text_width),
+         title_font, template.text_colour),
+        ([footer], meta_font, template.accent_colour)
+    ], output_path, template)
+
+
+def render_comment_card(comment: CommentRecord, output_path: str, template: CardTemplate = None) -> str:
+    """Draws a card for a comment"""
+    if template is None:
+        template = CardTemplate()
+
+    text_width = template.width - template.padding * 2
+
+    meta_font = load_font(template.meta_size, font_path=template.font_path)
+    body_font = load_font(template.body_size, font_path=template.font_path)
+
+    header = (f"u/{comment.author or '[deleted]'} • {format_score(comment.score)} points"
+              f"{get_awards_text(comment.total_awards)}")
+
+    return draw_card([
+        ([header], meta_font, template.meta_colour),
+        # reddit escapes &, < and > in comment bodies
+        (wrap_text(unescape(comment.body), body_font, text_width),
+         body_font, template.text_colour)
+    ], output_path, template)
+
+
+def render_card(record, output_path: str, template: CardTemplate = None) -> str:
+    """Draws a title or comment card depending on the record"""
+    if isinstance(record, PostRecord):
+        return render_title_card(record, output_path, template)
+    if isinstance(record, CommentRecord):
+        return render_comment_card(record, output_path, template)
+
+    raise TypeError(f"render_card() can't draw a card for {type(record)}")
+
+
+def render_card_args(args) -> str:
+    return render_card(*args)
+
+
+def render_cards(cards: list[tuple[object, str]], template: CardTemplate = None, processes: int = None,
+                 pool: Pool = None) -> list[str]:
+    """Draws many cards in a process pool, cards are (record, output path) pairs.
+    An existing pool can be given to draw several batches without starting new processes.
+    Returns the output paths in the same order as the cards"""
+    if len(cards) <= 1 or processes == 1:
+        return [render_card(record, output_path, template) for record, output_path in cards]
+
+    args = [(record, output_path, template) for record, output_path in cards]
+
+    if pool is not None:
+        return pool.map(render_card_args, args)
+
+    with Pool(processes=processes) as pool:
+        return pool.map(render_card_args, args)
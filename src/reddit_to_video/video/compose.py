@@ -3,28 +3,67 @@
 This module contains functions to compose a video from a VideoScript and a background footage.
 
 Functions:
+    createAudioClip: 
+    Creates the AudioClip of a ScriptElement, from its samples when it has them
+
     createCommentClip: 
     Creates a VideoClip from a ScriptElement in the format of a reddit comment
 
     composeCommentVideo: 
     Creates a reddit comment video from a VideoScript and a background footage
+
+    composeVideoVideo: 
+    Creates a post based video from a VideoScript, joining ingested clips without re-encoding
 """
 
 from os.path import isfile as is_file
 
+import numpy as np
+
 # DO NOT import from moviepy.editor (has overhead)
 from moviepy.video.io.VideoFileClip import VideoFileClip
 from moviepy.video.VideoClip import ImageClip
 from moviepy.audio.io.AudioFileClip import AudioFileClip
+from moviepy.audio.AudioClip import AudioArrayClip
 from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 from moviepy.video.compositing.concatenate import concatenate_videoclips
 
 from reddit_to_video.video.script import VideoScript
 from reddit_to_video.video.scriptelement import ScriptElement
 from reddit_to_video.video.export_settings import ExportSettings
-from reddit_to_video.utility import can_write_to_file, write_temp
+from reddit_to_video.utility import can_write_to_file, write_temp, read_audio
 from reddit_to_video.exceptions import EmptyCollectionError, OutputPathValidationError
-from reddit_to_video.audio import normalise_audio_bytes
+from reddit_to_video.audio import normalise_audio_bytes, resample_audio
+
+# the sample rate audio is mixed at, the same as moviepy's default
+AUDIO_FPS = 44100
+AUDIO_CHANNELS = 2
+
+
+def createAudioClip(script_element: ScriptElement):
+    """Creates the AudioClip of a ScriptElement, or None if it has no audio.
+    Samples and wav files are used as they are, so the audio is only encoded once when the
+    video is written. Other files are decoded by ffmpeg"""
+    if script_element.audio is not None:
+        samples, sample_rate = script_element.audio
+    elif script_element.audio_path is not None and script_element.audio_path.endswith(".wav") \
+            and is_file(script_element.audio_path):
+        samples, sample_rate = read_audio(script_element.audio_path)
+    elif script_element.audio_path is not None and is_file(script_element.audio_path):
+        return AudioFileClip(script_element.audio_path)
+    else:
+        return None
+
+    samples = np.asarray(samples, dtype=np.float32)
+
+    if samples.ndim == 1:
+        samples = samples[:, np.newaxis]
+
+    # clips are mixed together, so every clip has the same channels and rate
+    if samples.shape[1] != AUDIO_CHANNELS:
+        samples = np.repeat(samples.mean(axis=1, keepdims=True), AUDIO_CHANNELS, axis=1)
+
+    return AudioArrayClip(resample_audio(samples, sample_rate, AUDIO_FPS), fps=AUDIO_FPS)
 
 
 def createCommentClip(script_element: ScriptElement):
@@ -33,12 +72,10 @@ def createCommentClip(script_element: ScriptElement):
         raise Exception(
             f"createClip() visual path {script_element.visual_path} is not a file")
 
-    audio_clip = None
-
     # external audio can be optional if video
-    if is_file(script_element.audio_path):
-        audio_clip = AudioFileClip(script_element.audio_path)
-    elif not script_element.is_video:
+    audio_clip = createAudioClip(script_element)
+
+    if audio_clip is None and not script_element.is_video:
         raise Exception(
             f"createClip() audio path {script_element.audio_path} is not a file and visual is not a video")
 
@@ -98,8 +135,10 @@ def composeCommentVideo(output_file: str, background_footage: str, script: Video
         output_file, logger=logger, **export_settings.unbox())
 
 
-def composeVideoVideo(output_file: str, script: VideoScript, target_resolution: tuple[int, int] = None, normalise_audio: float = None, export_settings: ExportSettings = None, logger=None):
-    """Creates a post based video from a VideoScript, compiling multiple videos into one"""
+def composeVideoVideo(output_file: str, script: VideoScript, target_resolution: tuple[int, int] = None, normalise_audio: float = None, export_settings: ExportSettings = None, logger=None, stream_copy: bool = False):
+    """Creates a post based video from a VideoScript, compiling multiple videos into one.
+    With stream_copy every clip must already be ingested to the output's profile,
+    they are joined without re-encoding"""
     if len(script) == 0:
         raise EmptyCollectionError("composeVideoVideo() script is empty")
 
@@ -111,6 +150,14 @@ def composeVideoVideo(output_file: str, script: VideoScript, target_resolution:
         raise OutputPathValidationError(
             f"composeVideoVideo() output file {output_file} is not valid")
 
+    if stream_copy and normalise_audio is None:
+        # imported here so renders that don't ingest never load it
+        from reddit_to_video.video.ingest import concat_clips
+
+        concat_clips(
+            [script_element.visual_path for script_element in script.all], output_file)
+        return
+
     clips = []
 
     cur_time = 0
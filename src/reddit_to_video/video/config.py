@@ -19,6 +19,11 @@ Example config file
             "max_length": 200,
             "min_length": 30,
             "background_footage": "backgrounds/footage.mp4",
+            "visuals": "card",
+            "card_template": {
+                "width": 1000,
+                "body_size": 34
+            },
             "tts": {
                 "engine": "google",
                 "accent": "Australia"
@@ -48,6 +53,7 @@ from json import load as json_load
 reddit_sorts = ["relevance", "hot", "top", "new", "comments"]
 reddit_time_filters = ["all", "year", "month", "week", "day", "hour"]
 video_types = ["comment", "video"]
+visual_types = ["screenshot", "card"]
 
 # from https://stackoverflow.com/questions/2352181/how-to-use-a-dot-to-access-members-of-dictionary
 
@@ -59,8 +65,15 @@ class dotdict(dict):
     __delattr__ = dict.__delitem__
 
 
-def validate_json_val(json, key, val_type, optional=False, in_list=None, check_file=False, check_dir=False):
-    """Validates a value in a json object, based on various flags"""
+def is_url(value: str) -> bool:
+    """Returns True if a value is a http or https url"""
+    return value.lower().startswith(("http://", "https://"))
+
+
+def validate_json_val(json, key, val_type, optional=False, in_list=None, check_file=False, check_dir=False,
+                      allow_url=False):
+    """Validates a value in a json object, based on various flags.
+    With allow_url, urls pass check_file since they are downloaded when used"""
     if key not in json and optional:
         return
     if key not in json:
@@ -73,6 +86,8 @@ def validate_json_val(json, key, val_type, optional=False, in_list=None, check_f
             raise TypeError(f"Config: Invalid value for {key} ({json[key]})")
 
     if check_file:
+        if allow_url and is_url(json[key]):
+            return
         if not is_file(json[key]):
             raise FileNotFoundError(f"Config: File {json[key]} does not exist")
 
@@ -132,7 +147,14 @@ class VideoConfig:
     def validate_comment_settings(self):
         """Validates config settings for comment videos"""
         validate_json_val(self._settings, "background_footage",
-                          str, check_file=True)
+                          str, check_file=True, allow_url=True)
+        validate_json_val(self._settings, "visuals", str,
+                          optional=True, in_list=visual_types)
+        validate_json_val(self._settings, "card_template",
+                          dict, optional=True)
+
+        if "visuals" not in self._settings:
+            self.settings.visuals = "screenshot"
 
         self.validate_tts()
         self.tts = dotdict(self._settings["tts"])
@@ -140,10 +162,13 @@ class VideoConfig:
     def validate_video_settings(self):
         """Validates config settings for video videos"""
         validate_json_val(self._settings, "end_card_footage",
-                          str, optional=True, check_file=True)
+                          str, optional=True, check_file=True, allow_url=True)
         validate_json_val(self._settings, "video_break_footage", str,
-                          optional=True, check_file=True)
+                          optional=True, check_file=True, allow_url=True)
         validate_json_val(self._settings, "max_video_length", int)
+        validate_json_val(self._settings, "max_video_size_mb",
+                          (int, float), optional=True)
+        validate_json_val(self._settings, "ingest", bool, optional=True)
         validate_json_val(self._settings, "noramlise_audio",
                           float, optional=True)
 
@@ -0,0 +1,156 @@
+"""Synthesizes Coqui TTS on a pool of worker processes
+
+Coqui inference on the CPU only uses part of the machine from one process, and loading a
+model is slow. Each worker process loads the model once when it starts and keeps it, with
+torch pinned to a few threads so the workers don't fight over cores. Comments are split into
+sentences, the sentences of a batch are balanced across the workers by length, and each
+comment's sentences are stitched back together in order.
+
+Classes:
+    CoquiWorkerPool: Synthesizes batches of text on worker processes that each hold the model
+
+Functions:
+    balance_sentences(sentences: list[tuple], workers: int) -> list[list[tuple]]:
+        Splits (id, sentence) pairs between workers so each has about the same amount of text
+
+Example:
+    >>> from reddit_to_video.video.coqui_pool import CoquiWorkerPool
+    >>> with CoquiWorkerPool("tts_models/en/ljspeech/vits", workers=4) as pool:
+    ...     pool.synthesize([("First comment. It has two sentences.", "output/0.wav")])
+    [None]
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+
+from reddit_to_video.utility import DEFAULT_SENTENCE_GAP, join_samples, split_tts_sentences
+
+# most worker processes started by default, each holds a copy of the model in memory
+DEFAULT_COQUI_WORKERS = 4
+
+# the model loaded by a worker process, set by init_coqui_worker
+worker_tts = None
+
+
+def init_coqui_worker(model: str, threads: int) -> None:
+    """Loads the model in a worker process and pins torch's thread count"""
+    global worker_tts
+
+    import torch
+    from TTS.api import TTS as coqui
+
+    torch.set_num_threads(threads)
+
+    worker_tts = coqui(model, progress_bar=False)
+
+
+def synthesize_sentences(sentences: list[tuple], kwargs: dict) -> tuple[list, int]:
+    """Synthesizes (id, sentence) pairs with the worker's model.
+    Returns the (id, samples) of each sentence and the sample rate"""
+    import numpy
+
+    samples = [(sentence_id, numpy.asarray(worker_tts.tts(sentence, **kwargs), dtype=numpy.float32))
+               for sentence_id, sentence in sentences]
+
+    return samples, worker_tts.synthesizer.output_sample_rate
+
+
+def balance_sentences(sentences: list[tuple], workers: int) -> list[list[tuple]]:
+    """Splits (id, sentence) pairs between workers so each has about the same amount of text.
+    The longest sentences are placed first, each on the worker with the least text so far"""
+    shares = [[] for _ in range(max(1, min(workers, len(sentences))))]
+    lengths = [0] * len(shares)
+
+    for sentence_id, sentence in sorted(sentences, key=lambda pair: len(pair[1]), reverse=True):
+        i = lengths.index(min(lengths))
+        shares[i].append((sentence_id, sentence))
+        lengths[i] += len(sentence)
+
+    return shares
+
+
+class CoquiWorkerPool:
+    """Synthesizes batches of text on worker processes that each hold the model"""
+
+    def __init__(self, model: str, workers: int = None, threads_per_worker: int = None,
+                 sentence_gap: float = DEFAULT_SENTENCE_GAP, **kwargs):
+        """Initialises the pool, the workers start and load the model on the first batch.
+        By default there is a worker per core up to DEFAULT_COQUI_WORKERS, and the cores
+        are shared between their torch threads. kwargs are passed to Coqui's tts()"""
+        cores = cpu_count() or 1
+
+        self.model = model
+        self.workers = workers or min(DEFAULT_COQUI_WORKERS, cores)
+        self.threads_per_worker = threads_per_worker or max(1, cores // self.workers)
+        self.sentence_gap = sentence_gap
+        self.kwargs = kwargs
+
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # torch doesn't survive being forked once it has started its threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_coqui_worker, initargs=(self.model, self.threads_per_worker))
+
+        return self._executor
+
+    def synthesize(self, items: list[tuple[str, str]]) -> list[Exception]:
+        """Synthesizes (text, filename) items, returning each item's error or None.
+        Every sentence of the batch is synthesized at once across the workers"""
+        import soundfile
+
+        item_sentences = [split_tts_sentences(text) for text, _ in items]
+        sentences = [((item, i), sentence) for item, sentences in enumerate(item_sentences)
+                     for i, sentence in enumerate(sentences)]
+
+        shares = balance_sentences(sentences, self.workers) if len(sentences) > 0 else []
+        futures = [self._get_executor().submit(synthesize_sentences, share, self.kwargs)
+                   for share in shares]
+
+        samples = {}
+        sample_rate = None
+        share_errors = {}
+
+        for future, share in zip(futures, shares):
+            try:
+                share_samples, sample_rate = future.result()
+                samples.update(share_samples)
+            except Exception as e:
+                for (item, _), _ in share:
+                    share_errors[item] = e
+
+        errors = []
+
+        for item, (_, filename) in enumerate(items):
+            if item in share_errors:
+                errors.append(share_errors[item])
+                continue
+
+            if len(item_sentences[item]) == 0:
+                errors.append(ValueError("synthesize() there is no text to speak"))
+                continue
+
+            try:
+                soundfile.write(filename, join_samples(
+                    [samples[(item, i)] for i in range(len(item_sentences[item]))],
+                    sample_rate, self.sentence_gap), sample_rate)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+        return errors
+
+    def close(self) -> None:
+        """Stops the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,223 @@
+"""Transcodes downloaded clips to the output's profile once, in the background
+
+Clips come from many services in different resolutions, frame rates and codecs, so every
+render would decode, rescale and reframe each of them again. Ingesting a clip transcodes it
+once into a canonical profile (the output's resolution, fps, pixel format, codec and audio
+rate) and keeps the result in the media store, so later renders reuse it. Once every clip
+of a script is in the same profile they can be joined with a stream copy instead of being
+encoded again.
+
+Classes:
+    IngestProfile(dataclass): The resolution, frame rate and codecs clips are transcoded to
+    Ingestor: Ingests clips on background threads while other clips download
+
+Functions:
+    has_audio_stream(path: str) -> bool: Returns True if a media file has an audio stream
+    get_ingest_url(source: str, profile: IngestProfile) -> str:
+        Returns the media store url of a clip transcoded to a profile, keyed by the clip's
+        path, size and modification time
+    transcode_clip(source: str, output: str, profile: IngestProfile) -> str: Transcodes a clip to a profile
+    ingest_clip(source: str, profile: IngestProfile, store: MediaStore = None) -> str:
+        Returns the path of a clip transcoded to a profile, transcoding it if it isn't stored
+    concat_clips(paths: list[str], output: str) -> str: Joins clips of the same profile without re-encoding
+
+Example:
+    >>> from reddit_to_video.video.ingest import IngestProfile, Ingestor, concat_clips
+    >>> ingestor = Ingestor(IngestProfile(1920, 1080, fps=30))
+    >>> ingestor.submit("output/store/media/2f1d5e0c.mp4")
+    >>> paths = [ingestor.get("output/store/media/2f1d5e0c.mp4")]
+    >>> concat_clips(paths, "output/video.mp4")
+    'output/video.mp4'
+"""
+
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from hashlib import sha1
+from os import remove as remove_file
+from os import stat
+from os.path import abspath
+from os.path import isfile as is_file
+
+from reddit_to_video.scraping.download import get_part_path, finish_download
+from reddit_to_video.video.export_settings import ExportSettings, Compression
+
+DEFAULT_INGEST_WORKERS = 2
+
+audio_stream_pattern = re.compile(r"Stream #\d+:\d+.*: Audio:")
+
+
+@dataclass
+class IngestProfile:
+    """The resolution, frame rate and codecs clips are transcoded to"""
+    width: int
+    height: int
+    fps: int = 30
+    pixel_format: str = "yuv420p"
+    codec: str = "libx264"
+    bitrate: str = "5000k"
+    preset: str = Compression.SuperFast.value
+    audio_rate: int = 44100
+    audio_channels: int = 2
+
+    @classmethod
+    def from_export_settings(cls, width: int, height: int, export_settings: ExportSettings):
+        """Returns the profile of a video exported with export settings"""
+        return cls(width, height, fps=export_settings.fps, codec=export_settings.codec,
+                   bitrate=export_settings.bitrate, preset=export_settings.compression)
+
+    @property
+    def key(self) -> str:
+        """Returns a name for the profile, clips in different profiles have different keys"""
+        return (f"{self.width}x{self.height}-{self.fps}fps-{self.pixel_format}-{self.codec}"
+                f"-{self.bitrate}-{self.preset}-{self.audio_rate}hz-{self.audio_channels}ch")
+
+
+def get_ffmpeg() -> str:
+    """Returns the path of the ffmpeg binary moviepy uses"""
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    return get_ffmpeg_exe()
+
+
+def has_audio_stream(path: str) -> bool:
+    """Returns True if a media file has an audio stream"""
+    # ffmpeg exits with an error without an output, but still prints the streams
+    result = subprocess.run([get_ffmpeg(), "-hide_banner", "-i", path],
+                            capture_output=True, text=True, errors="ignore")
+
+    return audio_stream_pattern.search(result.stderr) is not None
+
+
+def get_transcode_args(source: str, output: str, profile: IngestProfile, has_audio: bool = True) -> list[str]:
+    """Returns the ffmpeg arguments that transcode a clip to a profile.
+    Clips are scaled to fit and padded, clips without audio get a silent track
+    so every ingested clip has the same streams"""
+    video_filter = (f"scale={profile.width}:{profile.height}:force_original_aspect_ratio=decrease,"
+                    f"pad={profile.width}:{profile.height}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+                    f"fps={profile.fps},format={profile.pixel_format}")
+
+    args = [get_ffmpeg(), "-y", "-loglevel", "error", "-i", source]
+
+    if has_audio:
+        args += ["-map", "0:v:0", "-map", "0:a:0"]
+    else:
+        args += ["-f", "lavfi", "-i",
+                 f"anullsrc=channel_layout=stereo:sample_rate={profile.audio_rate}",
+                 "-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+
+    args += ["-vf", video_filter, "-c:v", profile.codec, "-preset", profile.preset]
+
+    if profile.bitrate is not None:
+        args += ["-b:v", profile.bitrate]
+
+    args += ["-c:a", "aac", "-ar", str(profile.audio_rate), "-ac", str(profile.audio_channels),
+             "-movflags", "+faststart", "-f", "mp4", output]
+
+    return args
+
+
+def transcode_clip(source: str, output: str, profile: IngestProfile) -> str:
+    """Transcodes a clip to a profile. The output only appears once it is complete"""
+    if not is_file(source):
+        raise FileNotFoundError(f"transcode_clip() {source} is not a file")
+
+    part_path = get_part_path(output)
+
+    try:
+        subprocess.run(get_transcode_args(source, part_path, profile, has_audio_stream(source)),
+                       check=True, capture_output=True)
+    except Exception:
+        if is_file(part_path):
+            remove_file(part_path)
+        raise
+
+    return finish_download(part_path, output)
+
+
+def get_source_fingerprint(source: str) -> str:
+    """Returns a hash of a clip's absolute path, size and modification time.
+    Clips with the same name in other folders differ, as does a clip changed in place"""
+    source_stat = stat(source)
+    fingerprint = f"{abspath(source)}:{source_stat.st_size}:{source_stat.st_mtime_ns}"
+
+    return sha1(fingerprint.encode("utf-8")).hexdigest()
+
+
+def get_ingest_url(source: str, profile: IngestProfile) -> str:
+    """Returns the media store url of a clip transcoded to a profile.
+    Store files are named by their url's key, so the same clip always has the same url"""
+    return f"ingest://{get_source_fingerprint(source)}/{profile.key}"
+
+
+def ingest_clip(source: str, profile: IngestProfile, store=None) -> str:
+    """Returns the path of a clip transcoded to a profile, transcoding it if it isn't stored"""
+    if store is None:
+        from reddit_to_video.store import get_media_store
+
+        store = get_media_store()
+
+    return store.fetch(get_ingest_url(source, profile),
+                       lambda path: transcode_clip(source, path, profile))
+
+
+def concat_clips(paths: list[str], output: str) -> str:
+    """Joins clips of the same profile into one file without re-encoding them"""
+    list_path = f"{output}.txt"
+
+    with open(list_path, "w", encoding="utf-8") as file:
+        for path in paths:
+            # the concat demuxer's quoting, ' is closed, escaped and reopened
+            escaped = path.replace("\\", "/").replace("'", "'\\''")
+            file.write(f"file '{escaped}'\n")
+
+    try:
+        subprocess.run([get_ffmpeg(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", list_path, "-c", "copy", "-movflags", "+faststart", output],
+                       check=True, capture_output=True)
+    finally:
+        remove_file(list_path)
+
+    return output
+
+
+class Ingestor:
+    """Ingests clips on background threads while other clips download.
+    ffmpeg does the work in its own process, so threads are enough"""
+
+    def __init__(self, profile: IngestProfile, max_workers: int = DEFAULT_INGEST_WORKERS, store=None):
+        """Initialises the ingestor. Clips are stored in the shared media store by default"""
+        self.profile = profile
+        self.store = store
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingest")
+        self._futures = {}
+
+    def submit(self, source: str) -> None:
+        """Starts ingesting a clip, clips that were already submitted are ignored"""
+        if source not in self._futures:
+            self._futures[source] = self._executor.submit(
+                ingest_clip, source, self.profile, self.store)
+
+    def get(self, source: str) -> str:
+        """Returns the path of an ingested clip, waiting for it to finish.
+        Returns None if the clip couldn't be ingested"""
+        self.submit(source)
+
+        try:
+            return self._futures[source].result()
+        except Exception as e:
+            print(f"Failed to ingest {source} ({e})")
+            return None
+
+    def close(self) -> None:
+        """Waits for the submitted clips and stops the threads"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
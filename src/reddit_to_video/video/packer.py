@@ -0,0 +1,95 @@
+"""Module for packing clips into a script while they download
+
+A video script only has room for max_length seconds of clips, so downloading every post in
+a listing wastes most of the downloads. The packer keeps track of the duration committed to
+the script and the duration still downloading, so downloads can stop being started once the
+script can be filled (with some headroom for downloads that fail), and downloads that can't
+fit in the space left can be cancelled.
+
+Classes:
+    ScriptPacker: Packs clips into the space left in a script as they finish downloading
+
+Example:
+    >>> from reddit_to_video.video.packer import ScriptPacker
+    >>> packer = ScriptPacker(max_length=600, reserved=10)
+    >>> packer.wants_more([30, None])
+    True
+    >>> packer.add(0, script_element)
+    True
+    >>> packer.remaining
+    562.0
+"""
+
+# extra duration downloaded past what fills the script, as a fraction of the space left
+DEFAULT_HEADROOM = 0.25
+# the space left in a script that is too small for any clip
+MIN_CLIP_LENGTH = 2
+
+
+class ScriptPacker:
+    """Packs clips into the space left in a script as they finish downloading"""
+
+    def __init__(self, max_length: float, reserved: float = 0, clip_overhead: float = 0,
+                 default_estimate: float = 30, headroom: float = DEFAULT_HEADROOM):
+        """Initialises a ScriptPacker. reserved is the duration kept for footer elements
+        like the end card, clip_overhead is added to every clip (eg. a video break) and
+        default_estimate is used for clips of unknown duration until some have finished"""
+        self.available = max_length - reserved
+        self.clip_overhead = clip_overhead
+        self.default_estimate = default_estimate
+        self.headroom = headroom
+
+        self.committed = 0
+        self.durations = []
+        self.packed = []
+
+    @property
+    def remaining(self) -> float:
+        """Returns the duration left in the script"""
+        return self.available - self.committed
+
+    @property
+    def full(self) -> bool:
+        """Returns True if no clip can fit in the space left"""
+        return self.remaining < self.clip_overhead + MIN_CLIP_LENGTH
+
+    @property
+    def elements(self) -> list:
+        """Returns the packed script elements in rank order"""
+        return [element for _, element in sorted(self.packed, key=lambda packed: packed[0])]
+
+    def estimate(self, duration: float = None) -> float:
+        """Returns the duration a clip is expected to take up in the script.
+        Clips of unknown duration are expected to be as long as the average finished clip"""
+        if duration is None:
+            duration = (sum(self.durations) / len(self.durations)
+                        if len(self.durations) > 0 else self.default_estimate)
+
+        return duration + self.clip_overhead
+
+    def fits(self, duration: float) -> bool:
+        """Returns True if a clip of the duration fits in the space left"""
+        return duration + self.clip_overhead <= self.remaining
+
+    def wants_more(self, in_flight: list) -> bool:
+        """Returns True if more clips should be downloaded, given the known durations
+        (or None) of the clips downloading"""
+        if self.full:
+            return False
+
+        in_flight_duration = sum(self.estimate(duration) for duration in in_flight)
+
+        return in_flight_duration < self.remaining * (1 + self.headroom)
+
+    def add(self, rank: int, element) -> bool:
+        """Packs a finished clip's script element into the script if it fits,
+        returning True if it was packed"""
+        self.durations.append(element.duration)
+
+        if not self.fits(element.duration):
+            return False
+
+        self.packed.append((rank, element))
+        self.committed += element.duration + self.clip_overhead
+
+        return True
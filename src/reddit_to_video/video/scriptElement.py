@@ -14,12 +14,13 @@ from reddit_to_video.utility import get_video_duration, get_audio_duration
 class ScriptElement:
     """Represents a single element in a VideoScript"""
 
-    def __init__(self, text, visual_path, audio_path, id_=-1):
-        """Initialises a ScriptElement object"""
+    def __init__(self, text, visual_path, audio_path, id_=-1, audio=None):
+        """Initialises a ScriptElement object.
+        audio is an optional (samples, sample_rate) pair used instead of reading audio_path"""
         if not is_file(visual_path):
             raise Exception(
                 f"ScriptElement() visual_path {visual_path} is not a file")
-        if audio_path is not None and audio_path != "":
+        if audio is None and audio_path is not None and audio_path != "":
             if not is_file(audio_path):
                 raise Exception(
                     f"ScriptElement() audio_path {audio_path} is not a file")
@@ -28,6 +29,7 @@ class ScriptElement:
         self.text = text
         self.visual_path = visual_path
         self.audio_path = audio_path
+        self.audio = audio
 
         self.duration = self.calculate_duration()
 
@@ -46,6 +48,10 @@ class ScriptElement:
     @property
     def audio_duration(self):
         """Returns the duration of the audio in seconds, or the visual duration if not a video"""
+        if self.audio is not None:
+            samples, sample_rate = self.audio
+            return len(samples) / sample_rate
+
         if self.audio_path is None or self.audio_path == "":
             if self.is_video:
                 return self.visual_duration
@@ -1,6 +1,29 @@
 """Text to speech module for reddit_to_video
 
+Synthesized audio is cached by a hash of its normalised text and the engine's settings
+(engine, model or voice, accent, rate and any extra kwargs), so the same text read by the
+same voice is only synthesized once across posts, runs and configs, and changing the voice
+never reuses the old voice's audio. Every save_audio call checks the cache first.
+
+save_audio_batch synthesizes many texts at once and returns each one's path and duration.
+Each engine runs a batch its own way: google sends every request (including the pieces gTTS
+splits long text into) at once on a thread pool with a rate cap, the system engine splits
+the batch between pyttsx3 processes, and coqui splits the batch into sentences synthesized
+on worker processes that each keep the model loaded (see coqui_pool).
+
+Text with several sentences is synthesized a sentence at a time. Each sentence is cached on
+its own, so editing or retrying one sentence of a comment only synthesizes that sentence
+again, and the sentences are joined sample for sample with a configurable gap between them.
+
+Engines that make raw samples (coqui and the system engine) write wav, so their audio can be
+read back as samples (get_audio) and is only lossily encoded once, when the video is written.
+Google sends mp3: its sentences are cached as they came and joined into wav, and mp3 output
+is always synthesized whole, so google's audio is never encoded a second time either.
+
 Classes:
+    TTSCache: Stores synthesized audio by a hash of its text and engine settings
+    TTSResult(dataclass): The audio saved for an item of a batch, with its duration
+    RateLimiter: Spaces out calls across threads
     ttsEngine: Base class for TTS engines
     coquiTTS: Coqui TTS engine
     googleTTS: Google TTS engine
@@ -9,14 +32,53 @@ Classes:
 
 Functions:
     get_tts_engine: Get a TTS engine
+    get_loaded_tts_engine: Get a TTS engine, reusing one already loaded with the same settings
+    configure_tts_cache: Sets where the shared TTS cache is and its disk budget
+    get_tts_cache: Gets the shared TTS cache, creating it on first use
+    join_audio_files: Joins audio files in order with silence between them
+    write_mp3_audio: Writes mp3 audio to a file, decoding it if the file isn't an mp3
+    split_google_chunks: Splits text into the pieces gTTS requests, like gTTS does
+    get_speaker_hash: Gets the sha256 of a speaker file, hashing it again only once it changes
 
 """
 
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from enum import Enum
-import gtts
-import pyttsx3
-
-from reddit_to_video.utility import remove_links_from_text, remove_non_words
+from functools import lru_cache
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, loads
+from os import cpu_count
+from os import stat
+from os import listdir as list_dir
+from os import makedirs as make_dir
+from os import remove as remove_file
+from os import replace as replace_file
+from os.path import abspath
+from os.path import basename
+from os.path import getsize as get_size
+from os.path import isdir as is_dir
+from os.path import isfile as is_file
+from os.path import join as path_join
+from os.path import splitext as split_ext
+from shutil import copyfile as copy_file
+from threading import Lock
+from uuid import uuid4
+
+from reddit_to_video.utility import remove_links_from_text, remove_non_words, get_audio_info, read_audio
+from reddit_to_video.utility import DEFAULT_SENTENCE_GAP, join_samples, split_tts_sentences
+
+DEFAULT_TTS_CACHE_PATH = "output/cache/tts/"
+# the most characters gTTS sends in one request
+GOOGLE_TTS_MAX_CHARS = 100
+# requests sent to google translate at once, and the most sent a second
+DEFAULT_GOOGLE_WORKERS = 8
+DEFAULT_GOOGLE_RATE = 10
+# pyttsx3 processes speaking at once
+DEFAULT_SYSTEM_PROCESSES = 4
 
 
 class TTSAccents(Enum):
@@ -41,12 +103,573 @@ class TTSAccents(Enum):
         return cls.__members__.keys()
 
 
+def normalise_tts_text(text: str) -> str:
+    """Normalises text so copies that only differ in unicode form or whitespace share a key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def split_google_chunks(text: str, max_chars: int = GOOGLE_TTS_MAX_CHARS) -> list[str]:
+    """Splits text into the pieces gTTS requests, each of up to max_chars characters.
+    Uses gTTS's default pre processors and tokenizer cases from the public gtts.tokenizer"""
+    from gtts.tokenizer import Tokenizer, pre_processors, tokenizer_cases
+    from gtts.tokenizer.symbols import ALL_PUNC
+
+    text = text.strip()
+
+    for pre_processor in [pre_processors.tone_marks, pre_processors.end_of_line,
+                          pre_processors.abbreviations, pre_processors.word_sub]:
+        text = pre_processor(text)
+
+    tokens = [text]
+
+    if len(text) > max_chars:
+        tokens = Tokenizer([tokenizer_cases.tone_marks, tokenizer_cases.period_comma,
+                            tokenizer_cases.colon, tokenizer_cases.other_punctuation]).run(text)
+
+    chunks = []
+
+    for token in tokens:
+        token = token.strip()
+
+        # pieces that are only punctuation have nothing to say
+        if token.strip(ALL_PUNC + " \t\n") == "":
+            continue
+
+        # pieces still too long are split at their last space before max_chars
+        while len(token) > max_chars:
+            split = token.rfind(" ", 0, max_chars)
+
+            if split <= 0:
+                split = max_chars
+
+            chunks.append(token[:split])
+            token = token[split:].lstrip()
+
+        if token != "":
+            chunks.append(token)
+
+    return chunks
+
+
+def write_mp3_audio(audio: bytes, filename: str) -> None:
+    """Writes mp3 audio to a file, decoding it first if the file isn't an mp3"""
+    if split_ext(filename)[1].lower() == ".mp3":
+        with open(filename, "wb") as file:
+            file.write(audio)
+        return
+
+    import soundfile
+
+    samples, sample_rate = soundfile.read(BytesIO(audio), dtype="float32")
+    soundfile.write(filename, samples, sample_rate)
+
+
+def join_audio_files(paths: list[str], output: str, gap: float = DEFAULT_SENTENCE_GAP) -> float:
+    """Joins audio files in order with gap seconds of silence between them, sample for
+    sample so nothing is lost or shifted at the joins. Returns the duration of the output"""
+    import soundfile
+
+    samples = []
+    sample_rate = None
+
+    for path in paths:
+        data, rate = soundfile.read(path, dtype="float32")
+
+        if sample_rate is not None and rate != sample_rate:
+            raise ValueError(
+                f"join_audio_files() {path} is {rate}hz, the other audio is {sample_rate}hz")
+
+        samples.append(data)
+        sample_rate = rate
+
+    joined = join_samples(samples, sample_rate, gap)
+    soundfile.write(output, joined, sample_rate)
+
+    return len(joined) / sample_rate
+
+
+@lru_cache(maxsize=32)
+def get_versioned_file_hash(path: str, size: int, modified_ns: int) -> str:
+    """Returns the sha256 of a file, memoised on its path, size and modification time"""
+    from reddit_to_video.store import get_file_hash
+
+    return get_file_hash(path)
+
+
+def get_speaker_hash(path: str) -> str:
+    """Returns the sha256 of a speaker file's contents, only reading it again once its
+    size or modification time changes. Returns None if there is no file"""
+    if not is_file(path):
+        return None
+
+    file_stat = stat(path)
+
+    return get_versioned_file_hash(abspath(path), file_stat.st_size, file_stat.st_mtime_ns)
+
+
+def copy_file_atomic(source: str, destination: str) -> None:
+    """Copies a file so the destination only appears once it is complete"""
+    temp_path = f"{destination}.{uuid4().hex}.tmp"
+
+    try:
+        copy_file(source, temp_path)
+        replace_file(temp_path, destination)
+    finally:
+        if is_file(temp_path):
+            remove_file(temp_path)
+
+
+class TTSCache:
+    """Stores synthesized audio by a hash of its text and engine settings.
+    Each entry has a json sidecar with its duration, sample rate, size and when it was
+    last used. When the cache is over its budget the least recently used entries that
+    weren't used in this run are evicted"""
+
+    def __init__(self, cache_dir: str = DEFAULT_TTS_CACHE_PATH, budget_mb: float = None):
+        """Initialises the cache. Entries are evicted when the cache is bigger than
+        budget_mb megabytes, None or 0 means the cache is never evicted"""
+        self.cache_dir = cache_dir
+        self.budget_mb = budget_mb
+
+        self._lock = Lock()
+        # keys used in this run, their files may still be needed
+        self._session_keys = set()
+
+    @staticmethod
+    def get_key(text: str, settings: dict, extension: str = ".mp3") -> str:
+        """Returns the key of some text synthesized with an engine's settings"""
+        key_json = dumps({"text": normalise_tts_text(text), "settings": settings,
+                          "extension": extension}, sort_keys=True, default=str)
+
+        return sha256(key_json.encode("utf-8")).hexdigest()
+
+    def _get_sidecar_path(self, key: str) -> str:
+        return path_join(self.cache_dir, f"{key}.json")
+
+    def get_path(self, key: str, extension: str = ".mp3") -> str:
+        """Returns where a key's audio is stored, whether or not it exists"""
+        return path_join(self.cache_dir, key + extension)
+
+    def get_entry(self, key: str) -> dict:
+        """Returns the sidecar of a key, or None if it isn't cached"""
+        try:
+            with open(self._get_sidecar_path(key), "r", encoding="utf-8") as file:
+                return loads(file.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, entry: dict) -> None:
+        """Writes a sidecar atomically so readers never see half an entry"""
+        path = self._get_sidecar_path(entry["key"])
+        temp_path = f"{path}.{uuid4().hex}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(dumps(entry))
+
+        replace_file(temp_path, path)
+
+    def get(self, key: str) -> str:
+        """Returns the path of a key's audio, or None if it isn't cached"""
+        entry = self.get_entry(key)
+
+        if entry is None:
+            return None
+
+        path = path_join(self.cache_dir, entry["file"])
+
+        if not is_file(path):
+            return None
+
+        entry["last_used"] = time.time()
+        self._write_entry(entry)
+        self._session_keys.add(key)
+
+        return path
+
+    def put(self, key: str, source: str) -> str:
+        """Moves synthesized audio into the cache, returning its cached path"""
+        make_dir(self.cache_dir, exist_ok=True)
+
+        path = self.get_path(key, split_ext(source)[1])
+
+        if source != path:
+            replace_file(source, path)
+
+        try:
+            duration, sample_rate = get_audio_info(path)
+        except Exception:
+            # the audio is still usable, its info is found when it's needed
+            duration, sample_rate = None, None
+
+        now = time.time()
+
+        self._write_entry({
+            "key": key,
+            "file": basename(path),
+            "size": get_size(path),
+            "duration": duration,
+            "sample_rate": sample_rate,
+            "created": now,
+            "last_used": now
+        })
+
+        self._session_keys.add(key)
+        self.evict()
+
+        return path
+
+    def get_duration(self, key: str) -> float:
+        """Returns the duration of a key's audio, reading it from the audio if the
+        sidecar doesn't know it. Returns None if it can't be found"""
+        entry = self.get_entry(key)
+
+        if entry is None:
+            return None
+
+        if entry.get("duration") is None:
+            try:
+                entry["duration"], entry["sample_rate"] = get_audio_info(
+                    path_join(self.cache_dir, entry["file"]))
+            except Exception:
+                return None
+
+            self._write_entry(entry)
+
+        return entry["duration"]
+
+    def entries(self) -> list[dict]:
+        """Returns the sidecar of every cached entry"""
+        if not is_dir(self.cache_dir):
+            return []
+
+        entries = []
+
+        for file_ in list_dir(self.cache_dir):
+            if file_.endswith(".json"):
+                entry = self.get_entry(file_[:-len(".json")])
+
+                if entry is not None:
+                    entries.append(entry)
+
+        return entries
+
+    def get_size(self) -> int:
+        """Returns the size of the cached audio in bytes"""
+        return sum(entry["size"] for entry in self.entries())
+
+    def evict(self, budget_mb: float = None) -> list[str]:
+        """Removes the least recently used audio until the cache fits in the budget.
+        Returns the keys of the removed entries"""
+        if budget_mb is None:
+            budget_mb = self.budget_mb
+
+        if not budget_mb:
+            return []
+
+        with self._lock:
+            entries = self.entries()
+            size = sum(entry["size"] for entry in entries)
+            removed = []
+
+            for entry in sorted(entries, key=lambda entry: entry["last_used"]):
+                if size <= budget_mb * 1024 * 1024:
+                    break
+
+                if entry["key"] in self._session_keys:
+                    continue
+
+                for path in [path_join(self.cache_dir, entry["file"]), self._get_sidecar_path(entry["key"])]:
+                    try:
+                        remove_file(path)
+                    except OSError:
+                        # removed by another process
+                        pass
+
+                size -= entry["size"]
+                removed.append(entry["key"])
+
+            return removed
+
+    def clear(self) -> None:
+        """Removes every cached entry"""
+        if is_dir(self.cache_dir):
+            for file_ in list_dir(self.cache_dir):
+                remove_file(path_join(self.cache_dir, file_))
+
+        self._session_keys.clear()
+
+
+tts_cache_settings = {"cache_dir": DEFAULT_TTS_CACHE_PATH, "budget_mb": None}
+shared_tts_cache = None
+tts_cache_lock = Lock()
+
+
+def configure_tts_cache(cache_dir: str = None, budget_mb: float = None) -> None:
+    """Sets where the shared TTS cache is and its disk budget, call before it is used"""
+    global shared_tts_cache
+
+    if cache_dir is not None:
+        tts_cache_settings["cache_dir"] = cache_dir
+    if budget_mb is not None:
+        tts_cache_settings["budget_mb"] = budget_mb
+
+    shared_tts_cache = None
+
+
+def get_tts_cache() -> TTSCache:
+    """Gets the shared TTS cache, creating it on first use"""
+    global shared_tts_cache
+
+    with tts_cache_lock:
+        if shared_tts_cache is None:
+            shared_tts_cache = TTSCache(**tts_cache_settings)
+
+        return shared_tts_cache
+
+
+@dataclass
+class TTSResult:
+    """The audio saved for a batch item, error is set if it couldn't be synthesized"""
+    path: str
+    duration: float = None
+    error: Exception = None
+
+
+class RateLimiter:
+    """Spaces out calls so no more than rate happen a second, across threads"""
+
+    def __init__(self, rate: float = None):
+        """Initialises the limiter, None or 0 doesn't limit calls"""
+        self.rate = rate
+
+        self._lock = Lock()
+        self._next_time = 0
+
+    def wait(self) -> None:
+        """Waits until the next call is allowed"""
+        if not self.rate:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + 1 / self.rate
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
 class TTSEngine:
     """Base class for TTS engines"""
 
+    # how many save_audio calls can run at once on separate threads
+    max_workers = 1
+    # the format the engine writes, engines that make raw samples write wav so the audio
+    # is only lossily encoded once, when the video is written
+    output_extension = ".mp3"
+    # whether text is synthesized a sentence at a time, and the seconds between sentences
+    chunk_sentences = True
+    sentence_gap = DEFAULT_SENTENCE_GAP
+    # the format sentences are cached in before they are joined, None is the output's format.
+    # Engines that receive encoded audio keep each sentence as it came
+    chunk_extension = None
+    # whether the engine itself reads text a sentence at a time with sentence_gap between
+    # them, so the gap changes its audio even when chunk_sentences isn't set
+    joins_sentences = False
+
+    @property
+    def cache_settings(self) -> dict:
+        """Get the settings that change how the engine sounds, used to key cached audio"""
+        return {"engine": repr(self)}
+
+    def get_cache_key(self, text: str, extension: str = None) -> str:
+        """Get the TTS cache key of some text read by this engine"""
+        extension = extension or self.output_extension
+        settings = self.cache_settings
+
+        if self.chunk_sentences or self.joins_sentences:
+            # the gap is part of the joined audio, but not of each sentence's
+            settings = dict(settings, sentence_gap=self.sentence_gap)
+
+        return TTSCache.get_key(text, settings, extension)
+
+    def get_chunk_key(self, sentence: str, extension: str = None) -> str:
+        """Get the TTS cache key of one sentence of a text read by this engine"""
+        return TTSCache.get_key(sentence, self.cache_settings, extension or self.output_extension)
+
+    def get_audio_path(self, text: str, extension: str = None) -> str:
+        """Get where the audio of some text read by this engine is cached, whether or not
+        it has been synthesized yet. Saving audio to this path stores it in the cache.
+        The extension defaults to the format the engine writes"""
+        extension = extension or self.output_extension
+        cache = get_tts_cache()
+        key = self.get_cache_key(text, extension)
+
+        return cache.get(key) or cache.get_path(key, extension)
+
+    def get_audio(self, text: str) -> tuple:
+        """Get the samples and sample rate of some text read by this engine, synthesizing
+        it if it isn't cached"""
+        path = self.get_audio_path(text)
+
+        if not is_file(path):
+            self.save_audio(text, path)
+
+        return read_audio(path)
+
     def save_audio(self, text: str, filename: str) -> None:
-        """Save the audio to a file"""
-        raise NotImplementedError("save_audio() is not implemented")
+        """Save the audio to a file, reusing cached audio of the same text and settings"""
+        result = self.save_audio_batch([(text, filename)])[0]
+
+        if result.error is not None:
+            raise result.error
+
+    def save_audio_batch(self, items: list[tuple[str, str]]) -> list[TTSResult]:
+        """Save the audio of (text, filename) items, reusing cached audio of the same text
+        and settings. The engine synthesizes the missing audio concurrently, so a batch takes
+        about as long as its slowest item. Returns a TTSResult per item, in order.
+        When chunk_sentences is set, items with several sentences are synthesized and cached
+        a sentence at a time, then joined with sentence_gap seconds between sentences.
+        mp3 items are always synthesized whole, joining them would encode them twice"""
+        cache = get_tts_cache()
+        results = [None] * len(items)
+        # items with the same text are only synthesized once
+        misses = {}
+
+        for i, (text, filename) in enumerate(items):
+            extension = split_ext(filename)[1]
+            key = self.get_cache_key(text, extension)
+            cached_path = cache.get(key)
+
+            if cached_path is not None:
+                if cached_path != filename:
+                    copy_file_atomic(cached_path, filename)
+                results[i] = TTSResult(filename, cache.get_duration(key))
+            elif key in misses:
+                misses[key][2].append((i, filename))
+            else:
+                chunk = self.chunk_sentences and extension.lower() != ".mp3"
+                sentences = split_tts_sentences(text) if chunk else []
+                misses[key] = (text, self._get_temp_path(key, extension), [(i, filename)],
+                               sentences if len(sentences) > 1 else None)
+
+        if len(misses) == 0:
+            return results
+
+        make_dir(cache.cache_dir, exist_ok=True)
+
+        whole = {key: miss for key, miss in misses.items() if miss[3] is None}
+        chunked = {key: miss for key, miss in misses.items() if miss[3] is not None}
+
+        # sentences already cached, eg. the rest of an edited comment, aren't synthesized again
+        chunks = {}
+
+        for _, temp_path, _, sentences in chunked.values():
+            extension = self.chunk_extension or split_ext(temp_path)[1]
+
+            for sentence in sentences:
+                chunk_key = self.get_chunk_key(sentence, extension)
+
+                if chunk_key not in chunks and cache.get(chunk_key) is None:
+                    chunks[chunk_key] = (sentence, self._get_temp_path(chunk_key, extension))
+
+        errors = self._save_audio_batch([(text, temp_path) for text, temp_path, _, _ in whole.values()] +
+                                        [(sentence, temp_path) for sentence, temp_path in chunks.values()])
+
+        chunk_errors = {}
+
+        for (chunk_key, (_, temp_path)), error in zip(chunks.items(), errors[len(whole):]):
+            error = self._check_audio(temp_path, error)
+
+            if error is None:
+                try:
+                    cache.put(chunk_key, temp_path)
+                except Exception as e:
+                    error = e
+
+            if error is not None:
+                if is_file(temp_path):
+                    remove_file(temp_path)
+                chunk_errors[chunk_key] = error
+
+        for (key, (_, temp_path, targets, _)), error in zip(whole.items(), errors):
+            self._finish_audio(key, temp_path, targets, self._check_audio(temp_path, error), results)
+
+        for key, (_, temp_path, targets, sentences) in chunked.items():
+            extension = self.chunk_extension or split_ext(temp_path)[1]
+            chunk_keys = [self.get_chunk_key(sentence, extension) for sentence in sentences]
+            error = next((chunk_errors[chunk_key] for chunk_key in chunk_keys if chunk_key in chunk_errors), None)
+
+            if error is None:
+                try:
+                    join_audio_files([cache.get(chunk_key) for chunk_key in chunk_keys],
+                                     temp_path, self.sentence_gap)
+                except Exception as e:
+                    error = e
+
+            self._finish_audio(key, temp_path, targets, error, results)
+
+        return results
+
+    def _get_temp_path(self, key: str, extension: str) -> str:
+        """Get a path for the engine to write a key's audio to, engines write their output
+        progressively so it is moved into place once finished"""
+        return path_join(get_tts_cache().cache_dir, f"{key}.{uuid4().hex}.tmp{extension}")
+
+    def _check_audio(self, temp_path: str, error: Exception) -> Exception:
+        """Get the error of synthesizing to a temp path, including writing nothing"""
+        if error is None and not is_file(temp_path):
+            return FileNotFoundError(f"save_audio_batch() {self} didn't write any audio")
+
+        return error
+
+    def _finish_audio(self, key: str, temp_path: str, targets: list, error: Exception,
+                      results: list) -> None:
+        """Store an item's synthesized audio and set the results of the (index, filename) targets"""
+        if error is None:
+            try:
+                self._store_audio(key, temp_path, [filename for _, filename in targets])
+            except Exception as e:
+                error = e
+
+        if error is not None:
+            if is_file(temp_path):
+                remove_file(temp_path)
+
+            for i, filename in targets:
+                results[i] = TTSResult(filename, error=error)
+            return
+
+        duration = get_tts_cache().get_duration(key)
+
+        for i, filename in targets:
+            results[i] = TTSResult(filename, duration)
+
+    def _save_audio(self, text: str, filename: str) -> None:
+        """Synthesize text to a file"""
+        raise NotImplementedError("_save_audio() is not implemented")
+
+    def _save_audio_batch(self, items: list[tuple[str, str]]) -> list[Exception]:
+        """Synthesize (text, filename) items, returning each item's error or None.
+        Engines override this to synthesize the items concurrently"""
+        errors = []
+
+        for text, filename in items:
+            try:
+                self._save_audio(text, filename)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+        return errors
+
+    def _store_audio(self, key: str, temp_path: str, filenames: list[str]) -> None:
+        """Store finished audio in the cache and copy it to where it was asked for"""
+        cached_path = get_tts_cache().put(key, temp_path)
+
+        for filename in filenames:
+            if cached_path != filename:
+                copy_file_atomic(cached_path, filename)
 
     def get_voices(self) -> list:
         """Get a list of voices"""
@@ -60,6 +683,9 @@ class TTSEngine:
         """Run the TTS engine"""
         raise NotImplementedError("run() is not implemented")
 
+    def close(self) -> None:
+        """Stop any workers the engine started"""
+
     @property
     def selected_engine(self) -> str:
         """Get the selected engine"""
@@ -69,13 +695,22 @@ class TTSEngine:
 class CoquiTTS(TTSEngine):
     """Coqui TTS engine"""
 
-    def __init__(self, model: str = "tts_models/multilingual/multi-dataset/your_tts", speaker_file: str = None, **kwargs):
-        """Coqui TTS engine"""
-        # importing this here because it takes a while to load
-        from TTS.api import TTS as coqui
+    output_extension = ".wav"
+    # the worker pool splits text into sentences and joins them with the gap
+    joins_sentences = True
+
+    def __init__(self, model: str = "tts_models/multilingual/multi-dataset/your_tts", speaker_file: str = None,
+                 workers: int = None, threads_per_worker: int = None, sentence_gap: float = DEFAULT_SENTENCE_GAP,
+                 chunk_sentences: bool = True, **kwargs):
+        """Coqui TTS engine. Batches are synthesized on workers worker processes that each
+        load the model once, with threads_per_worker torch threads each"""
+        from reddit_to_video.video.coqui_pool import CoquiWorkerPool
 
         self.model = model
-        self.tts = coqui(model, progress_bar=False)
+        self._tts = None
+
+        self.sentence_gap = sentence_gap
+        self.chunk_sentences = chunk_sentences
 
         self.speaker_file = speaker_file
 
@@ -87,11 +722,45 @@ class CoquiTTS(TTSEngine):
         if self.speaker_file is not None:
             self.kwargs['speaker_wav'] = self.speaker_file
 
-    def save_audio(self, text: str, filename: str) -> None:
-        """Save the audio to a file"""
+        self.pool = CoquiWorkerPool(model, workers=workers, threads_per_worker=threads_per_worker,
+                                    sentence_gap=sentence_gap, **self.kwargs)
+
+    @property
+    def tts(self):
+        """The model loaded in this process, only loaded when it is needed"""
+        if self._tts is None:
+            # importing this here because it takes a while to load
+            from TTS.api import TTS as coqui
+
+            self._tts = coqui(self.model, progress_bar=False)
+
+        return self._tts
+
+    @property
+    def cache_settings(self) -> dict:
+        """Get the settings that change how the engine sounds, used to key cached audio.
+        The speaker is keyed by its file's contents, so changing the file isn't missed"""
+        if self.speaker_file is None:
+            return {"engine": repr(self), "model": self.model, "kwargs": self.kwargs}
+
+        kwargs = {key: value for key, value in self.kwargs.items() if key != "speaker_wav"}
+
+        return {"engine": repr(self), "model": self.model, "kwargs": kwargs,
+                "speaker": get_speaker_hash(self.speaker_file)}
+
+    def _save_audio(self, text: str, filename: str) -> None:
+        """Synthesize text to a file"""
         text = remove_links_from_text(text)
         self.tts.tts_to_file(text, file_path=filename, **self.kwargs)
 
+    def _save_audio_batch(self, items: list[tuple[str, str]]) -> list[Exception]:
+        """Synthesize the sentences of every item at once across the worker processes"""
+        return self.pool.synthesize(items)
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self.pool.close()
+
     def get_voices(self) -> list:
         """Get a list of voices"""
         return self.tts.list_models()
@@ -103,35 +772,178 @@ class CoquiTTS(TTSEngine):
 class GoogleTTS(TTSEngine):
     """Google Translate TTS engine"""
 
-    def __init__(self, lang: str = 'en', accent: str = 'com.au'):
-        """Google Translate TTS engine"""
+    # requests are network bound, a few at once is fine for the API
+    max_workers = 4
+    # google sends mp3, each sentence is cached as it came
+    chunk_extension = ".mp3"
+
+    def __init__(self, lang: str = 'en', accent: str = 'com.au', request_workers: int = DEFAULT_GOOGLE_WORKERS,
+                 requests_per_second: float = DEFAULT_GOOGLE_RATE, sentence_gap: float = DEFAULT_SENTENCE_GAP,
+                 chunk_sentences: bool = True):
+        """Google Translate TTS engine. Batches send up to request_workers requests at
+        once, and no more than requests_per_second"""
         self.lang = lang
         self.accent = accent
 
-    def save_audio(self, text: str, filename: str) -> None:
-        """Save the audio to a file"""
+        self.sentence_gap = sentence_gap
+        self.chunk_sentences = chunk_sentences
+        # joined sentences are decoded into wav, so they aren't encoded to mp3 a second time
+        self.output_extension = ".wav" if chunk_sentences else ".mp3"
+
+        self.request_workers = request_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self._executor = None
+
+    @property
+    def cache_settings(self) -> dict:
+        """Get the settings that change how the engine sounds, used to key cached audio"""
+        return {"engine": repr(self), "lang": self.lang, "accent": self.accent}
+
+    def _save_audio(self, text: str, filename: str) -> None:
+        """Synthesize text to a file"""
         text = remove_links_from_text(text)
         text = remove_non_words(text)
         # print("Writing text" + text)
+        # importing this here so the config module can use the engine names
+        # without loading gtts
+        import gtts
+
         tts = gtts.gTTS(text, lang=self.lang, tld=self.accent)
-        tts.save(filename)
+        write_mp3_audio(b"".join(tts.stream()), filename)
+
+    def get_chunks(self, text: str) -> list[str]:
+        """Get the pieces gTTS splits text into, each is a request of up to 100 characters"""
+        text = remove_links_from_text(text)
+        text = remove_non_words(text)
+
+        return split_google_chunks(text)
+
+    def _request_chunk(self, chunk: str) -> bytes:
+        """Request the mp3 of one chunk"""
+        import gtts
+
+        self.rate_limiter.wait()
+
+        # the chunk was already pre processed when the text was split
+        return b"".join(gtts.gTTS(chunk, lang=self.lang, tld=self.accent, pre_processor_funcs=[]).stream())
+
+    def _save_audio_batch(self, items: list[tuple[str, str]]) -> list[Exception]:
+        """Request every chunk of every item at once on a thread pool, then join each
+        item's chunks in order. mp3 frames can be joined, it's what gTTS.save does"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.request_workers, thread_name_prefix="gtts")
+
+        chunk_futures = []
+
+        for text, _ in items:
+            try:
+                chunk_futures.append([self._executor.submit(self._request_chunk, chunk)
+                                      for chunk in self.get_chunks(text)])
+            except Exception as e:
+                chunk_futures.append(e)
+
+        errors = []
+
+        for (_, filename), futures in zip(items, chunk_futures):
+            if isinstance(futures, Exception):
+                errors.append(futures)
+                continue
+
+            try:
+                write_mp3_audio(b"".join(future.result() for future in futures), filename)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+
+        return errors
+
+    def close(self) -> None:
+        """Stop the request threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     def __repr__(self) -> str:
         return "googleTTS"
 
 
+def save_system_audio(rate: int, voice: str, items: list[tuple[str, str]]) -> None:
+    """Synthesizes (text, filename) items with pyttsx3, run in a worker process so
+    several system engines can speak at once"""
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', rate)
+
+    if voice is not None:
+        engine.setProperty('voice', voice)
+
+    for text, filename in items:
+        engine.save_to_file(remove_links_from_text(text), filename)
+
+    engine.runAndWait()
+
+
 class SystemTTS(TTSEngine):
     """System TTS engine"""
 
-    def __init__(self, rate: int = 150):
-        """System TTS engine"""
+    output_extension = ".wav"
+
+    def __init__(self, rate: int = 150, processes: int = None, sentence_gap: float = DEFAULT_SENTENCE_GAP,
+                 chunk_sentences: bool = True):
+        """System TTS engine. Batches are split between processes worker processes,
+        by default one per core up to DEFAULT_SYSTEM_PROCESSES"""
+        import pyttsx3
+
+        self.sentence_gap = sentence_gap
+        self.chunk_sentences = chunk_sentences
+
         self.engine = pyttsx3.init()
         self.engine.setProperty('rate', rate)
 
-    def save_audio(self, text: str, filename: str) -> None:
-        """Save the audio to a file"""
+        self.rate = rate
+        self.voice = None
+
+        self.processes = processes or min(DEFAULT_SYSTEM_PROCESSES, cpu_count() or 1)
+        self._executor = None
+
+    @property
+    def cache_settings(self) -> dict:
+        """Get the settings that change how the engine sounds, used to key cached audio"""
+        return {"engine": repr(self), "rate": self.rate, "voice": self.voice}
+
+    def _save_audio(self, text: str, filename: str) -> None:
+        """Synthesize text to a file"""
         text = remove_links_from_text(text)
         self.engine.save_to_file(text, filename)
+        self.engine.runAndWait()
+
+    def _save_audio_batch(self, items: list[tuple[str, str]]) -> list[Exception]:
+        """Split the items between the worker processes, each speaks its share in one run"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+
+        shares = [items[i::self.processes] for i in range(min(self.processes, len(items)))]
+        futures = [self._executor.submit(save_system_audio, self.rate, self.voice, share)
+                   for share in shares]
+
+        item_errors = {}
+
+        for share, future in zip(shares, futures):
+            error = future.exception()
+
+            for _, filename in share:
+                item_errors[filename] = error
+
+        # items without an error that weren't written are found by save_audio_batch
+        return [item_errors[filename] for _, filename in items]
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     def get_voices(self) -> list:
         """Get a list of voices"""
@@ -140,6 +952,7 @@ class SystemTTS(TTSEngine):
     def select_voice(self, voice_id: str) -> None:
         """Select a voice"""
         self.engine.setProperty('voice', voice_id)
+        self.voice = voice_id
 
     def run(self) -> None:
         """Run the TTS engine"""
@@ -166,3 +979,17 @@ def get_tts_engine(engine: str, **kwargs) -> TTSEngine:
         return CoquiTTS(**kwargs)
 
     raise ValueError("Unknown engine: " + engine)
+
+
+loaded_engines = {}
+
+
+def get_loaded_tts_engine(engine: str, **kwargs) -> TTSEngine:
+    """Get a TTS engine, reusing an engine already loaded with the same settings.
+    Loading models (especially Coqui) is slow so long running processes keep them warm"""
+    key = (engine, dumps(kwargs, sort_keys=True, default=str))
+
+    if key not in loaded_engines:
+        loaded_engines[key] = get_tts_engine(engine, **kwargs)
+
+    return loaded_engines[key]
@@ -0,0 +1,53 @@
+import pytest
+
+from reddit_to_video.video.config import VideoConfig
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true",
+                     help="run the wall clock benchmarks, they depend on the machine")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: wall clock timing checks, skipped unless --benchmark is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+
+    skip = pytest.mark.skip(reason="wall clock benchmark, run with --benchmark")
+
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def make_config():
+    """Returns a function that creates a minimal video config with a name"""
+    def make_config(name: str) -> VideoConfig:
+        return VideoConfig({
+            "name": name,
+            "description": "Test config",
+            "settings": {
+                "type": "video",
+                "subreddit": "youtubehaiku",
+                "sort": "top",
+                "time": "all",
+                "limit": 10,
+                "max_length": 60,
+                "min_length": 0,
+                "max_video_length": 30,
+                "export_settings": {
+                    "codec": "libx264",
+                    "bitrate": "5000k",
+                    "fps": 30,
+                    "threads": 4,
+                    "compression": "UltraFast"
+                }
+            }
+        })
+
+    return make_config
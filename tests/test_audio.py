@@ -0,0 +1,58 @@
+import numpy
+import pytest
+import soundfile
+
+from reddit_to_video.audio import resample_audio
+from reddit_to_video.utility import get_audio_duration, read_audio
+
+
+def write_wav(path, frames, sample_rate=22050, channels=1):
+    samples = numpy.linspace(-0.5, 0.5, frames * channels, dtype=numpy.float32).reshape(frames, channels)
+    soundfile.write(str(path), samples, sample_rate)
+    return samples
+
+
+def test_wav_duration_from_sample_count(tmp_path):
+    write_wav(tmp_path / "a.wav", 33075)
+
+    assert get_audio_duration(str(tmp_path / "a.wav")) == 1.5
+
+
+def test_get_audio_duration_rejects_other_formats(tmp_path):
+    (tmp_path / "a.ogg").write_bytes(b"x")
+
+    with pytest.raises(TypeError):
+        get_audio_duration(str(tmp_path / "a.ogg"))
+
+
+def test_read_audio_copies_mono_to_channels(tmp_path):
+    write_wav(tmp_path / "a.wav", 100)
+
+    samples, sample_rate = read_audio(str(tmp_path / "a.wav"), channels=2)
+
+    assert sample_rate == 22050
+    assert samples.shape == (100, 2)
+    assert samples.dtype == numpy.float32
+    assert (samples[:, 0] == samples[:, 1]).all()
+
+
+def test_resample_audio():
+    samples = numpy.stack([numpy.arange(100, dtype=numpy.float32)] * 2, axis=1)
+
+    resampled = resample_audio(samples, 22050, 44100)
+
+    assert resampled.shape == (200, 2)
+    # the duration is kept and the samples in between are interpolated
+    assert resampled[1, 0] == pytest.approx(0.5)
+    assert resample_audio(samples, 44100, 44100) is samples
+
+
+def test_script_element_duration_from_samples(tmp_path):
+    from reddit_to_video.video.scriptElement import ScriptElement
+
+    (tmp_path / "comment.png").write_bytes(b"x")
+
+    element = ScriptElement("text", str(tmp_path / "comment.png"), None,
+                            audio=(numpy.zeros((33075, 1), dtype=numpy.float32), 22050))
+
+    assert element.duration == 1.5
@@ -0,0 +1,56 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from reddit_to_video.batch import create_batch_jobs, load_batch_jobs, get_output_path
+from reddit_to_video.handlers.render import select_post
+from reddit_to_video.exceptions import ConfigKeyError
+
+
+posts = [
+    SimpleNamespace(id="a", score=10, num_comments=300),
+    SimpleNamespace(id="b", score=500, num_comments=20),
+    SimpleNamespace(id="c", score=40, num_comments=40),
+]
+
+
+@pytest.mark.parametrize("policy, post_id", [("first", "a"), ("top_score", "b"), ("most_comments", "a")])
+def test_select_post(policy, post_id):
+    assert select_post(posts, policy).id == post_id
+
+
+def test_create_batch_jobs_filters_names(make_config):
+    configs = [make_config("one"), make_config("two")]
+
+    jobs = create_batch_jobs(configs, ["two"], overwrite="skip")
+
+    assert [job.config.name for job in jobs] == ["two"]
+    assert jobs[0].overwrite == "skip"
+
+    with pytest.raises(ConfigKeyError):
+        create_batch_jobs(configs, ["three"])
+
+
+def test_load_batch_jobs_applies_defaults(tmp_path, make_config):
+    job_file = tmp_path / "jobs.json"
+    job_file.write_text(json.dumps({
+        "defaults": {"post_policy": "random", "overwrite": "skip"},
+        "jobs": [{"config": "one"}, {"config": "two", "overwrite": "overwrite"}]
+    }))
+
+    jobs = load_batch_jobs(str(job_file), [make_config("one"), make_config("two")])
+
+    assert [(job.post_policy, job.overwrite) for job in jobs] == [
+        ("random", "skip"), ("random", "overwrite")]
+
+
+def test_get_output_path_overwrite_policies(tmp_path):
+    template = str(tmp_path / "{config} {index}.mp4")
+    (tmp_path / "video 1.mp4").touch()
+
+    assert get_output_path(template, "video", 1, "overwrite") == str(
+        tmp_path / "video 1.mp4")
+    assert get_output_path(template, "video", 1, "skip") is None
+    assert get_output_path(template, "video", 1, "rename") == str(
+        tmp_path / "video 1 (1).mp4")
@@ -0,0 +1,103 @@
+from threading import Thread
+
+import pytest
+
+from reddit_to_video.scraping.browser import BrowserPool
+
+
+class FakeDriver:
+    created = 0
+
+    def __init__(self):
+        FakeDriver.created += 1
+        self.alive = True
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise ConnectionError("browser crashed")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_drivers_are_reused():
+    pool = BrowserPool("firefox", max_size=1, factory=FakeDriver)
+
+    with pool.session() as first:
+        pass
+    with pool.session() as second:
+        pass
+
+    assert first is second
+    assert pool.size == 1
+
+
+def test_drivers_are_recycled_after_max_uses():
+    pool = BrowserPool("firefox", max_size=1, max_uses=2, factory=FakeDriver)
+
+    drivers = []
+    for _ in range(3):
+        with pool.session() as driver:
+            drivers.append(driver)
+
+    assert drivers[0] is drivers[1]
+    assert drivers[0].quit_called
+    assert drivers[2] is not drivers[0]
+
+
+def test_pool_is_bounded():
+    pool = BrowserPool("chrome", max_size=1, factory=FakeDriver)
+    driver = pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+
+    waiter_driver = []
+    waiter = Thread(target=lambda: waiter_driver.append(pool.acquire(timeout=5)))
+    waiter.start()
+    pool.release(driver)
+    waiter.join()
+
+    assert waiter_driver == [driver]
+    assert pool.size == 1
+
+
+def test_crashed_drivers_are_replaced():
+    pool = BrowserPool("chrome", max_size=1, factory=FakeDriver)
+
+    with pool.session() as driver:
+        driver.alive = False
+
+    with pool.session() as replacement:
+        assert replacement is not driver
+
+    assert driver.quit_called
+    assert pool.size == 1
+
+
+def test_failed_start_frees_place():
+    def broken_factory():
+        raise RuntimeError("no driver installed")
+
+    pool = BrowserPool("chrome", max_size=1, factory=broken_factory)
+
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    assert pool.size == 0
+
+
+def test_close_quits_idle_and_released_drivers():
+    pool = BrowserPool("chrome", max_size=2, factory=FakeDriver)
+    idle = pool.acquire()
+    in_use = pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    pool.release(in_use)
+
+    assert idle.quit_called and in_use.quit_called
+    assert pool.size == 0
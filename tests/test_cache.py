@@ -0,0 +1,52 @@
+from os import utime
+from time import time
+
+from reddit_to_video.cache import DiskCache
+
+
+listing_key = ("listing", "askreddit", "top", "all", 10)
+
+
+def test_set_and_get(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    posts = [{"id": "abc", "title": "A post", "is_self": True}]
+
+    cache.set(listing_key, posts)
+
+    assert cache.get(listing_key) == posts
+    assert cache.get(("listing", "askreddit", "top", "all", 25)) is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set(listing_key, [])
+
+    entry = next(tmp_path.iterdir())
+    utime(entry, (time() - 120, time() - 120))
+
+    assert cache.get(listing_key, "missing") == "missing"
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), ttl=0)
+    cache.set(listing_key, [])
+
+    assert cache.get(listing_key) is None
+    assert not (tmp_path / "cache").exists()
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set(listing_key, [])
+
+    next(tmp_path.iterdir()).write_bytes(b"not gzip")
+
+    assert cache.get(listing_key) is None
+
+
+def test_clear(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set(listing_key, [])
+    cache.clear()
+
+    assert list(tmp_path.iterdir()) == []
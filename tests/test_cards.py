@@ -0,0 +1,59 @@
+import pytest
+from PIL import Image
+
+from reddit_to_video.records import PostRecord, CommentRecord
+from reddit_to_video.video.cards import CardTemplate, load_font, wrap_text, format_score
+from reddit_to_video.video.cards import render_title_card, render_comment_card, render_cards
+
+
+post = PostRecord.from_dict({
+    "id": "12gzsyz", "title": "What is a dealbreaker &amp; why?", "subreddit": "AskReddit",
+    "author": "someone", "score": 15230, "num_comments": 3200, "total_awards": 2})
+
+comment = CommentRecord.from_dict({
+    "id": "jfn3x8a", "body": "Bad manners.\n\nAlso " + "really " * 40 + "long comments.",
+    "author": None, "score": 42, "total_awards": 0})
+
+
+@pytest.mark.parametrize("score, text", [(42, "42"), (1520, "1.5k"), (152000, "152k"), (None, "0")])
+def test_format_score(score, text):
+    assert format_score(score) == text
+
+
+def test_wrap_text_fits_width():
+    font = load_font(20)
+    lines = wrap_text("short words then averyveryveryverylongwordthatneedssplitting", font, 120)
+
+    assert len(lines) > 1
+    assert all(font.getlength(line) <= 120 for line in lines)
+    assert "".join(lines).replace(" ", "") == "shortwordsthenaveryveryveryverylongwordthatneedssplitting"
+
+
+def test_wrap_text_keeps_paragraphs():
+    assert wrap_text("one\n\ntwo", load_font(20), 500) == ["one", "", "two"]
+
+
+def test_render_cards(tmp_path):
+    template = CardTemplate(width=600)
+
+    title_path = render_title_card(post, str(tmp_path / "title.png"), template)
+    comment_path = render_comment_card(comment, str(tmp_path / "comment.png"), template)
+
+    with Image.open(title_path) as title, Image.open(comment_path) as card:
+        assert title.width == 600
+        assert card.width == 600
+        assert card.height > title.height
+
+
+def test_render_cards_in_pool(tmp_path):
+    cards = [(comment, str(tmp_path / f"comment {i}.png")) for i in range(3)]
+
+    assert render_cards(cards, processes=2) == [path for _, path in cards]
+    assert all((tmp_path / f"comment {i}.png").is_file() for i in range(3))
+
+
+def test_template_from_json():
+    template = CardTemplate.from_json({"width": 800, "background": [0, 0, 0, 255]})
+
+    assert template.width == 800
+    assert template.background == (0, 0, 0, 255)
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from reddit_to_video.video import coqui_pool
+from reddit_to_video.video.coqui_pool import CoquiWorkerPool, balance_sentences
+
+numpy = pytest.importorskip("numpy")
+soundfile = pytest.importorskip("soundfile")
+
+
+def test_balance_sentences():
+    sentences = [(i, "x" * length) for i, length in enumerate([90, 10, 40, 40, 20, 10, 50])]
+
+    shares = balance_sentences(sentences, 3)
+
+    assert sorted(pair for share in shares for pair in share) == sentences
+    assert [sum(len(sentence) for _, sentence in share) for share in shares] == [90, 90, 80]
+
+
+def test_balance_fewer_sentences_than_workers():
+    assert balance_sentences([(0, "only one.")], 4) == [[(0, "only one.")]]
+
+
+def test_synthesize_stitches_in_order(tmp_path, monkeypatch):
+    def synthesize_sentences(sentences, kwargs):
+        # one sample per character so each sentence can be recognised
+        return [(sentence_id, numpy.full(len(sentence), len(sentence) / 100, dtype=numpy.float32))
+                for sentence_id, sentence in sentences], 8000
+
+    monkeypatch.setattr(coqui_pool, "synthesize_sentences", synthesize_sentences)
+
+    pool = CoquiWorkerPool("model", workers=3, sentence_gap=0)
+    # the workers run in this process, they don't need a model
+    pool._executor = ThreadPoolExecutor(max_workers=3)
+
+    items = [("A short one. Then a much longer sentence.", str(tmp_path / "a.wav")),
+             ("", str(tmp_path / "empty.wav")),
+             ("Only one sentence here.", str(tmp_path / "b.wav"))]
+
+    errors = pool.synthesize(items)
+    pool.close()
+
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], ValueError)
+
+    samples, sample_rate = soundfile.read(str(tmp_path / "a.wav"))
+    lengths = [len("A short one."), len("Then a much longer sentence.")]
+
+    assert sample_rate == 8000
+    assert len(samples) == sum(lengths)
+    # sentences are stitched back in their order, not the order they were balanced in
+    assert samples[0] == pytest.approx(lengths[0] / 100, abs=0.001)
+    assert samples[-1] == pytest.approx(lengths[1] / 100, abs=0.001)
@@ -0,0 +1,145 @@
+import pytest
+from requests.exceptions import ConnectionError
+
+from reddit_to_video.scraping.download import download_file, get_part_path
+from reddit_to_video.exceptions import IncompleteDownloadError, ExpiredUrlError
+
+content = bytes(range(256)) * 40
+
+
+class FakeResponse:
+    def __init__(self, status_code, body, headers, fail_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+        self.fail_after = fail_after
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise ConnectionError("connection dropped")
+
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Serves content with range support, dropping the first responses after fail_after bytes"""
+
+    def __init__(self, fail_after=None, failures=0, support_range=True):
+        self.fail_after = fail_after
+        self.failures = failures
+        self.support_range = support_range
+        self.ranges = []
+
+    def get(self, url, stream=False, headers=None, timeout=None):
+        requested = (headers or {}).get("Range")
+        self.ranges.append(requested)
+
+        fail_after = None
+
+        if self.failures > 0:
+            self.failures -= 1
+            fail_after = self.fail_after
+
+        if requested is None or not self.support_range:
+            return FakeResponse(200, content, {"Content-Length": str(len(content))}, fail_after)
+
+        start = int(requested[len("bytes="):-1])
+
+        if start >= len(content):
+            return FakeResponse(416, b"", {"Content-Range": f"bytes */{len(content)}"})
+
+        return FakeResponse(206, content[start:], {
+            "Content-Length": str(len(content) - start),
+            "Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"}, fail_after)
+
+
+def test_download_file(tmp_path):
+    output = str(tmp_path / "clip.mp4")
+
+    assert download_file("https://example.com/clip.mp4", output, chunk_size=1000,
+                         session=FakeSession()) == output
+
+    assert (tmp_path / "clip.mp4").read_bytes() == content
+    assert not (tmp_path / "clip.mp4.part").exists()
+
+
+def test_download_resumes_with_range(tmp_path):
+    output = str(tmp_path / "clip.mp4")
+    session = FakeSession(fail_after=3000, failures=1)
+
+    download_file("https://example.com/clip.mp4", output, chunk_size=1000, session=session)
+
+    assert (tmp_path / "clip.mp4").read_bytes() == content
+    assert session.ranges == [None, "bytes=3000-"]
+
+
+def test_download_resumes_part_file(tmp_path):
+    output = str(tmp_path / "clip.mp4")
+
+    with open(get_part_path(output), "wb") as file:
+        file.write(content[:5000])
+
+    session = FakeSession()
+    download_file("https://example.com/clip.mp4", output, session=session)
+
+    assert (tmp_path / "clip.mp4").read_bytes() == content
+    assert session.ranges == ["bytes=5000-"]
+
+
+def test_download_restarts_without_range_support(tmp_path):
+    output = str(tmp_path / "clip.mp4")
+
+    with open(get_part_path(output), "wb") as file:
+        file.write(b"stale bytes")
+
+    download_file("https://example.com/clip.mp4", output,
+                  session=FakeSession(support_range=False))
+
+    assert (tmp_path / "clip.mp4").read_bytes() == content
+
+
+def test_failed_download_leaves_no_output(tmp_path):
+    output = str(tmp_path / "clip.mp4")
+
+    with pytest.raises(ConnectionError):
+        download_file("https://example.com/clip.mp4", output, chunk_size=1000, retries=1,
+                      session=FakeSession(fail_after=0, failures=2))
+
+    assert not (tmp_path / "clip.mp4").exists()
+
+
+def test_expired_url_raises(tmp_path):
+    class ExpiredSession(FakeSession):
+        def get(self, url, **kwargs):
+            return FakeResponse(403, b"", {})
+
+    with pytest.raises(ExpiredUrlError):
+        download_file("https://example.com/clip.mp4?token=1", str(tmp_path / "clip.mp4"),
+                      session=ExpiredSession())
+
+
+def test_truncated_response_is_retried(tmp_path):
+    class TruncatingSession(FakeSession):
+        def get(self, url, stream=False, headers=None, timeout=None):
+            response = super().get(url, stream, headers, timeout)
+
+            if len(self.ranges) == 1:
+                response.body = response.body[:1000]
+
+            return response
+
+    output = str(tmp_path / "clip.mp4")
+    session = TruncatingSession()
+
+    download_file("https://example.com/clip.mp4", output, session=session)
+
+    assert (tmp_path / "clip.mp4").read_bytes() == content
+    assert session.ranges == [None, "bytes=1000-"]
+
+    with pytest.raises(IncompleteDownloadError):
+        download_file("https://example.com/clip.mp4", str(tmp_path / "other.mp4"), retries=0,
+                      session=TruncatingSession())
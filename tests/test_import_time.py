@@ -0,0 +1,77 @@
+import subprocess
+import sys
+from os.path import join as path_join, dirname, abspath
+
+import pytest
+
+
+SRC_PATH = abspath(path_join(dirname(__file__), "..", "src"))
+
+# seconds a cold import may take, only checked with --benchmark since it depends on the machine
+IMPORT_BUDGET = 1.0
+# checked on every run, loose enough for a slow or busy machine but still catches a pipeline
+# stage being imported at startup
+GENEROUS_IMPORT_BUDGET = 3.0
+
+# modules that belong to a pipeline stage and must not load at startup
+HEAVY_MODULES = ["moviepy", "selenium", "praw", "prawcore", "gtts", "pyttsx3",
+                 "pyloudnorm", "soundfile", "bs4", "redvid", "pytube", "TTS",
+                 "tqdm", "proglog", "requests"]
+
+
+def get_loaded_modules(module: str) -> list:
+    """Imports a module in a fresh interpreter and returns the names in its sys.modules"""
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+        cwd=SRC_PATH, capture_output=True, text=True, check=True)
+
+    return result.stdout.split()
+
+
+def get_import_times(module: str) -> dict:
+    """Imports a module in a fresh interpreter with -X importtime
+    and returns the cumulative import time of each module in microseconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_PATH, capture_output=True, text=True, check=True)
+
+    times = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def format_slowest(times: dict, amount: int = 10) -> str:
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)
+    return "\n".join(f"{name}: {us / 1000:.1f}ms" for name, us in slowest[:amount])
+
+
+@pytest.mark.parametrize("module", ["main", "reddit_to_video.video.config", "reddit_to_video.prompts"])
+def test_no_heavy_imports(module):
+    loaded = [name for name in get_loaded_modules(module) if name.split(".")[0] in HEAVY_MODULES]
+
+    assert loaded == [], f"{module} imports heavy modules at startup: {loaded}"
+
+
+def check_import_budget(module: str, budget: float) -> None:
+    times = get_import_times(module)
+
+    assert times[module] / 1_000_000 < budget, (
+        f"{module} took {times[module] / 1000:.1f}ms to import\n" + format_slowest(times))
+
+
+@pytest.mark.parametrize("module", ["main", "reddit_to_video.video.config"])
+def test_import_time_generous_budget(module):
+    check_import_budget(module, GENEROUS_IMPORT_BUDGET)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("module", ["main", "reddit_to_video.video.config"])
+def test_import_time_budget(module):
+    check_import_budget(module, IMPORT_BUDGET)
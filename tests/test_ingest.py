@@ -0,0 +1,94 @@
+import re
+import subprocess
+
+import pytest
+
+from reddit_to_video.store import MediaStore
+from reddit_to_video.video.export_settings import ExportSettings
+from reddit_to_video.video.ingest import (IngestProfile, Ingestor, concat_clips, get_ffmpeg,
+                                          get_ingest_url, has_audio_stream)
+
+imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+
+profile = IngestProfile(96, 64, fps=24, preset="ultrafast", bitrate="200k")
+
+
+def make_clip(path, size, rate, audio=True):
+    args = [get_ffmpeg(), "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=s={size}:r={rate}:d=1"]
+
+    if audio:
+        args += ["-f", "lavfi", "-i", "sine=d=1:sample_rate=22050", "-shortest"]
+
+    subprocess.run(args + ["-pix_fmt", "yuv444p", str(path)], check=True)
+    return str(path)
+
+
+def get_info(path):
+    return subprocess.run([get_ffmpeg(), "-hide_banner", "-i", path],
+                          capture_output=True, text=True).stderr
+
+
+def test_profile_from_export_settings():
+    export_settings = ExportSettings(fps=60, bitrate="8000k")
+    from_settings = IngestProfile.from_export_settings(1920, 1080, export_settings)
+
+    assert from_settings.fps == 60 and from_settings.bitrate == "8000k"
+    assert from_settings.key != IngestProfile(1920, 1080).key
+
+
+def test_ingested_clips_share_a_profile(tmp_path):
+    store = MediaStore(str(tmp_path / "store"))
+    sources = [make_clip(tmp_path / "wide.mp4", "160x90", 30),
+               make_clip(tmp_path / "tall.mp4", "90x160", 25, audio=False)]
+
+    with Ingestor(profile, store=store) as ingestor:
+        for source in sources:
+            ingestor.submit(source)
+
+        paths = [ingestor.get(source) for source in sources]
+
+    for path in paths:
+        info = get_info(path)
+
+        assert "96x64" in info
+        assert "24 fps" in info
+        assert "yuv420p" in info
+        assert has_audio_stream(path)
+        assert re.search(r"Audio: aac.*44100 Hz, stereo", info)
+
+    # ingested clips are kept in the store
+    assert store.get(get_ingest_url(sources[0], profile)) == paths[0]
+
+    output = concat_clips(paths, str(tmp_path / "joined.mp4"))
+    duration = re.search(r"Duration: (\d+):(\d+):([\d.]+)", get_info(output))
+
+    assert float(duration.group(3)) == pytest.approx(2, abs=0.2)
+
+
+def test_sources_with_the_same_name_dont_collide(tmp_path):
+    store = MediaStore(str(tmp_path / "store"))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    sources = [make_clip(tmp_path / "a" / "clip.mp4", "160x90", 30),
+               make_clip(tmp_path / "b" / "clip.mp4", "90x160", 25)]
+
+    assert get_ingest_url(sources[0], profile) != get_ingest_url(sources[1], profile)
+
+    with Ingestor(profile, store=store) as ingestor:
+        paths = [ingestor.get(source) for source in sources]
+
+    assert paths[0] != paths[1]
+
+
+def test_changed_source_is_ingested_again(tmp_path):
+    source = make_clip(tmp_path / "clip.mp4", "160x90", 30)
+    url = get_ingest_url(source, profile)
+
+    make_clip(tmp_path / "clip.mp4", "160x90", 30, audio=False)
+
+    assert get_ingest_url(source, profile) != url
+
+
+def test_failed_ingest_returns_none(tmp_path):
+    with Ingestor(profile, store=MediaStore(str(tmp_path))) as ingestor:
+        assert ingestor.get(str(tmp_path / "missing.mp4")) is None
@@ -0,0 +1,114 @@
+import time
+from threading import current_thread
+
+from reddit_to_video.records import CommentRecord
+from reddit_to_video.handlers.media import CommentMedia, produce_comment_media
+
+
+def make_media(tmp_path, count):
+    return [CommentMedia(CommentRecord.from_dict({"id": str(i), "body": f"comment {i}"}),
+                         str(tmp_path / f"comment - {i}.mp3"), str(tmp_path / f"comment - {i}.png"))
+            for i in range(count)]
+
+
+def write_file(path):
+    with open(path, "w") as file:
+        file.write("x")
+
+
+def test_produces_all_media(tmp_path):
+    comment_media = make_media(tmp_path, 25)
+    batches = []
+
+    def capture_visuals(batch):
+        batches.append(len(batch))
+        for media in batch:
+            write_file(media.visual_path)
+
+    failed = produce_comment_media(
+        comment_media, lambda text, path: write_file(path), capture_visuals,
+        tts_workers=4, queue_size=4, batch_size=10)
+
+    assert failed == []
+    assert sum(batches) == 25
+    assert max(batches) <= 10
+    assert all(is_made for media in comment_media
+               for is_made in ((tmp_path / f"comment - {media.comment.id}.mp3").is_file(),
+                               (tmp_path / f"comment - {media.comment.id}.png").is_file()))
+
+
+def test_skips_existing_media(tmp_path):
+    comment_media = make_media(tmp_path, 2)
+    write_file(comment_media[0].audio_path)
+    write_file(comment_media[0].visual_path)
+
+    saved = []
+    captured = []
+
+    produce_comment_media(comment_media, lambda text, path: saved.append(text),
+                          lambda batch: captured.extend(media.comment.id for media in batch))
+
+    assert saved == ["comment 1"]
+    assert captured == ["1"]
+
+
+def test_visuals_on_one_thread(tmp_path):
+    threads = set()
+
+    produce_comment_media(make_media(tmp_path, 20), lambda text, path: None,
+                          lambda batch: threads.add(current_thread().name), batch_size=3)
+
+    assert len(threads) == 1
+    assert current_thread().name not in threads
+
+
+def test_tts_and_visuals_overlap(tmp_path):
+    start = time.time()
+
+    produce_comment_media(make_media(tmp_path, 4), lambda text, path: time.sleep(0.1),
+                          lambda batch: time.sleep(0.1 * len(batch)), batch_size=1)
+
+    # run one after another this would take 0.8 seconds
+    assert time.time() - start < 0.7
+
+
+def test_failures_are_returned(tmp_path):
+    comment_media = make_media(tmp_path, 3)
+
+    def save_audio(text, path):
+        if text == "comment 1":
+            raise ValueError("tts failed")
+
+    def capture_visuals(batch):
+        raise RuntimeError("browser crashed")
+
+    failed = produce_comment_media(comment_media, save_audio, capture_visuals)
+
+    assert comment_media[1] in failed
+    assert all(media in failed for media in comment_media)
+
+
+def test_tts_batches(tmp_path):
+    comment_media = make_media(tmp_path, 10)
+    batches = []
+
+    class Result:
+        def __init__(self, error=None):
+            self.error = error
+
+    def save_audio_batch(items):
+        batches.append([text for text, _ in items])
+        results = []
+        for text, path in items:
+            if text == "comment 3":
+                results.append(Result(ValueError("tts failed")))
+            else:
+                write_file(path)
+                results.append(Result())
+        return results
+
+    failed = produce_comment_media(comment_media, None, lambda batch: None,
+                                   save_audio_batch=save_audio_batch, tts_batch_size=4)
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert failed == [comment_media[3]]
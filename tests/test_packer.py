@@ -0,0 +1,69 @@
+import time
+from types import SimpleNamespace
+
+from reddit_to_video.video.packer import ScriptPacker
+from reddit_to_video.scraping.scheduler import DownloadScheduler, DownloadJob
+
+
+def clip(duration):
+    return SimpleNamespace(duration=duration)
+
+
+def test_add_only_packs_clips_that_fit():
+    packer = ScriptPacker(60, reserved=10, clip_overhead=2)
+
+    assert packer.add(1, clip(30))
+    assert not packer.add(0, clip(30))
+    assert packer.add(0, clip(10))
+
+    assert packer.remaining == 6
+    assert [element.duration for element in packer.elements] == [10, 30]
+
+
+def test_wants_more_counts_downloads_in_flight():
+    packer = ScriptPacker(100, default_estimate=20, headroom=0.25)
+
+    assert packer.wants_more([None] * 6)
+    assert not packer.wants_more([None] * 7)
+    # known durations are used over the estimate
+    assert packer.wants_more([5] * 20)
+
+    packer.add(0, clip(90))
+
+    assert packer.estimate() == 90
+    assert not packer.wants_more([None])
+
+
+def test_full():
+    packer = ScriptPacker(30)
+    packer.add(0, clip(29))
+
+    assert packer.full
+    assert not packer.wants_more([])
+
+
+def test_stops_downloading_once_the_script_is_full():
+    packer = ScriptPacker(60, default_estimate=10)
+    started = []
+
+    def download(rank):
+        started.append(rank)
+        time.sleep(0.01)
+        return clip(10)
+
+    scheduler = DownloadScheduler(
+        max_concurrent=4, admit=lambda job: packer.wants_more([running.duration for running in scheduler.running]))
+
+    def on_finished(job):
+        if job.succeeded:
+            packer.add(job.rank, job.result)
+
+        if packer.full:
+            scheduler.cancel_all()
+
+    jobs = [DownloadJob(rank, download, (rank,)) for rank in range(100)]
+    scheduler.run(jobs, on_finished)
+
+    assert len(packer.elements) == 6
+    assert len(started) < 15
+    assert all(job.cancelled for job in jobs if job.rank not in started)
@@ -31,3 +31,64 @@
 # # screenshot_comment
 # # screenshot_comments
 # # init to incorrect url
+
+
+import pytest
+
+pytest.importorskip("selenium")
+Image = pytest.importorskip("PIL.Image")
+
+from reddit_to_video.post import Post, plan_captures, crop_rect  # noqa: E402
+from reddit_to_video.records import PostRecord  # noqa: E402
+from reddit_to_video import post as post_module  # noqa: E402
+
+
+def test_plan_captures_groups_rects_in_viewport():
+    rects = {
+        "t1_c": {"x": 0, "y": 1500, "width": 100, "height": 200},
+        "t1_a": {"x": 0, "y": 100, "width": 100, "height": 300},
+        "t1_b": {"x": 0, "y": 500, "width": 100, "height": 400},
+        "t1_tall": {"x": 0, "y": 2000, "width": 100, "height": 2000},
+    }
+
+    assert plan_captures(rects, 1000) == [(100, ["t1_a", "t1_b"]), (1500, ["t1_c"])]
+
+
+def test_crop_rect_uses_scroll_and_scale():
+    capture = Image.new("RGB", (200, 200), "white")
+    capture.paste((255, 0, 0), (20, 40, 60, 100))
+
+    cropped = crop_rect(capture, {"x": 10, "y": 70, "width": 20, "height": 30}, 50, 2)
+
+    assert cropped.size == (40, 60)
+    assert cropped.getcolors() == [(40 * 60, (255, 0, 0))]
+
+
+class FakePool:
+    def __init__(self):
+        self.acquired = 0
+        self.released = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return None
+
+    def release(self, driver):
+        self.released += 1
+
+
+def test_image_is_downloaded_from_metadata_without_a_browser(tmp_path, monkeypatch):
+    downloads = []
+    monkeypatch.setattr(post_module, "download_reddit_image_plan",
+                        lambda plan, output: downloads.append((plan.image_url, output)) or output)
+
+    pool = FakePool()
+    record = PostRecord.from_dict({"id": "12h6ot0", "url": "https://i.redd.it/qu2gqppixcta1.jpg"})
+    post = Post("https://www.reddit.com/r/meirl/comments/12h6ot0/", "12h6ot0", pool=pool, record=record)
+
+    assert post.has_image
+    assert post.download_image(str(tmp_path)) == str(tmp_path / "post - 12h6ot0.png")
+    post.close()
+
+    assert downloads == [("https://i.redd.it/qu2gqppixcta1.jpg", str(tmp_path / "post - 12h6ot0.png"))]
+    assert pool.acquired == 0 and pool.released == 0
@@ -0,0 +1,105 @@
+import struct
+import subprocess
+
+import pytest
+
+from reddit_to_video.scraping import probe
+from reddit_to_video.scraping.probe import (ProbeResult, parse_iso_duration, parse_hls_duration,
+                                            get_hls_variant_url, find_mvhd_duration, probe_mp4, check_probe)
+from reddit_to_video.exceptions import DurationTooLongError, FileTooLargeError
+
+
+def box(box_type, content):
+    return struct.pack(">I4s", len(content) + 8, box_type) + content
+
+
+def mvhd(timescale, duration):
+    # version 0, flags, creation and modification times, then the timescale and duration
+    return box(b"mvhd", bytes(4) + bytes(8) + struct.pack(">II", timescale, duration) + bytes(80))
+
+
+def serve_bytes(monkeypatch, data):
+    """Serves data to probe.read_range, returning the ranges that were read"""
+    reads = []
+
+    def read_range(url, start, length):
+        reads.append((start, length))
+        return data[start:start + length], len(data)
+
+    monkeypatch.setattr(probe, "read_range", read_range)
+    return reads
+
+
+@pytest.mark.parametrize("text, seconds", [
+    ("PT28S", 28),
+    ("PT1M2.5S", 62.5),
+    ("PT1H0M0.000S", 3600),
+    ("P1DT1S", 86401),
+])
+def test_parse_iso_duration(text, seconds):
+    assert parse_iso_duration(text) == seconds
+
+
+def test_parse_iso_duration_rejects_other_text():
+    assert parse_iso_duration("28 seconds") is None
+
+
+def test_hls_master_playlist_picks_best_variant():
+    master = ("#EXTM3U\n"
+              "#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n360/index.m3u8\n"
+              "#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080\n1080/index.m3u8\n")
+
+    assert get_hls_variant_url(master, "https://clips.kick.com/abc/master.m3u8") == \
+        "https://clips.kick.com/abc/1080/index.m3u8"
+
+
+def test_parse_hls_duration():
+    playlist = "#EXTM3U\n#EXTINF:10.0,\n0.ts\n#EXTINF:10.0,\n1.ts\n#EXTINF:4.5,\n2.ts\n#EXT-X-ENDLIST\n"
+
+    assert get_hls_variant_url(playlist, "https://example.com/index.m3u8") is None
+    assert parse_hls_duration(playlist) == 24.5
+
+
+def test_mvhd_after_large_mdat(monkeypatch):
+    # the moov box is after the media data, like mp4s written without faststart
+    data = box(b"ftyp", b"isom" + bytes(4)) + box(b"mdat", bytes(300_000)) + \
+        box(b"moov", mvhd(1000, 28_500))
+    reads = serve_bytes(monkeypatch, data)
+
+    result = probe_mp4("https://example.com/clip.mp4")
+
+    assert result == ProbeResult(duration=28.5, size=len(data))
+    # the mdat box was skipped instead of read
+    assert len(reads) == 2
+
+
+def test_find_mvhd_duration_needs_more_data():
+    data = box(b"ftyp", b"isom" + bytes(4)) + struct.pack(">I4s", 500_000, b"mdat")
+
+    assert find_mvhd_duration(data, 0) == (None, 16 + 500_000)
+
+
+@pytest.mark.parametrize("faststart", [True, False])
+def test_probe_real_mp4(monkeypatch, tmp_path, faststart):
+    imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+    path = tmp_path / "clip.mp4"
+
+    subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", "color=c=red:s=64x64:d=2", "-pix_fmt", "yuv420p"] +
+                   (["-movflags", "+faststart"] if faststart else []) + [str(path)], check=True)
+
+    serve_bytes(monkeypatch, path.read_bytes())
+
+    assert probe_mp4("https://example.com/clip.mp4").duration == pytest.approx(2, abs=0.1)
+
+
+def test_check_probe():
+    check_probe(ProbeResult(duration=10, size=1024), max_duration=20, max_size_mb=1)
+    # unknown values pass
+    check_probe(ProbeResult(), max_duration=20, max_size_mb=1)
+
+    with pytest.raises(DurationTooLongError):
+        check_probe(ProbeResult(duration=28), max_duration=20)
+
+    with pytest.raises(FileTooLargeError):
+        check_probe(ProbeResult(size=3 * 1024 * 1024), max_size_mb=2)
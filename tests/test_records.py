@@ -0,0 +1,70 @@
+import pickle
+from types import SimpleNamespace
+
+from reddit_to_video.records import PostRecord, CommentRecord
+
+
+class Redditor:
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+submission = SimpleNamespace(
+    id="12gzsyz", title="What is a dealbreaker?", url="https://www.reddit.com/r/AskReddit/comments/12gzsyz/",
+    permalink="/r/AskReddit/comments/12gzsyz/", selftext="", is_self=True, score=1500,
+    num_comments=320, author=Redditor("someone"), subreddit=Redditor("AskReddit"),
+    created_utc=1681000000.0, over_18=False, total_awards_received=2)
+
+comment = SimpleNamespace(id="jfn3x8a", body="Bad manners", author=None,
+                          score=42, created_utc=1681000100.0, total_awards_received=0)
+
+
+def test_post_record_from_submission():
+    record = PostRecord.from_submission(submission)
+
+    assert record.title == "What is a dealbreaker?"
+    assert record.author == "someone"
+    assert record.subreddit == "AskReddit"
+    assert record.total_awards == 2
+
+
+def test_comment_record_from_deleted_author():
+    assert CommentRecord.from_comment(comment).author is None
+
+
+def test_records_round_trip():
+    post = PostRecord.from_submission(submission)
+    reply = CommentRecord.from_comment(comment)
+
+    assert PostRecord.from_dict(post.to_dict()) == post
+    assert CommentRecord.from_dict(reply.to_dict()) == reply
+    assert pickle.loads(pickle.dumps(post)) == post
+
+
+def test_records_have_no_instance_dict():
+    record = PostRecord.from_submission(submission)
+
+    assert not hasattr(record, "__dict__")
+
+
+def test_from_dict_fills_missing_fields():
+    record = CommentRecord.from_dict({"id": "abc", "body": "text"})
+
+    assert record.id == "abc"
+    assert record.total_awards is None
+
+
+def test_post_record_media_metadata():
+    reddit_video = {"fallback_url": "https://v.redd.it/abc/DASH_720.mp4", "duration": 12}
+    crosspost = SimpleNamespace(**vars(submission), is_video=False, media=None, crosspost_parent_list=[
+        {"media": {"reddit_video": reddit_video},
+         "preview": {"images": [{"source": {"url": "https://preview.redd.it/abc.jpg"}}]}}])
+
+    record = PostRecord.from_submission(crosspost)
+
+    assert record.reddit_video == reddit_video
+    assert record.preview_url == "https://preview.redd.it/abc.jpg"
+    assert PostRecord.from_dict(record.to_dict()) == record
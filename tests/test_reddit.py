@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+from reddit_to_video import reddit as reddit_module
+from reddit_to_video.cache import DiskCache
+from reddit_to_video.reddit import Reddit
+
+
+def make_submission(index):
+    return SimpleNamespace(
+        id=f"post{index}", title=f"Post {index}", url=f"https://v.redd.it/post{index}",
+        permalink=f"/r/videos/comments/post{index}/", selftext="", is_self=False, score=100 - index,
+        num_comments=0, author="someone", subreddit="videos", created_utc=1681000000.0,
+        over_18=False, total_awards_received=0)
+
+
+def make_reddit(tmp_path, fetched):
+    reddit = Reddit("id", "secret", "tests", cache=DiskCache(str(tmp_path), ttl=60))
+
+    def top(time_filter, limit, params):
+        # continues after the post in params, like reddit's listings
+        start = int(params["after"][len("t3_post"):]) + 1 if "after" in params else 0
+
+        for index in range(start, start + limit):
+            fetched.append(index)
+            yield make_submission(index)
+
+    reddit._reddit = SimpleNamespace(subreddit=lambda name: SimpleNamespace(top=top))
+    return reddit
+
+
+def test_iter_top_posts_is_lazy(tmp_path):
+    fetched = []
+    posts = make_reddit(tmp_path, fetched).iter_top_posts("videos", limit=50)
+
+    assert next(posts).id == "post0"
+    assert fetched == [0]
+
+
+def test_listing_read_to_the_end_is_cached(tmp_path):
+    fetched = []
+    reddit = make_reddit(tmp_path, fetched)
+
+    assert [post.id for post in reddit.get_top_posts("videos", limit=5)] == [f"post{i}" for i in range(5)]
+    assert len(reddit.get_top_posts("videos", limit=5)) == 5
+    assert fetched == [0, 1, 2, 3, 4]
+
+
+def test_listing_stopped_early_is_cached_and_extended(tmp_path):
+    fetched = []
+    reddit = make_reddit(tmp_path, fetched)
+
+    posts = reddit.iter_top_posts("videos", limit=5)
+    next(posts)
+    next(posts)
+    posts.close()
+
+    assert fetched == [0, 1]
+
+    # the cached posts are served, only the rest of the listing is fetched
+    posts = reddit.iter_top_posts("videos", limit=5)
+    assert [next(posts).id for _ in range(3)] == ["post0", "post1", "post2"]
+    posts.close()
+
+    assert fetched == [0, 1, 2]
+
+    assert [post.id for post in reddit.get_top_posts("videos", limit=5)] == [f"post{i}" for i in range(5)]
+    assert fetched == [0, 1, 2, 3, 4]
+
+    # complete now, read from the cache
+    assert len(reddit.get_top_posts("videos", limit=5)) == 5
+    assert fetched == [0, 1, 2, 3, 4]
+
+
+def test_continued_listing_expires_from_when_it_was_first_cached(tmp_path, monkeypatch):
+    fetched = []
+    reddit = make_reddit(tmp_path, fetched)
+    now = [1000.0]
+    monkeypatch.setattr(reddit_module, "time", lambda: now[0])
+
+    posts = reddit.iter_top_posts("videos", limit=5)
+    next(posts)
+    posts.close()
+
+    # continuing the listing rewrites its entry
+    now[0] += 50
+    posts = reddit.iter_top_posts("videos", limit=5)
+    [next(posts) for _ in range(2)]
+    posts.close()
+
+    assert fetched == [0, 1]
+
+    # past the ttl of the first read, the listing is fetched again from the start
+    now[0] += 20
+    assert len(reddit.get_top_posts("videos", limit=5)) == 5
+    assert fetched == [0, 1, 0, 1, 2, 3, 4]
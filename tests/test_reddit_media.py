@@ -0,0 +1,121 @@
+import shutil
+import subprocess
+
+import pytest
+
+from reddit_to_video.records import PostRecord
+from reddit_to_video.scraping import reddit_media
+from reddit_to_video.scraping.reddit_media import get_reddit_media_plan, get_dash_audio_url
+from reddit_to_video.scraping.reddit_media import download_reddit_video_plan, download_reddit_image_plan
+from reddit_to_video.exceptions import NoImageError
+
+reddit_video = {
+    "fallback_url": "https://v.redd.it/yw6nan929np31/DASH_720.mp4?source=fallback",
+    "dash_url": "https://v.redd.it/yw6nan929np31/DASHPlaylist.mpd",
+    "hls_url": "https://v.redd.it/yw6nan929np31/HLSPlaylist.m3u8",
+    "duration": 28, "width": 1280, "height": 720, "is_gif": False
+}
+
+manifest = b"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011">
+  <Period>
+    <AdaptationSet contentType="video">
+      <Representation bandwidth="1200000" id="VIDEO-1"><BaseURL>DASH_720.mp4</BaseURL></Representation>
+    </AdaptationSet>
+    <AdaptationSet contentType="audio">
+      <Representation bandwidth="64000" id="AUDIO-1"><BaseURL>DASH_AUDIO_64.mp4</BaseURL></Representation>
+      <Representation bandwidth="128000" id="AUDIO-2"><BaseURL>DASH_AUDIO_128.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>"""
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+
+def test_video_plan_from_metadata():
+    plan = get_reddit_media_plan(PostRecord.from_dict({"id": "ei6pek", "reddit_video": reddit_video}))
+
+    assert plan.is_video
+    assert plan.video_url == reddit_video["fallback_url"]
+    assert plan.duration == 28
+    assert (plan.width, plan.height) == (1280, 720)
+
+
+def test_gif_plan_has_no_audio():
+    plan = get_reddit_media_plan(PostRecord.from_dict(
+        {"id": "ei6pek", "reddit_video": dict(reddit_video, is_gif=True)}))
+
+    assert plan.has_audio is False
+
+
+def test_image_plans():
+    image = get_reddit_media_plan(PostRecord.from_dict({"id": "a", "url": "https://i.redd.it/qu2gqppixcta1.jpg"}))
+    preview = get_reddit_media_plan(PostRecord.from_dict({
+        "id": "b", "url": "https://example.com/article",
+        "preview_url": "https://preview.redd.it/abc.jpg?width=640&amp;s=123"}))
+
+    assert image.image_url == "https://i.redd.it/qu2gqppixcta1.jpg"
+    assert not image.is_video
+    assert preview.image_url == "https://preview.redd.it/abc.jpg?width=640&s=123"
+
+
+def test_no_plan_for_links():
+    assert get_reddit_media_plan(PostRecord.from_dict({"id": "a", "url": "https://streamable.com/fpuv4"})) is None
+
+
+def test_dash_audio_url(monkeypatch):
+    monkeypatch.setattr(reddit_media, "get", lambda url: FakeResponse(manifest))
+
+    assert get_dash_audio_url(reddit_video["dash_url"]) == "https://v.redd.it/yw6nan929np31/DASH_AUDIO_128.mp4"
+
+
+def test_download_merges_audio(monkeypatch, tmp_path):
+    imageio_ffmpeg = pytest.importorskip("imageio_ffmpeg")
+    ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+
+    video_source = tmp_path / "DASH_720.mp4"
+    audio_source = tmp_path / "DASH_AUDIO_128.mp4"
+
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "color=c=red:s=64x64:d=1",
+                    "-pix_fmt", "yuv420p", str(video_source)], check=True)
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=d=1",
+                    "-c:a", "aac", str(audio_source)], check=True)
+
+    sources = {reddit_video["fallback_url"]: video_source,
+               "https://v.redd.it/yw6nan929np31/DASH_AUDIO_128.mp4": audio_source}
+
+    monkeypatch.setattr(reddit_media, "get", lambda url: FakeResponse(manifest))
+    monkeypatch.setattr(reddit_media, "download_file",
+                        lambda url, output: shutil.copy(sources[url], output) and output)
+
+    plan = get_reddit_media_plan(PostRecord.from_dict({"id": "ei6pek", "reddit_video": reddit_video}))
+    output = str(tmp_path / "ei6pek.mp4")
+
+    assert download_reddit_video_plan(plan, output) == output
+
+    probe = subprocess.run([ffmpeg, "-i", output], capture_output=True, text=True)
+
+    assert "Video:" in probe.stderr
+    assert "Audio:" in probe.stderr
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["DASH_720.mp4", "DASH_AUDIO_128.mp4", "ei6pek.mp4"]
+
+
+def test_download_image_plan(monkeypatch, tmp_path):
+    downloads = []
+    monkeypatch.setattr(reddit_media, "download_file",
+                        lambda url, output: downloads.append((url, output)) or output)
+
+    plan = get_reddit_media_plan(PostRecord.from_dict(
+        {"id": "12h6ot0", "url": "https://www.reddit.com/r/meirl/comments/12h6ot0/",
+         "preview_url": "https://preview.redd.it/qu2gqppixcta1.jpg?width=1080&amp;s=abc"}))
+
+    assert download_reddit_image_plan(plan, str(tmp_path / "post.png")) == str(tmp_path / "post.png")
+    assert downloads == [("https://preview.redd.it/qu2gqppixcta1.jpg?width=1080&s=abc", str(tmp_path / "post.png"))]
+
+    with pytest.raises(NoImageError):
+        download_reddit_image_plan(get_reddit_media_plan(
+            PostRecord.from_dict({"id": "ei6pek", "reddit_video": reddit_video})), str(tmp_path / "post.png"))
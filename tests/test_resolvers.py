@@ -0,0 +1,205 @@
+import pytest
+
+from reddit_to_video.scraping import resolvers, scraper
+from reddit_to_video.scraping.resolvers import resolve_media_url, resolve_kick, find_video_url
+from reddit_to_video.scraping.resolvers import clear_resolved_urls
+from reddit_to_video.scraping.validator import ClipService
+from reddit_to_video.exceptions import ScrapingError, ExpiredUrlError
+
+
+class FakeResponse:
+    def __init__(self, json=None, text="", status_code=200):
+        self._json = json
+        self.text = text
+        self.status_code = status_code
+        self.chunks_read = 0
+        self.closed = False
+
+    def json(self):
+        if self._json is None:
+            raise ValueError("not json")
+        return self._json
+
+    def iter_content(self, chunk_size, decode_unicode=False):
+        for start in range(0, len(self.text), chunk_size):
+            self.chunks_read += 1
+            yield self.text[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        response = self.pages.get(url, FakeResponse(status_code=404))
+        self.responses.append(response)
+        return response
+
+
+@pytest.fixture
+def fake_http(monkeypatch):
+    pages = {}
+    posts = {}
+
+    monkeypatch.setattr(resolvers, "get", lambda url, **kwargs: pages.get(url, FakeResponse(status_code=404)))
+    monkeypatch.setattr(resolvers, "post", lambda url, **kwargs: posts[url](kwargs["json"]))
+
+    session = FakeSession(pages)
+    monkeypatch.setattr(resolvers, "get_session", lambda: session)
+
+    clear_resolved_urls()
+    yield pages, posts, session
+    clear_resolved_urls()
+
+
+def test_resolve_streamable(fake_http):
+    pages, _, _ = fake_http
+    pages["https://api.streamable.com/videos/fpuv4"] = FakeResponse(
+        {"files": {"mp4": {"url": "//cdn.streamable.com/video/mp4/fpuv4.mp4?token=1"}}})
+
+    assert resolve_media_url("https://streamable.com/fpuv4", ClipService.STREAMABLE) == \
+        "https://cdn.streamable.com/video/mp4/fpuv4.mp4?token=1"
+
+
+def test_resolve_kick(fake_http):
+    pages, _, _ = fake_http
+    pages["https://kick.com/api/v2/clips/clip_01"] = FakeResponse(
+        {"clip": {"video_url": "https://clips.kick.com/clip_01.mp4"}})
+
+    assert resolve_media_url("https://kick.com/xqc?clip=clip_01", ClipService.KICK) == \
+        "https://clips.kick.com/clip_01.mp4"
+
+
+def test_kick_url_without_clip_id(fake_http, monkeypatch):
+    pages, _, _ = fake_http
+    pages["https://kick.com/xqc"] = FakeResponse(text='<video src="https://clips.kick.com/fallback.mp4">')
+
+    with pytest.raises(ScrapingError):
+        resolve_kick("https://kick.com/xqc")
+
+    # even if the classifier says it is kick without finding an id
+    monkeypatch.setattr(resolvers, "classify_url", lambda url: (ClipService.KICK, None))
+
+    with pytest.raises(ScrapingError):
+        resolve_kick("https://kick.com/xqc")
+
+    assert resolve_media_url("https://kick.com/xqc", ClipService.KICK) == \
+        "https://clips.kick.com/fallback.mp4"
+
+
+def test_resolve_twitch_best_quality(fake_http):
+    _, posts, _ = fake_http
+    requests = []
+
+    def gql(json):
+        requests.append(json)
+        return FakeResponse({"data": {"clip": {
+            "videoQualities": [{"quality": "360", "sourceURL": "https://clips.twitch.tv/360.mp4"},
+                               {"quality": "1080", "sourceURL": "https://clips.twitch.tv/1080.mp4"}],
+            "playbackAccessToken": {"signature": "abc", "value": '{"a":1}'}}}})
+
+    posts["https://gql.twitch.tv/gql"] = gql
+
+    url = resolve_media_url(
+        "https://www.twitch.tv/plumy_/clip/MoldyTamePandaBCWarrior-DIsGTx_CrhxaC437", ClipService.TWITCH)
+
+    assert url == "https://clips.twitch.tv/1080.mp4?sig=abc&token=%7B%22a%22%3A1%7D"
+    assert requests[0]["variables"] == {"slug": "MoldyTamePandaBCWarrior-DIsGTx_CrhxaC437"}
+
+
+def test_falls_back_to_html(fake_http):
+    pages, _, session = fake_http
+    page = FakeResponse(text=("<html>" + "x" * 40_000 +
+                              '<meta property="og:video" content="https://cdn.example.com/a.mp4?x=1&amp;y=2">' +
+                              "y" * 100_000))
+    pages["https://streamable.com/gone"] = page
+
+    assert resolve_media_url("https://streamable.com/gone", ClipService.STREAMABLE) == \
+        "https://cdn.example.com/a.mp4?x=1&y=2"
+    # stopped reading once the tag was found
+    assert page.chunks_read < 5
+    assert page.closed
+
+
+def test_tag_split_between_chunks(fake_http):
+    pages, _, _ = fake_http
+    html = "a" * (resolvers.HTML_CHUNK_SIZE - 10) + '<video class="player" src="/media/clip.mp4"></video>'
+    pages["https://example.com/clip"] = FakeResponse(text=html)
+
+    assert resolve_media_url("https://example.com/clip", ClipService.NONE) == \
+        "https://example.com/media/clip.mp4"
+
+
+def test_unresolvable_raises(fake_http):
+    with pytest.raises(ScrapingError):
+        resolve_media_url("https://streamable.com/missing", ClipService.STREAMABLE)
+
+
+def test_find_video_url_skips_blobs():
+    assert find_video_url('<video src="blob:https://kick.com/123"></video>') is None
+    assert find_video_url('<source type="video/mp4" src="clip.mp4">') == "clip.mp4"
+
+
+def streamable_api(pages, urls):
+    """Serves a new signed url from streamable's API each time it's asked"""
+    class SigningResponse(FakeResponse):
+        def json(self):
+            urls.append(f"//cdn.streamable.com/video/mp4/fpuv4.mp4?token={len(urls)}")
+            return {"files": {"mp4": {"url": urls[-1]}}}
+
+    pages["https://api.streamable.com/videos/fpuv4"] = SigningResponse()
+
+
+def test_resolved_urls_expire(fake_http, monkeypatch):
+    pages, _, _ = fake_http
+    urls = []
+    streamable_api(pages, urls)
+    now = [0]
+    monkeypatch.setattr(resolvers, "monotonic", lambda: now[0])
+
+    first = resolve_media_url("https://streamable.com/fpuv4", ClipService.STREAMABLE)
+
+    now[0] = resolvers.RESOLVED_URL_TTL - 1
+    assert resolve_media_url("https://streamable.com/fpuv4", ClipService.STREAMABLE) == first
+    assert len(urls) == 1
+
+    now[0] = resolvers.RESOLVED_URL_TTL + 1
+    assert resolve_media_url("https://streamable.com/fpuv4", ClipService.STREAMABLE) != first
+    assert len(urls) == 2
+
+
+def test_expired_download_is_resolved_again(fake_http, monkeypatch):
+    pages, _, _ = fake_http
+    urls = []
+    streamable_api(pages, urls)
+    downloaded = []
+
+    def download_from_link(src, output):
+        downloaded.append(src)
+
+        if src.endswith("token=0"):
+            raise ExpiredUrlError("403")
+
+    monkeypatch.setattr(scraper, "download_from_link", download_from_link)
+
+    scraper.download_resolved_clip("https://streamable.com/fpuv4", ClipService.STREAMABLE, "clip.mp4")
+
+    assert downloaded == ["https://cdn.streamable.com/video/mp4/fpuv4.mp4?token=0",
+                          "https://cdn.streamable.com/video/mp4/fpuv4.mp4?token=1"]
+
+
+def test_expired_download_is_only_resolved_again_once(fake_http, monkeypatch):
+    pages, _, _ = fake_http
+    streamable_api(pages, [])
+
+    def download_from_link(src, output):
+        raise ExpiredUrlError("410")
+
+    monkeypatch.setattr(scraper, "download_from_link", download_from_link)
+
+    with pytest.raises(ExpiredUrlError):
+        scraper.download_resolved_clip("https://streamable.com/fpuv4", ClipService.STREAMABLE, "clip.mp4")
@@ -0,0 +1,180 @@
+import time
+from threading import Condition, Event
+
+from reddit_to_video.scraping.scheduler import DownloadScheduler, DownloadJob
+from reddit_to_video.scraping.download import check_cancelled
+from reddit_to_video.scraping.validator import ClipService
+
+
+class Tracker:
+    """Records how many jobs of each service run at once. With overlap set, jobs wait
+    until that many are running together, so a run that never overlaps them fails"""
+
+    def __init__(self, overlap=None):
+        self.lock = Condition()
+        self.overlap = overlap
+        self.running = {}
+        self.most_running = {}
+        self.total = 0
+        self.most_total = 0
+        self.started = []
+
+    def job(self, name, service, seconds=0.05):
+        with self.lock:
+            self.started.append(name)
+            self.running[service] = self.running.get(service, 0) + 1
+            self.total += 1
+            self.most_running[service] = max(self.most_running.get(service, 0), self.running[service])
+            self.most_total = max(self.most_total, self.total)
+
+            if self.overlap is not None:
+                self.lock.notify_all()
+                self.lock.wait_for(lambda: self.most_total >= self.overlap, timeout=5)
+
+        time.sleep(seconds)
+
+        with self.lock:
+            self.running[service] -= 1
+            self.total -= 1
+
+        return name
+
+
+def test_runs_concurrently_within_limits():
+    tracker = Tracker(overlap=5)
+    scheduler = DownloadScheduler(max_concurrent=5, service_limits={ClipService.KICK: 1})
+
+    jobs = [DownloadJob(i, tracker.job, (i, service, 0), service)
+            for i, service in enumerate([ClipService.KICK] * 4 + [ClipService.TWITCH] * 10)]
+
+    finished = scheduler.run(jobs)
+
+    assert sorted(job.result for job in finished) == list(range(14))
+    # the first jobs only finish once five run at once, and no more ever do
+    assert tracker.most_total == 5
+    assert tracker.most_running[ClipService.KICK] == 1
+
+
+def test_lower_rank_starts_first():
+    tracker = Tracker()
+    scheduler = DownloadScheduler(max_concurrent=1)
+
+    scheduler.run([DownloadJob(rank, tracker.job, (rank, ClipService.NONE, 0)) for rank in [3, 1, 2, 0]])
+
+    assert tracker.started == [0, 1, 2, 3]
+
+
+def test_errors_are_kept_on_the_job():
+    def fail():
+        raise ValueError("404")
+
+    job = DownloadScheduler().run([DownloadJob(0, fail)])[0]
+
+    assert isinstance(job.error, ValueError)
+    assert not job.succeeded
+
+
+def test_cancel_running_job():
+    started = Event()
+
+    def download():
+        started.set()
+
+        # only finishes if it's never cancelled
+        for _ in range(500):
+            check_cancelled()
+            time.sleep(0.01)
+
+        return "finished"
+
+    scheduler = DownloadScheduler(max_concurrent=2)
+    slow = DownloadJob(0, download)
+    pending = DownloadJob(2, time.sleep, (0,))
+
+    def on_finished(job):
+        scheduler.cancel(slow)
+        scheduler.cancel(pending)
+
+    finished = scheduler.run([slow, DownloadJob(1, started.wait, (5,)), pending], on_finished)
+
+    assert slow.cancelled and slow.result is None
+    assert pending.cancelled and pending not in finished
+
+
+def test_stop_cancels_pending_jobs():
+    scheduler = DownloadScheduler(max_concurrent=1)
+    jobs = [DownloadJob(rank, time.sleep, (0.01,)) for rank in range(5)]
+
+    finished = scheduler.run(jobs, lambda job: scheduler.stop())
+
+    assert len(finished) == 1
+    assert all(job.cancelled for job in jobs[1:])
+
+
+def test_jobs_can_be_submitted_while_running():
+    scheduler = DownloadScheduler(max_concurrent=2)
+    results = []
+
+    def on_finished(job):
+        results.append(job.result)
+
+        if job.result < 3:
+            scheduler.submit(DownloadJob(job.result + 1, lambda value=job.result + 1: value))
+
+    scheduler.run([DownloadJob(0, lambda: 0)], on_finished)
+
+    assert results == [0, 1, 2, 3]
+
+
+def test_admit_holds_jobs_back():
+    scheduler = DownloadScheduler(max_concurrent=4, admit=lambda job: len(scheduler.running) < 2)
+    tracker = Tracker(overlap=2)
+
+    jobs = [DownloadJob(rank, tracker.job, (rank, ClipService.NONE, 0)) for rank in range(6)]
+    finished = scheduler.run(jobs)
+
+    assert len(finished) == 6
+    assert tracker.most_total == 2
+
+
+def test_jobs_never_admitted_are_cancelled():
+    job = DownloadJob(0, time.sleep, (0,))
+
+    assert DownloadScheduler(admit=lambda job: False).run([job]) == []
+    assert job.cancelled
+
+
+def test_jobs_are_read_from_a_generator_while_downloading():
+    scheduler = DownloadScheduler(max_concurrent=2, max_pending=2)
+    events = []
+
+    def download(rank):
+        events.append(("download", rank))
+        return rank
+
+    def listing():
+        for rank in range(10):
+            events.append(("listed", rank))
+            # each page of a listing takes a while to load
+            time.sleep(0.01)
+            yield DownloadJob(rank, download, (rank,))
+
+    finished = scheduler.run(listing())
+
+    assert sorted(job.result for job in finished) == list(range(10))
+    # the first download didn't wait for the whole listing
+    assert events.index(("download", 0)) < events.index(("listed", 9))
+
+
+def test_generator_is_read_no_further_than_needed():
+    scheduler = DownloadScheduler(max_concurrent=1, max_pending=2)
+    listed = []
+
+    def listing():
+        for rank in range(100):
+            listed.append(rank)
+            yield DownloadJob(rank, time.sleep, (0.01,))
+
+    scheduler.run(listing(), lambda job: scheduler.stop() if job.rank == 2 else None)
+
+    assert len(listed) < 10
@@ -0,0 +1,88 @@
+from os.path import join as path_join
+from threading import Event, Thread
+
+import pytest
+
+from reddit_to_video.service import RenderService, LocalServiceClient, HttpServiceClient, create_server
+from reddit_to_video.exceptions import ConfigKeyError
+
+
+def fake_runner(job):
+    if job.config.name == "broken":
+        raise RuntimeError("render failed")
+
+    return path_join("output", f"{job.config.name}.mp4")
+
+
+@pytest.fixture
+def service(make_config):
+    service = RenderService(None, [make_config("haiku"), make_config("broken")],
+                            runner=fake_runner)
+    service.start()
+    yield service
+    service.stop()
+
+
+def test_local_client_renders_jobs(service):
+    client = LocalServiceClient(service)
+
+    finished_id = client.enqueue("haiku")
+    failed_id = client.enqueue("broken")
+    service.wait()
+
+    assert client.status(finished_id)["status"] == "finished"
+    assert client.output(finished_id) == path_join("output", "haiku.mp4")
+    assert client.status(failed_id)["status"] == "failed"
+    assert client.status(failed_id)["error"] == "render failed"
+    assert client.output(failed_id) is None
+
+
+def test_local_client_rejects_unknown_config(service):
+    with pytest.raises(ConfigKeyError):
+        LocalServiceClient(service).enqueue("missing")
+
+
+def test_jobs_are_queued_in_order(make_config):
+    release = Event()
+    rendered = []
+
+    def blocking_runner(job):
+        release.wait(5)
+        rendered.append(job.config.name)
+        return job.config.name
+
+    service = RenderService(None, [make_config("one"), make_config("two")],
+                            runner=blocking_runner)
+    service.start()
+
+    client = LocalServiceClient(service)
+    first_id = client.enqueue("one")
+    second_id = client.enqueue("two")
+
+    assert client.status(second_id)["status"] == "queued"
+
+    release.set()
+    service.wait()
+    service.stop()
+
+    assert rendered == ["one", "two"]
+    assert client.output(first_id) == "one"
+
+
+def test_http_client(service, make_config):
+    server = create_server(service, port=0)
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        client = HttpServiceClient(port=server.server_address[1])
+        job_id = client.enqueue(make_config("json config").json)
+        service.wait()
+
+        assert client.status(job_id)["status"] == "finished"
+        assert client.output(job_id) == path_join("output", "json config.mp4")
+
+        with pytest.raises(ValueError):
+            client.enqueue("haiku", post_policy="unknown")
+    finally:
+        server.shutdown()
+        server.server_close()
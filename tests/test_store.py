@@ -0,0 +1,127 @@
+import time
+from threading import Thread
+
+import pytest
+
+from reddit_to_video import store as store_module
+from reddit_to_video.store import MediaStore, normalise_url
+
+
+def write_bytes(content):
+    def download(path):
+        time.sleep(0.01)
+        with open(path, "wb") as file:
+            file.write(content)
+
+    return download
+
+
+@pytest.mark.parametrize("url", [
+    "https://streamable.com/fpuv4",
+    "http://www.Streamable.com/fpuv4/",
+    "https://streamable.com/fpuv4?utm_source=share#t=3",
+])
+def test_normalise_url(url):
+    assert normalise_url(url) == "https://streamable.com/fpuv4"
+
+
+def test_normalise_url_sorts_query():
+    assert normalise_url("https://youtube.com/watch?v=abc&t=5&si=xyz") == \
+        normalise_url("https://youtube.com/watch?t=5&v=abc")
+
+
+def test_fetch_downloads_once(tmp_path):
+    store = MediaStore(str(tmp_path))
+    calls = []
+
+    def download(path):
+        calls.append(path)
+        write_bytes(b"clip")(path)
+
+    first = store.fetch("https://streamable.com/fpuv4", download)
+    second = store.fetch("https://www.streamable.com/fpuv4/", download)
+
+    assert first == second
+    assert len(calls) == 1
+    assert MediaStore(str(tmp_path)).get("https://streamable.com/fpuv4") == first
+
+
+def test_concurrent_fetch_is_single_flight(tmp_path):
+    store = MediaStore(str(tmp_path))
+    calls = []
+    paths = []
+
+    def download(path):
+        calls.append(path)
+        write_bytes(b"clip")(path)
+
+    def fetch(fetch_store):
+        paths.append(fetch_store.fetch("https://clips.twitch.tv/abc", download))
+
+    # separate stores in one process only share the lock file, like worker processes
+    threads = [Thread(target=fetch, args=(store if i % 2 else MediaStore(str(tmp_path)),))
+               for i in range(8)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+
+
+def test_same_content_shares_file(tmp_path):
+    store = MediaStore(str(tmp_path))
+
+    first = store.fetch("https://streamable.com/abc", write_bytes(b"same clip"))
+    second = store.fetch("https://kick.com/clip/abc", write_bytes(b"same clip"))
+
+    assert first == second
+    assert len(list((tmp_path / "media").iterdir())) == 1
+    assert store.get_size() == len(b"same clip")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    old_run = MediaStore(str(tmp_path))
+
+    for name in ["a", "b", "c"]:
+        old_run.fetch(f"https://example.com/{name}", write_bytes(name.encode() * 400_000))
+
+    old_run.pin("https://example.com/a")
+
+    store = MediaStore(str(tmp_path), budget_mb=1)
+    # used in this run so it is kept
+    store.get("https://example.com/b")
+    store.fetch("https://example.com/d", write_bytes(b"d" * 400_000))
+
+    assert store.get("https://example.com/a") is not None
+    assert store.get("https://example.com/b") is not None
+    assert store.get("https://example.com/c") is None
+    assert store.get("https://example.com/d") is not None
+
+
+def test_clear(tmp_path):
+    store = MediaStore(str(tmp_path))
+    store.fetch("https://example.com/a", write_bytes(b"a"), pin=True)
+
+    store.clear()
+
+    assert store.get("https://example.com/a") is None
+    assert store.entries() == []
+
+
+
+def test_configure_resets_the_shared_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, "store_settings", dict(store_module.store_settings))
+    monkeypatch.setattr(store_module, "shared_store", None)
+
+    store_module.configure_media_store(str(tmp_path / "first"))
+    first = store_module.get_media_store()
+
+    store_module.configure_media_store(budget_mb=10)
+    second = store_module.get_media_store()
+
+    assert second is not first
+    assert second.store_dir == str(tmp_path / "first")
+    assert second.budget_mb == 10
@@ -0,0 +1,59 @@
+import time
+from threading import Lock, Thread
+
+from reddit_to_video.scraping import transport
+from reddit_to_video.scraping.transport import get_session, get_host, host_slot, configure_transport
+
+
+def test_session_is_shared():
+    assert get_session() is get_session()
+
+    adapter = get_session().get_adapter("https://streamable.com/")
+    assert adapter is get_session().get_adapter("https://v.redd.it/")
+    assert adapter._pool_maxsize == transport.transport_settings["pool_size"]
+
+
+def test_get_host():
+    assert get_host("https://V.Redd.it/abc/DASH_720.mp4?source=fallback") == "v.redd.it"
+
+
+def test_host_slot_limits_concurrency(monkeypatch):
+    monkeypatch.setattr(transport, "host_slots", {})
+    monkeypatch.setitem(transport.transport_settings, "max_per_host", 2)
+
+    running = {}
+    most_running = {}
+    lock = Lock()
+
+    def fetch(url):
+        host = get_host(url)
+
+        with host_slot(url):
+            with lock:
+                running[host] = running.get(host, 0) + 1
+                most_running[host] = max(most_running.get(host, 0), running[host])
+
+            time.sleep(0.05)
+
+            with lock:
+                running[host] -= 1
+
+    threads = [Thread(target=fetch, args=(f"https://cdn.example.com/{i}.mp4",)) for i in range(6)]
+    threads.append(Thread(target=fetch, args=("https://other.example.com/clip.mp4",)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert most_running == {"cdn.example.com": 2, "other.example.com": 1}
+
+
+def test_configure_transport(monkeypatch):
+    monkeypatch.setattr(transport, "transport_settings", dict(transport.transport_settings))
+
+    configure_transport(max_per_host=1, timeout=(5, 10))
+
+    assert transport.transport_settings["max_per_host"] == 1
+    assert transport.transport_settings["timeout"] == (5, 10)
+    assert transport.transport_settings["pool_size"] == transport.DEFAULT_POOL_SIZE
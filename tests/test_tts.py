@@ -0,0 +1,398 @@
+import os
+import re
+import time
+from threading import Condition
+
+import pytest
+
+from reddit_to_video.video import tts
+from reddit_to_video.video.tts import TTSCache, TTSEngine
+
+
+class FakeTTS(TTSEngine):
+    def __init__(self, accent="com.au"):
+        self.accent = accent
+        self.calls = []
+
+    @property
+    def cache_settings(self):
+        return {"engine": repr(self), "accent": self.accent}
+
+    def _save_audio(self, text, filename):
+        self.calls.append(text)
+
+        with open(filename, "wb") as file:
+            file.write(f"{self.accent}:{text}".encode("utf-8") * 100)
+
+    def __repr__(self):
+        return "fakeTTS"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TTSCache(str(tmp_path / "tts"))
+    monkeypatch.setattr(tts, "get_tts_cache", lambda: cache)
+    # the fake audio isn't readable, its info is left unknown
+    monkeypatch.setattr(tts, "get_audio_info", lambda path: (None, None))
+    return cache
+
+
+def test_key_depends_on_text_and_settings():
+    key = TTSCache.get_key("hello there", {"engine": "googleTTS", "accent": "com.au"})
+
+    assert key == TTSCache.get_key("  hello\nthere ", {"accent": "com.au", "engine": "googleTTS"})
+    assert key != TTSCache.get_key("hello there", {"engine": "googleTTS", "accent": "co.uk"})
+    assert key != TTSCache.get_key("hello there!", {"engine": "googleTTS", "accent": "com.au"})
+    assert key != TTSCache.get_key("hello there", {"engine": "googleTTS", "accent": "com.au"}, ".wav")
+
+
+def test_identical_text_is_synthesized_once(cache, tmp_path):
+    engine = FakeTTS()
+
+    engine.save_audio("same comment", str(tmp_path / "a.mp3"))
+    engine.save_audio("same comment", str(tmp_path / "b.mp3"))
+
+    assert engine.calls == ["same comment"]
+    assert (tmp_path / "a.mp3").read_bytes() == (tmp_path / "b.mp3").read_bytes()
+
+
+def test_other_accent_is_synthesized_again(cache, tmp_path):
+    FakeTTS("com.au").save_audio("same comment", str(tmp_path / "a.mp3"))
+
+    engine = FakeTTS("co.uk")
+    engine.save_audio("same comment", str(tmp_path / "b.mp3"))
+
+    assert engine.calls == ["same comment"]
+    assert (tmp_path / "b.mp3").read_bytes().startswith(b"co.uk:")
+
+
+def test_save_to_cache_path(cache):
+    engine = FakeTTS()
+    path = engine.get_audio_path("a title")
+
+    assert not os.path.isfile(path)
+
+    engine.save_audio("a title", path)
+
+    assert os.path.isfile(path)
+    assert engine.get_audio_path("a title") == path
+    # only the audio and its sidecar are left, no temp files
+    assert sorted(os.listdir(cache.cache_dir)) == sorted(
+        [os.path.basename(path), os.path.basename(path)[:-len(".mp3")] + ".json"])
+
+    entry = cache.get_entry(engine.get_cache_key("a title"))
+    assert entry["size"] == os.path.getsize(path)
+
+
+def test_failed_synthesis_isnt_cached(cache, tmp_path):
+    class FailingTTS(FakeTTS):
+        def _save_audio(self, text, filename):
+            with open(filename, "wb") as file:
+                file.write(b"half")
+            raise RuntimeError("rate limited")
+
+    engine = FailingTTS()
+
+    with pytest.raises(RuntimeError):
+        engine.save_audio("text", engine.get_audio_path("text"))
+
+    assert cache.get(engine.get_cache_key("text")) is None
+    assert not os.path.isfile(engine.get_audio_path("text"))
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "get_audio_info", lambda path: (None, None))
+    cache = TTSCache(str(tmp_path / "tts"))
+    keys = []
+
+    for i in range(3):
+        source = tmp_path / f"{i}.mp3"
+        source.write_bytes(bytes(400 * 1024))
+        keys.append(f"key{i}")
+        cache.put(keys[-1], str(source))
+
+    entry = cache.get_entry("key0")
+    entry["last_used"] = 0
+    cache._write_entry(entry)
+
+    # a new run, keys used in the last run can be evicted
+    cache = TTSCache(cache.cache_dir)
+
+    assert cache.evict(budget_mb=1) == ["key0"]
+    assert cache.get("key0") is None
+    assert cache.get("key1") is not None
+
+
+def test_evict_keeps_entries_used_this_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "get_audio_info", lambda path: (None, None))
+    cache = TTSCache(str(tmp_path / "tts"), budget_mb=0.5)
+
+    for i in range(3):
+        source = tmp_path / f"{i}.mp3"
+        source.write_bytes(bytes(400 * 1024))
+        cache.put(f"key{i}", str(source))
+
+    assert all(cache.get(f"key{i}") is not None for i in range(3))
+
+
+def test_batch_returns_durations_in_order(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "get_audio_info", lambda path: (os.path.getsize(path) / 1000, 24000))
+    engine = FakeTTS()
+    engine.save_audio("cached", str(tmp_path / "0.mp3"))
+
+    results = engine.save_audio_batch([(text, str(tmp_path / f"{i}.mp3")) for i, text in
+                                       enumerate(["cached", "a longer comment", "short", "short"])])
+
+    assert [result.path for result in results] == [str(tmp_path / f"{i}.mp3") for i in range(4)]
+    assert [result.duration for result in results] == [
+        (len("com.au:") + len(text)) * 100 / 1000 for text in ["cached", "a longer comment", "short", "short"]]
+    assert all(result.error is None for result in results)
+    # cached and repeated text isn't synthesized again
+    assert engine.calls == ["cached", "a longer comment", "short"]
+
+
+def test_batch_failures_are_per_item(cache, tmp_path):
+    class FlakyTTS(FakeTTS):
+        def _save_audio(self, text, filename):
+            if text == "bad":
+                raise RuntimeError("rate limited")
+            super()._save_audio(text, filename)
+
+    results = FlakyTTS().save_audio_batch(
+        [("good", str(tmp_path / "a.mp3")), ("bad", str(tmp_path / "b.mp3"))])
+
+    assert results[0].error is None
+    assert isinstance(results[1].error, RuntimeError)
+    assert not (tmp_path / "b.mp3").exists()
+
+
+def test_coqui_speaker_is_keyed_by_its_contents(tmp_path):
+    speaker = tmp_path / "speaker.wav"
+    speaker.write_bytes(b"first voice")
+
+    engine = tts.CoquiTTS.__new__(tts.CoquiTTS)
+    engine.model = "tts_models/multilingual/multi-dataset/your_tts"
+    engine.speaker_file = str(speaker)
+    engine.kwargs = {"speaker_wav": str(speaker), "language": "en"}
+
+    settings = engine.cache_settings
+    assert str(speaker) not in str(settings)
+
+    speaker.write_bytes(b"another voice")
+    assert engine.cache_settings != settings
+
+    # edited in place to the same size, the new modification time is hashed again
+    settings = engine.cache_settings
+    speaker.write_bytes(b"changed voice")
+    os.utime(speaker, ns=(0, speaker.stat().st_mtime_ns + 1_000_000_000))
+    assert engine.cache_settings != settings
+
+    # the same recording somewhere else shares the cache
+    moved = tmp_path / "moved.wav"
+    moved.write_bytes(b"changed voice")
+    key = engine.get_cache_key("text")
+    engine.speaker_file = str(moved)
+    assert engine.get_cache_key("text") == key
+
+
+def test_google_batch_requests_chunks_at_once(cache, tmp_path, monkeypatch):
+    pytest.importorskip("gtts")
+    engine = tts.GoogleTTS(request_workers=16, requests_per_second=None, chunk_sentences=False)
+    requested = []
+    running = Condition()
+    counts = {"running": 0, "most": 0}
+
+    def request_chunk(chunk):
+        with running:
+            requested.append(chunk)
+            counts["running"] += 1
+            counts["most"] = max(counts["most"], counts["running"])
+            running.notify_all()
+            # the first requests only return once six are sent together
+            running.wait_for(lambda: counts["most"] >= 6, timeout=5)
+            counts["running"] -= 1
+
+        return chunk.encode("utf-8")
+
+    monkeypatch.setattr(engine, "_request_chunk", request_chunk)
+
+    long_text = " ".join(f"This is sentence number {i} of a long comment." for i in range(10))
+    items = [(long_text, str(tmp_path / "long.mp3"))] + [(f"comment {i}", str(tmp_path / f"{i}.mp3"))
+                                                         for i in range(5)]
+
+    results = engine.save_audio_batch(items)
+    engine.close()
+
+    assert all(result.error is None for result in results)
+    assert len(requested) > 6
+    # the long comment's chunks and the other comments were requested at once
+    assert counts["most"] >= 6
+    # the chunks are joined in order
+    assert (tmp_path / "long.mp3").read_bytes() == "".join(engine.get_chunks(long_text)).encode("utf-8")
+
+
+def test_google_chunks_fit_a_request():
+    pytest.importorskip("gtts")
+    text = ("This is a rather long first sentence, with a clause or two in it; and it goes on "
+            "for a while without stopping " + "verylongword" * 12 + ". Short one!")
+
+    chunks = tts.split_google_chunks(text)
+
+    assert all(0 < len(chunk) <= tts.GOOGLE_TTS_MAX_CHARS for chunk in chunks)
+    # only split between words, apart from the word too long for one request
+    assert "".join(chunks).replace(" ", "") == "".join(re.findall(r"\w+|!", text))
+    assert tts.split_google_chunks("  Hello there!  ") == ["Hello there!"]
+    assert tts.split_google_chunks("?! ...") == []
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = tts.RateLimiter(50)
+    start = time.time()
+
+    for _ in range(6):
+        limiter.wait()
+
+    assert time.time() - start >= 0.09
+
+
+class WavTTS(FakeTTS):
+    sample_rate = 1000
+
+    def _save_audio(self, text, filename):
+        import numpy
+        import soundfile
+
+        if text in self.failing:
+            raise RuntimeError("rate limited")
+
+        self.calls.append(text)
+        # a sample per character, so each sentence can be found in the joined audio
+        soundfile.write(filename, numpy.full(len(text), 0.5, dtype=numpy.float32), self.sample_rate,
+                        format="WAV")
+
+    failing = ()
+
+
+@pytest.fixture
+def wav_cache(cache, monkeypatch):
+    pytest.importorskip("soundfile")
+    monkeypatch.setattr(tts, "get_audio_info", tts_audio_info)
+    return cache
+
+
+def tts_audio_info(path):
+    import soundfile
+
+    info = soundfile.info(path)
+    return info.frames / info.samplerate, info.samplerate
+
+
+def test_sentences_are_joined_sample_accurately(wav_cache, tmp_path):
+    import soundfile
+
+    engine = WavTTS()
+    engine.sentence_gap = 0.25
+
+    result = engine.save_audio_batch([("First sentence. Second one? Third.", str(tmp_path / "a.wav"))])[0]
+    samples, _ = soundfile.read(str(tmp_path / "a.wav"))
+
+    assert engine.calls == ["First sentence.", "Second one?", "Third."]
+    assert len(samples) == len("First sentence.Second one?Third.") + 2 * 250
+    assert result.duration == len(samples) / 1000
+    assert samples[len("First sentence."):len("First sentence.") + 250].max() == 0
+
+
+def test_edited_text_only_synthesizes_new_sentences(wav_cache, tmp_path):
+    engine = WavTTS()
+
+    engine.save_audio("First sentence. Second one? Third.", str(tmp_path / "a.wav"))
+    engine.calls.clear()
+    engine.save_audio("First sentence. Second one, edited? Third.", str(tmp_path / "b.wav"))
+
+    assert engine.calls == ["Second one, edited?"]
+
+
+def test_retry_only_synthesizes_failed_sentences(wav_cache, tmp_path):
+    engine = WavTTS()
+    engine.failing = ("Second one?",)
+
+    result = engine.save_audio_batch([("First sentence. Second one? Third.", str(tmp_path / "a.wav"))])[0]
+
+    assert isinstance(result.error, RuntimeError)
+    assert not (tmp_path / "a.wav").exists()
+
+    engine.failing = ()
+    engine.calls.clear()
+    engine.save_audio("First sentence. Second one? Third.", str(tmp_path / "a.wav"))
+
+    assert engine.calls == ["Second one?"]
+    assert (tmp_path / "a.wav").exists()
+
+
+def test_mp3_output_is_synthesized_whole(cache, tmp_path):
+    engine = FakeTTS()
+
+    engine.save_audio("First sentence. Second one?", str(tmp_path / "a.mp3"))
+
+    assert engine.calls == ["First sentence. Second one?"]
+
+
+def test_google_sentences_are_kept_as_mp3_and_joined_into_wav(wav_cache, tmp_path, monkeypatch):
+    pytest.importorskip("gtts")
+    import io
+    import numpy
+    import soundfile
+
+    def request_chunk(chunk):
+        # a sample per character, like the fake engines
+        audio = io.BytesIO()
+        soundfile.write(audio, numpy.full(len(chunk) * 240, 0.25, dtype=numpy.float32), 24000, format="MP3")
+        return audio.getvalue()
+
+    engine = tts.GoogleTTS(requests_per_second=None)
+    monkeypatch.setattr(engine, "_request_chunk", request_chunk)
+
+    path = engine.get_audio_path("First sentence. Second one?")
+    result = engine.save_audio_batch([("First sentence. Second one?", path)])[0]
+    engine.close()
+
+    assert path.endswith(".wav") and result.error is None
+    assert all(wav_cache.get(engine.get_chunk_key(sentence, ".mp3")).endswith(".mp3")
+               for sentence in ["First sentence.", "Second one?"])
+    assert result.duration == pytest.approx(
+        len("First sentence.Second one?") / 100 + engine.sentence_gap, abs=0.1)
+
+
+def test_gap_is_part_of_the_key(wav_cache):
+    engine = WavTTS()
+    key = engine.get_cache_key("One. Two.")
+    engine.sentence_gap = 0.1
+
+    assert engine.get_cache_key("One. Two.") != key
+    assert engine.get_chunk_key("One.") == WavTTS().get_chunk_key("One.")
+
+
+def test_gap_is_part_of_the_key_when_the_engine_joins_sentences(wav_cache):
+    engine = WavTTS()
+    engine.chunk_sentences = False
+    key = engine.get_cache_key("One. Two.")
+    engine.sentence_gap = 0.1
+
+    assert engine.get_cache_key("One. Two.") == key
+
+    engine.joins_sentences = True
+    assert engine.get_cache_key("One. Two.") != key
+    assert tts.CoquiTTS.joins_sentences
+
+
+def test_get_audio_returns_samples(wav_cache):
+    engine = WavTTS()
+    engine.output_extension = ".wav"
+
+    samples, sample_rate = engine.get_audio("Hello there. General Kenobi.")
+
+    assert engine.get_audio_path("Hello there. General Kenobi.").endswith(".wav")
+    assert sample_rate == 1000
+    assert len(samples) == len("Hello there.General Kenobi.") + round(engine.sentence_gap * 1000)
+    assert engine.get_audio("Hello there. General Kenobi.")[0].shape == samples.shape
+    assert engine.calls == ["Hello there.", "General Kenobi."]
@@ -1,5 +1,9 @@
+import re
+import timeit
+
 import pytest
-from reddit_to_video.scraping.validator import get_clip_service_from_url, ClipService
+from reddit_to_video.scraping.validator import (get_clip_service_from_url, get_clip_key, classify_url,
+                                              get_urls_from_string, ClipService)
 
 
 clip_urls = {
@@ -21,3 +25,78 @@ clip_urls = {
 @pytest.mark.parametrize("url, service", list(clip_urls.items()))
 def test_get_clip_service_from_url(url, service):
     assert get_clip_service_from_url(url).value == service.value
+
+
+clip_keys = {
+    "https://clips.twitch.tv/AbstemiousSincereSalamanderPeteZaroll?t=00h00m00s": "twitch:AbstemiousSincereSalamanderPeteZaroll",
+    "https://www.twitch.tv/plumy_/clip/AbstemiousSincereSalamanderPeteZaroll": "twitch:AbstemiousSincereSalamanderPeteZaroll",
+    "https://youtube.com/watch?v=dQw4w9WgXcQ&t=5": "youtube:dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ": "youtube:dQw4w9WgXcQ",
+    "http://www.streamable.com/fpuv4/": "streamable:fpuv4",
+    "https://kick.com/xqc?clip=clip_01H": "kick:clip_01H",
+    "https://www.reddit.com/r/fightporn/comments/ei6pek/ochappy_new_year_rfightporn/": "reddit:ei6pek",
+    "https://v.redd.it/yw6nan929np31": "reddit:yw6nan929np31",
+    "https://github.com/Marley-Mulvin-Broome/reddit-to-video": None
+}
+
+
+@pytest.mark.parametrize("url, key", list(clip_keys.items()))
+def test_get_clip_key(url, key):
+    assert get_clip_key(url) == key
+
+
+def test_get_urls_from_string():
+    text = "Found it https://clips.twitch.tv/Abc-d_E and kick.com/xqc?clip=clip_01, also (https://streamable.com/fpuv4)."
+
+    assert get_urls_from_string(text) == [
+        "https://clips.twitch.tv/Abc-d_E", "kick.com/xqc?clip=clip_01", "https://streamable.com/fpuv4"]
+
+
+# the patterns get_clip_service_from_url tried one after the other before urls were parsed
+legacy_patterns = [
+    (ClipService.TWITCH, re.compile(r".*clips\.twitch\.tv.*")),
+    (ClipService.TWITCH, re.compile(r".*twitch\.tv\/.*\/clip.*")),
+    (ClipService.STREAMABLE, re.compile(r".*streamable.com\/.*")),
+    (ClipService.KICK, re.compile(r".*kick.com\/.*\?clip=.*")),
+    (ClipService.YOUTUBE, re.compile(r".*youtube\.com\/watch\?v=.*")),
+    (ClipService.YOUTUBE, re.compile(r".*youtu\.be\/.*")),
+    (ClipService.REDDIT, re.compile(r".*www.reddit.com/r/.*/comments/.*")),
+    (ClipService.REDDIT, re.compile(r".*v\.redd\.it/.*"))
+]
+
+
+def legacy_get_clip_service_from_url(url):
+    for service, pattern in legacy_patterns:
+        if pattern.match(url) is not None:
+            return service
+
+    return ClipService.NONE
+
+
+# listings are mostly links that aren't clips, which tried every pattern
+corpus = list(clip_urls) + [
+    "https://i.redd.it/8ox2k3x1m4kb1.jpg",
+    "https://www.theguardian.com/world/2023/apr/10/some-long-news-article-title-about-something",
+    "https://imgur.com/gallery/AbCdEf1",
+    "https://en.wikipedia.org/wiki/Python_(programming_language)#History"]
+
+
+def test_classifier_matches_legacy_patterns():
+    for url in corpus:
+        assert legacy_get_clip_service_from_url(url).value == get_clip_service_from_url(url).value
+
+
+@pytest.mark.benchmark
+def test_classifier_is_faster_than_legacy_patterns():
+    legacy_times = []
+    classifier_times = []
+
+    # interleaved so both see the same load, the fastest run of each is compared
+    for _ in range(9):
+        legacy_times.append(timeit.timeit(
+            lambda: [legacy_get_clip_service_from_url(url) for url in corpus], number=100))
+        # without the lru cache, so every call parses its url
+        classifier_times.append(timeit.timeit(
+            lambda: [classify_url.__wrapped__(url)[0] for url in corpus], number=100))
+
+    assert min(classifier_times) < min(legacy_times)
@@ -0,0 +1,19 @@
+import pytest
+
+from reddit_to_video.utility import join_samples, split_tts_sentences
+
+
+def test_split_tts_sentences():
+    assert split_tts_sentences("First one. Second one?  Third https://example.com one. ") == \
+        ["First one.", "Second one?", "Third  one."]
+    # sentences with nothing to say are dropped
+    assert split_tts_sentences("Wow. ... Nice.") == ["Wow.", "Nice."]
+
+
+def test_join_samples():
+    numpy = pytest.importorskip("numpy")
+
+    joined = join_samples([numpy.ones(3, dtype=numpy.float32), numpy.full(2, 2, dtype=numpy.float32)],
+                          sample_rate=10, gap=0.2)
+
+    assert joined.tolist() == [1, 1, 1, 0, 0, 2, 2]
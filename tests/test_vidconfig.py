@@ -1,6 +1,19 @@
+import pytest
+
 # import pytest
 # from reddit_to_video.video.vidConfig import VidConfig, validate_json_val
 
 # invalid_json = [
 
 # @pytest.mark.parametrize("json, args",
+
+
+def test_footage_urls_pass_config_validation(make_config):
+    config = make_config("url footage")
+    config.json["settings"]["end_card_footage"] = "https://example.com/end card.mp4"
+    config.validate_config()
+
+    config.json["settings"]["end_card_footage"] = "missing/end card.mp4"
+
+    with pytest.raises(FileNotFoundError):
+        config.validate_config()